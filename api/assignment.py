@@ -0,0 +1,282 @@
+# api/assignment.py
+"""
+Lecturer -> offered module assignment.
+
+All unassigned offerings of a semester are matched to qualified lecturers in one
+min-cost flow (source -> offering -> lecturer -> sink). Lecturer capacity comes
+from Lecturer.teaching_load (weekly contact hours) minus what is already assigned,
+and each extra offering on the same lecturer costs a bit more so work is spread.
+Hard rules (qualification, availability, no double booking, hours) are checked
+again after the flow, so the result is always valid even where the flow model
+is only an upper bound.
+"""
+from heapq import heappush, heappop
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+from .timeslots import (
+    window_mask, duration_hours, parse_teaching_load, DEFAULT_OFFERING_HOURS, availability_mask, mask_from_bytes,
+)
+
+# Cost weights (integers, the flow compares reduced costs for equality)
+LOAD_STEP_COST = 2          # per offering already taken by the same lecturer in this run
+UNKNOWN_AVAILABILITY_COST = 3
+UNKNOWN_LOAD_COST = 2
+
+
+class _MinCostFlow:
+    """Primal-dual min-cost max-flow: Dijkstra with potentials + Dinic on the admissible graph."""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.graph: List[List[list]] = [[] for _ in range(n)]
+
+    def add_edge(self, u: int, v: int, cap: int, cost: int):
+        self.graph[u].append([v, cap, cost, len(self.graph[v])])
+        self.graph[v].append([u, 0, -cost, len(self.graph[u]) - 1])
+
+    def _dijkstra(self, s: int, h: List[int]) -> List[float]:
+        dist = [float("inf")] * self.n
+        dist[s] = 0
+        heap = [(0, s)]
+        while heap:
+            d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            for v, cap, cost, _ in self.graph[u]:
+                if cap > 0:
+                    nd = d + cost + h[u] - h[v]
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        heappush(heap, (nd, v))
+        return dist
+
+    def _levels(self, s: int, h: List[int]) -> List[int]:
+        level = [-1] * self.n
+        level[s] = 0
+        queue = [s]
+        for u in queue:
+            for v, cap, cost, _ in self.graph[u]:
+                if cap > 0 and level[v] < 0 and cost + h[u] - h[v] == 0:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level
+
+    def _augment(self, s: int, t: int, h: List[int], level: List[int], it: List[int]) -> int:
+        # iterative DFS, all capacities in this model are 1
+        stack = [s]
+        path = []
+        while stack:
+            u = stack[-1]
+            if u == t:
+                for pu, ei in path:
+                    e = self.graph[pu][ei]
+                    e[1] -= 1
+                    self.graph[e[0]][e[3]][1] += 1
+                return 1
+            edges = self.graph[u]
+            advanced = False
+            while it[u] < len(edges):
+                v, cap, cost, _ = edges[it[u]]
+                if cap > 0 and level[v] == level[u] + 1 and cost + h[u] - h[v] == 0:
+                    path.append((u, it[u]))
+                    stack.append(v)
+                    advanced = True
+                    break
+                it[u] += 1
+            if not advanced:
+                stack.pop()
+                level[u] = -1
+                if path:
+                    pu, _ = path.pop()
+                    it[pu] += 1
+        return 0
+
+    def solve(self, s: int, t: int) -> int:
+        h = [0] * self.n
+        flow = 0
+        while True:
+            dist = self._dijkstra(s, h)
+            if dist[t] == float("inf"):
+                return flow
+            for v in range(self.n):
+                if dist[v] != float("inf"):
+                    h[v] += int(dist[v])
+            while True:
+                level = self._levels(s, h)
+                if level[t] < 0:
+                    break
+                it = [0] * self.n
+                while self._augment(s, t, h, level, it):
+                    flow += 1
+
+
+def _lecturer_name(lec: models.Lecturer) -> str:
+    return f"{lec.first_name} {lec.last_name}"
+
+
+def compute_assignment(db: Session, semester: str) -> dict:
+    offers = (
+        db.query(models.OfferedModule)
+        .options(joinedload(models.OfferedModule.module))
+        .filter(models.OfferedModule.semester == semester)
+        .all()
+    )
+    todo = [o for o in offers if o.lecturer_id is None]
+
+    # weekly blocks per offering (scheduled offerings have fixed times)
+    entries = db.query(models.ScheduleEntry).filter(models.ScheduleEntry.semester == semester).all()
+    slots_by_offer: Dict[int, int] = {}
+    hours_by_offer: Dict[int, float] = {}
+    for e in entries:
+        slots_by_offer[e.offered_module_id] = slots_by_offer.get(e.offered_module_id, 0) | window_mask(
+            e.day_of_week, e.start_time, e.end_time
+        )
+        hours_by_offer[e.offered_module_id] = hours_by_offer.get(e.offered_module_id, 0.0) + duration_hours(
+            e.start_time, e.end_time
+        )
+
+    def demand(offer_id: int) -> float:
+        return hours_by_offer.get(offer_id) or DEFAULT_OFFERING_HOURS
+
+    lecturers = {l.id: l for l in db.query(models.Lecturer).all()}
+    qualified: Dict[str, List[int]] = {}
+    codes = {o.module_code for o in todo}
+    if codes:
+        rows = db.query(models.lecturer_modules).filter(models.lecturer_modules.c.module_code.in_(codes)).all()
+        for r in rows:
+            qualified.setdefault(r.module_code, []).append(r.lecturer_id)
+
+    avail = {
+        lec_id: mask_from_bytes(bitmap) if bitmap is not None else availability_mask(data)
+        for lec_id, bitmap, data in db.query(
+            models.LecturerAvailability.lecturer_id,
+            models.LecturerAvailability.slot_bitmap,
+            models.LecturerAvailability.schedule_data,
+        ).all()
+    }
+
+    # what lecturers already carry this semester
+    used_hours: Dict[int, float] = {}
+    busy: Dict[int, int] = {}
+    for o in offers:
+        if o.lecturer_id is not None:
+            used_hours[o.lecturer_id] = used_hours.get(o.lecturer_id, 0.0) + demand(o.id)
+            busy[o.lecturer_id] = busy.get(o.lecturer_id, 0) | slots_by_offer.get(o.id, 0)
+
+    remaining: Dict[int, Optional[float]] = {}
+    for lec_id, lec in lecturers.items():
+        load = parse_teaching_load(lec.teaching_load)
+        remaining[lec_id] = None if load is None else load - used_hours.get(lec_id, 0.0)
+
+    # candidate edges + reasons for offerings that end up with none
+    candidates: Dict[int, List[tuple]] = {}
+    reasons: Dict[int, str] = {}
+    for o in todo:
+        pool = [lid for lid in qualified.get(o.module_code, []) if lid in lecturers]
+        if not pool:
+            reasons[o.id] = "No qualified lecturer"
+            continue
+        need = slots_by_offer.get(o.id, 0)
+        edges = []
+        for lid in pool:
+            rem = remaining[lid]
+            if rem is not None and rem < demand(o.id):
+                continue
+            if need and (busy.get(lid, 0) & need):
+                continue
+            cost = 0
+            if lid in avail:
+                if need and (avail[lid] & need) != need:
+                    continue
+            else:
+                cost += UNKNOWN_AVAILABILITY_COST
+            if rem is None:
+                cost += UNKNOWN_LOAD_COST
+            edges.append((lid, cost))
+        if edges:
+            candidates[o.id] = edges
+        else:
+            reasons[o.id] = "All qualified lecturers are unavailable, double-booked or at full teaching load"
+
+    # --- flow network ---
+    offer_ids = list(candidates.keys())
+    lec_ids = sorted({lid for edges in candidates.values() for lid, _ in edges})
+    o_node = {oid: 1 + i for i, oid in enumerate(offer_ids)}
+    l_node = {lid: 1 + len(offer_ids) + i for i, lid in enumerate(lec_ids)}
+    sink = 1 + len(offer_ids) + len(lec_ids)
+    mcf = _MinCostFlow(sink + 1)
+
+    demands_by_lec: Dict[int, List[float]] = {}
+    for oid, edges in candidates.items():
+        mcf.add_edge(0, o_node[oid], 1, 0)
+        for lid, cost in edges:
+            mcf.add_edge(o_node[oid], l_node[lid], 1, cost)
+            demands_by_lec.setdefault(lid, []).append(demand(oid))
+
+    for lid in lec_ids:
+        mine = sorted(demands_by_lec[lid])
+        rem = remaining[lid]
+        cap = 0
+        if rem is None:
+            cap = len(mine)
+        else:
+            # upper bound: how many of the smallest demands fit
+            total = 0.0
+            for d in mine:
+                if total + d > rem:
+                    break
+                total += d
+                cap += 1
+        for k in range(cap):
+            mcf.add_edge(l_node[lid], sink, 1, k * LOAD_STEP_COST)
+
+    mcf.solve(0, sink)
+
+    chosen: Dict[int, tuple] = {}
+    for oid in offer_ids:
+        for v, cap, cost, _ in mcf.graph[o_node[oid]]:
+            if v != 0 and cap == 0:
+                lid = lec_ids[v - 1 - len(offer_ids)]
+                chosen[oid] = (lid, cost)
+                break
+
+    # --- validation pass: exact hours and no clashes between new assignments ---
+    offer_by_id = {o.id: o for o in todo}
+    proposals = []
+    for oid, (lid, cost) in sorted(chosen.items(), key=lambda kv: kv[1][1]):
+        need = slots_by_offer.get(oid, 0)
+        rem = remaining[lid]
+        if (rem is not None and rem < demand(oid)) or (need and busy.get(lid, 0) & need):
+            reasons[oid] = "Lecturer capacity used up by other assignments"
+            continue
+        if rem is not None:
+            remaining[lid] = rem - demand(oid)
+        busy[lid] = busy.get(lid, 0) | need
+        o = offer_by_id[oid]
+        proposals.append({
+            "offered_module_id": oid,
+            "module_code": o.module_code,
+            "module_name": o.module.name if o.module else "Unknown Module",
+            "lecturer_id": lid,
+            "lecturer_name": _lecturer_name(lecturers[lid]),
+            "cost": cost,
+        })
+
+    for oid in offer_ids:
+        if oid not in chosen and oid not in reasons:
+            reasons[oid] = "Lecturer capacity used up by other assignments"
+
+    unassigned = [
+        {"offered_module_id": oid, "module_code": offer_by_id[oid].module_code, "reason": reason}
+        for oid, reason in sorted(reasons.items())
+    ]
+    proposals.sort(key=lambda p: p["offered_module_id"])
+    return {
+        "semester": semester,
+        "proposals": proposals,
+        "unassigned": unassigned,
+        "total_cost": sum(p["cost"] for p in proposals),
+    }
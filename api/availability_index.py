@@ -0,0 +1,200 @@
+# api/availability_index.py
+"""
+Availability matrix for aggregate questions ("when are most lecturers of
+program P free?").
+
+One uint8 row of WEEK_SLOTS 0/1 cells per lecturer, unpacked from
+LecturerAvailability.slot_bitmap, so a heatmap is a column sum over the
+selected rows. Rows are refreshed one lecturer at a time from the change feed
+("availability" changes); domain/program membership is rebuilt when lecturers,
+modules or programs change. Both are keyed on their change_log version
+(changes.version): this process's own records are applied row by row, any
+other difference means another process wrote, and the part is reloaded.
+"""
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models, changes
+from .timeslots import (
+    DAYS, SLOT_MINUTES, SLOTS_PER_DAY, WEEK_BYTES, WEEK_SLOTS, availability_mask, format_minutes, mask_to_bytes,
+)
+
+# what the matrix rows and the domain/program membership are built from
+MATRIX_ENTITIES = ("availability", "lecturers")
+MEMBERSHIP_ENTITIES = ("lecturers", "modules", "programs")
+
+
+def _unpack(bitmap: Optional[bytes]) -> np.ndarray:
+    return np.unpackbits(np.frombuffer(bytes(bitmap or bytes(WEEK_BYTES)), dtype=np.uint8), bitorder="little")
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.matrix: Optional[np.ndarray] = None  # (lecturers, WEEK_SLOTS) uint8
+        self.row_of: Dict[int, int] = {}
+        self.has_data: Optional[np.ndarray] = None  # lecturer has an availability row at all
+        self.dirty: Set[int] = set()
+        self.by_domain: Optional[Dict[int, Set[int]]] = None
+        self.by_program: Dict[int, Set[int]] = {}
+        self.version: Optional[Tuple[int, int]] = None  # of MATRIX_ENTITIES, matrix plus dirty rows
+        self.membership_version: Optional[Tuple[int, int]] = None
+
+    # --- maintenance ---
+
+    def mark_dirty(self, lecturer_id: int):
+        with self._lock:
+            if self.matrix is not None:
+                self.dirty.add(lecturer_id)
+
+    def invalidate(self):
+        with self._lock:
+            self.matrix = None
+            self.dirty.clear()
+
+    def invalidate_membership(self):
+        with self._lock:
+            self.by_domain = None
+
+    def note_local(self, batch: List[dict]):
+        """Records of this process, already marked dirty: count them into the matrix version."""
+        seqs = [c["seq"] for c in batch if c["entity"] in MATRIX_ENTITIES and c.get("seq") is not None]
+        with self._lock:
+            if self.version is not None and seqs:
+                self.version = (self.version[0] + len(seqs), max(self.version[1], max(seqs)))
+
+    def _load(self, db: Session, ids: Optional[Set[int]] = None) -> Dict[int, np.ndarray]:
+        A = models.LecturerAvailability
+        q = db.query(A.lecturer_id, A.slot_bitmap, A.schedule_data)
+        if ids is not None:
+            q = q.filter(A.lecturer_id.in_(ids))
+        return {
+            lec_id: _unpack(bitmap if bitmap is not None else mask_to_bytes(availability_mask(data)))
+            for lec_id, bitmap, data in q.all()
+        }
+
+    def _ensure_matrix(self, db: Session):
+        if self.matrix is None:
+            lecturer_ids = [lid for (lid,) in db.query(models.Lecturer.id).order_by(models.Lecturer.id).all()]
+            rows = self._load(db)
+            self.row_of = {lid: i for i, lid in enumerate(lecturer_ids)}
+            self.matrix = np.zeros((len(lecturer_ids), WEEK_SLOTS), dtype=np.uint8)
+            self.has_data = np.zeros(len(lecturer_ids), dtype=bool)
+            for lid, bits in rows.items():
+                i = self.row_of.get(lid)
+                if i is not None:
+                    self.matrix[i] = bits
+                    self.has_data[i] = True
+            self.dirty.clear()
+            return
+        if not self.dirty:
+            return
+        ids, self.dirty = self.dirty, set()
+        rows = self._load(db, ids)
+        new = [lid for lid in ids if lid not in self.row_of]
+        if new:
+            known = {lid for (lid,) in db.query(models.Lecturer.id).filter(models.Lecturer.id.in_(new)).all()}
+            new = sorted(known)
+            for lid in new:
+                self.row_of[lid] = len(self.row_of)
+            self.matrix = np.vstack([self.matrix, np.zeros((len(new), WEEK_SLOTS), dtype=np.uint8)])
+            self.has_data = np.concatenate([self.has_data, np.zeros(len(new), dtype=bool)])
+        for lid in ids:
+            i = self.row_of.get(lid)
+            if i is None:
+                continue
+            bits = rows.get(lid)
+            self.matrix[i] = 0 if bits is None else bits
+            self.has_data[i] = bits is not None
+
+    def _ensure_membership(self, db: Session):
+        if self.by_domain is not None:
+            return
+        by_domain: Dict[int, Set[int]] = {}
+        for lid, did in db.query(models.lecturer_domains.c.lecturer_id, models.lecturer_domains.c.domain_id).all():
+            by_domain.setdefault(did, set()).add(lid)
+        for lid, did in db.query(models.Lecturer.id, models.Lecturer.domain_id).filter(
+                models.Lecturer.domain_id.isnot(None)).all():
+            by_domain.setdefault(did, set()).add(lid)
+        # a lecturer belongs to a program if qualified for one of its modules, or heads it
+        by_program: Dict[int, Set[int]] = {}
+        rows = (
+            db.query(models.lecturer_modules.c.lecturer_id, models.Module.program_id)
+            .join(models.Module, models.Module.module_code == models.lecturer_modules.c.module_code)
+            .filter(models.Module.program_id.isnot(None))
+            .all()
+        )
+        for lid, pid in rows:
+            by_program.setdefault(pid, set()).add(lid)
+        for pid, lid in db.query(models.StudyProgram.id, models.StudyProgram.head_of_program_id).filter(
+                models.StudyProgram.head_of_program_id.isnot(None)).all():
+            by_program.setdefault(pid, set()).add(lid)
+        self.by_domain, self.by_program = by_domain, by_program
+
+    # --- queries ---
+
+    def heatmap(self, db: Session, domain_id: Optional[int] = None, program_id: Optional[int] = None) -> dict:
+        with self._lock:
+            version = changes.version(db, MATRIX_ENTITIES)
+            if version != self.version:
+                # another process wrote: which rows is unknown, reload them all
+                self.matrix = None
+            self._ensure_matrix(db)
+            self.version = version
+            membership = changes.version(db, MEMBERSHIP_ENTITIES)
+            if membership != self.membership_version:
+                self.by_domain = None
+            self._ensure_membership(db)
+            self.membership_version = membership
+            selected: Optional[Set[int]] = None
+            if domain_id is not None:
+                selected = set(self.by_domain.get(domain_id, ()))
+            if program_id is not None:
+                members = self.by_program.get(program_id, set())
+                selected = set(members) if selected is None else selected & members
+            if selected is None:
+                idx = np.arange(len(self.row_of))
+            else:
+                idx = np.array(sorted(self.row_of[lid] for lid in selected if lid in self.row_of), dtype=np.intp)
+            counts = self.matrix[idx].sum(axis=0, dtype=np.int32).reshape(len(DAYS), SLOTS_PER_DAY)
+            reporting = int(self.has_data[idx].sum())
+
+        peak = int(counts.max()) if counts.size else 0
+        peaks = [
+            {"day_of_week": DAYS[d], "start_time": format_minutes(s * SLOT_MINUTES)}
+            for d, s in zip(*np.nonzero(counts == peak))
+        ] if peak else []
+        return {
+            "domain_id": domain_id,
+            "program_id": program_id,
+            "lecturers": int(idx.size),
+            "with_availability": reporting,
+            "days": DAYS,
+            "slot_minutes": SLOT_MINUTES,
+            "slots": [format_minutes(s * SLOT_MINUTES) for s in range(SLOTS_PER_DAY)],
+            "counts": counts.tolist(),
+            "peak": peak,
+            "peak_slots": peaks,
+        }
+
+
+availability_index = AvailabilityIndex()
+
+
+@changes.subscribe
+def _on_changes(batch: List[dict]):
+    for c in batch:
+        if c["entity"] == "availability":
+            availability_index.mark_dirty(int(c["entity_id"]))
+        elif c["entity"] == "lecturers":
+            if c["op"] == changes.DELETE:
+                availability_index.invalidate()  # drop the row instead of zeroing it
+            else:
+                availability_index.mark_dirty(int(c["entity_id"]))
+            availability_index.invalidate_membership()
+        elif c["entity"] in ("modules", "programs"):
+            availability_index.invalidate_membership()
+    availability_index.note_local(batch)
@@ -0,0 +1,77 @@
+# api/changes.py
+"""
+Change sequence.
+
+Routers call record() next to their own writes. The ChangeLog row is committed
+in the same transaction, so ChangeLog.seq is an increasing version clients can
+sync against (GET /changes?since=). seqs are handed out at insert but become
+visible at commit, i.e. possibly out of order; GET /changes holds its cursor
+back at gaps for that reason.
+
+After a successful commit the flushed records are handed to in-process
+listeners registered with subscribe(); on rollback they are dropped.
+"""
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, func, or_
+from sqlalchemy.orm import Session
+
+from . import models
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+_listeners: List[Callable[[List[dict]], None]] = []
+
+
+def record(db: Session, entity: str, entity_id, op: str, semester: Optional[str] = None):
+    db.add(models.ChangeLog(entity=entity, entity_id=str(entity_id), op=op, semester=semester))
+
+
+def version(db: Session, entities: Iterable[str], semester: Optional[str] = None) -> Tuple[int, int]:
+    """
+    (count, max seq) of the committed records of `entities`; with a semester,
+    its own records plus the ones without a semester. Caches shared between
+    processes compare it instead of relying on in-process invalidation. The
+    count also moves when a lower seq commits after a higher one, which the
+    max alone would miss.
+    """
+    q = db.query(func.count(models.ChangeLog.seq), func.coalesce(func.max(models.ChangeLog.seq), 0))\
+        .filter(models.ChangeLog.entity.in_(list(entities)))
+    if semester is not None:
+        q = q.filter(or_(models.ChangeLog.semester == semester, models.ChangeLog.semester.is_(None)))
+    count, head = q.one()
+    return int(count), int(head)
+
+
+def subscribe(fn: Callable[[List[dict]], None]):
+    _listeners.append(fn)
+    return fn
+
+
+@event.listens_for(Session, "after_flush")
+def _collect(session, flush_context):
+    flushed = [o for o in session.new if isinstance(o, models.ChangeLog)]
+    if flushed:
+        session.info.setdefault("committed_changes", []).extend(
+            {"seq": o.seq, "entity": o.entity, "entity_id": o.entity_id, "op": o.op, "semester": o.semester}
+            for o in flushed
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch(session):
+    changes = session.info.pop("committed_changes", None)
+    if not changes:
+        return
+    for fn in list(_listeners):
+        try:
+            fn(changes)
+        except Exception as e:
+            print(" Change listener error:", e)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("committed_changes", None)
@@ -0,0 +1,538 @@
+# api/constraint_engine.py
+"""
+Scheduler-constraint engine.
+
+rule_text is parsed into a small predicate AST that every schedule entry in
+the constraint's scope has to satisfy. Two inputs are understood:
+
+- the sentences generated by the constraint builder in the frontend
+  ("X is open on: Monday, Tuesday.", "X is open from 08:00 to 20:00.",
+  "X is unavailable on Fridays.", "X has a specific duration of 180 minutes.",
+  "X must be conducted Online.", "Standard lecture slots are 90 minutes long
+  with a 15 minute break.")
+- a custom expression language for "Custom" rules, e.g.
+      day not in [Saturday, Sunday] and end <= 18:00
+      room_type == Lab or duration <= 90
+  fields: day, start, end, duration, room, room_type, capacity, location,
+  module, lecturer, group, program, has_room
+  operators: == != < <= > >= in, not in, and, or, not, parentheses
+
+The AST is compiled to a function over NumPy columns, so one constraint is
+checked against a whole semester with a handful of array operations.
+Compiled rules are cached per constraint id and only rebuilt when updated_at
+(or the text) changes.
+
+AST nodes are tuples:
+    ("true",)                       always satisfied
+    ("and", a, b) / ("or", a, b) / ("not", a)
+    ("cmp", field, op, value)       op in == != < <= > >=
+    ("in", field, (values...), negate)
+    ("slots", slot_minutes, break_minutes)
+"""
+import datetime
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+from .group_index import get_hierarchy
+from .permissions import program_of_groups
+from .timeslots import day_index, to_minutes
+
+# University-scope campus targets used by the frontend
+CAMPUS_TARGETS = {"10000": "berlin", "10001": "düsseldorf", "10002": "munich"}
+
+
+class RuleError(ValueError):
+    """rule_text could not be parsed into a checkable rule."""
+
+
+class NotWeekly(RuleError):
+    """The rule is about dates (e.g. holidays), not weekly slots."""
+
+
+# --- fields ---
+
+NUMERIC_FIELDS = {"start", "end", "duration", "capacity", "lecturer", "group", "program"}
+CATEGORY_FIELDS = {"room", "room_type", "location", "module"}
+FIELDS = NUMERIC_FIELDS | CATEGORY_FIELDS | {"day", "has_room"}
+TIME_FIELDS = {"start", "end"}
+
+
+def _coerce(field: str, raw: Any) -> Any:
+    """Turn a literal into the column's domain (day index, minutes, lowercase text)."""
+    text = str(raw).strip()
+    if field == "day":
+        d = day_index(text)
+        if d is None and text.lower().endswith("s"):
+            d = day_index(text[:-1])  # "Fridays"
+        if d is None:
+            raise RuleError(f"Unknown day '{text}'")
+        return d
+    if field == "has_room":
+        if text.lower() not in ("true", "false"):
+            raise RuleError("has_room compares to true/false")
+        return text.lower() == "true"
+    if field in TIME_FIELDS and ":" in text:
+        m = to_minutes(text)
+        if m is None:
+            raise RuleError(f"Invalid time '{text}'")
+        return m
+    if field in NUMERIC_FIELDS:
+        try:
+            return int(float(text))
+        except ValueError:
+            raise RuleError(f"{field} needs a number, got '{text}'")
+    return text.lower()
+
+
+# --- custom expression language ---
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<time>\d{1,2}:\d{2})|(?P<num>\d+(?:\.\d+)?)|(?P<str>'[^']*'|\"[^\"]*\")"
+    r"|(?P<op>==|!=|<=|>=|<|>|=|\(|\)|\[|\]|,)|(?P<word>[A-Za-zÀ-ÿ_][\w\-äöüÄÖÜß]*))"
+)
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    pos, out = 0, []
+    text = text.strip().rstrip(".")
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise RuleError(f"Unexpected input at '{text[pos:pos + 10]}'")
+        pos = m.end()
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "str":
+            value = value[1:-1]
+        elif kind == "word" and value.lower() in ("and", "or", "not", "in"):
+            kind, value = "kw", value.lower()
+        out.append((kind, value))
+    return out
+
+
+class _Parser:
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self, value: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        if self.i >= len(self.tokens):
+            return None
+        tok = self.tokens[self.i]
+        if value is not None and (tok[0] not in ("kw", "op") or tok[1] != value):
+            return None
+        return tok
+
+    def take(self, value: Optional[str] = None) -> Tuple[str, str]:
+        tok = self.peek(value)
+        if tok is None:
+            raise RuleError(f"Expected '{value}'" if value else "Unexpected end of rule")
+        self.i += 1
+        return tok
+
+    def parse(self):
+        node = self.expr()
+        if self.peek() is not None:
+            raise RuleError(f"Unexpected '{self.peek()[1]}'")
+        return node
+
+    def expr(self):
+        node = self.conj()
+        while self.peek("or"):
+            self.take()
+            node = ("or", node, self.conj())
+        return node
+
+    def conj(self):
+        node = self.neg()
+        while self.peek("and"):
+            self.take()
+            node = ("and", node, self.neg())
+        return node
+
+    def neg(self):
+        if self.peek("not"):
+            self.take()
+            return ("not", self.neg())
+        if self.peek("("):
+            self.take()
+            node = self.expr()
+            self.take(")")
+            return node
+        return self.comparison()
+
+    def value(self, field: str):
+        kind, raw = self.take()
+        if kind not in ("time", "num", "str", "word"):
+            raise RuleError(f"Expected a value, got '{raw}'")
+        return _coerce(field, raw)
+
+    def comparison(self):
+        kind, field = self.take()
+        field = field.lower()
+        if kind != "word" or field not in FIELDS:
+            raise RuleError(f"Unknown field '{field}'")
+        if self.peek("not"):
+            self.take()
+            self.take("in")
+            return ("in", field, self.values(field), True)
+        if self.peek("in"):
+            self.take()
+            return ("in", field, self.values(field), False)
+        kind, op = self.take()
+        if kind != "op" or op not in ("==", "=", "!=", "<", "<=", ">", ">="):
+            raise RuleError(f"Expected a comparison after '{field}'")
+        op = "==" if op == "=" else op
+        if op not in ("==", "!=") and field in CATEGORY_FIELDS | {"has_room"}:
+            raise RuleError(f"{field} only supports == and !=")
+        return ("cmp", field, op, self.value(field))
+
+    def values(self, field: str) -> tuple:
+        self.take("[")
+        out = [self.value(field)]
+        while self.peek(","):
+            self.take()
+            out.append(self.value(field))
+        self.take("]")
+        return tuple(out)
+
+
+# --- builder sentences ---
+
+_SENTENCES: List[Tuple[re.Pattern, Callable[[re.Match], tuple]]] = []
+
+
+def _sentence(pattern: str):
+    def register(fn):
+        _SENTENCES.append((re.compile(pattern, re.IGNORECASE), fn))
+        return fn
+    return register
+
+
+@_sentence(r"^.+? is open on:\s*(.*?)\.?$")
+def _open_days(m):
+    names = [d.strip() for d in m.group(1).split(",") if d.strip()]
+    if names == ["No Days"]:
+        names = []
+    return ("in", "day", tuple(_coerce("day", d) for d in names), False)
+
+
+@_sentence(r"^.+? is open from (\d{1,2}:\d{2}) to (\d{1,2}:\d{2})\.?$")
+def _open_hours(m):
+    return ("and", ("cmp", "start", ">=", _coerce("start", m.group(1))),
+            ("cmp", "end", "<=", _coerce("end", m.group(2))))
+
+
+@_sentence(r"^Holiday '.*' is from .* to .*\.?$")
+def _holiday(m):
+    raise NotWeekly("Holiday rules cancel dated occurrences, they do not restrict weekly slots")
+
+
+@_sentence(r"^Standard lecture slots are (\d+) minutes long with a (\d+) minute break\.?$")
+def _slots(m):
+    return ("slots", int(m.group(1)), int(m.group(2)))
+
+
+@_sentence(r"^.+? must be conducted ([\w\s-]+?)\.?$")
+def _delivery(m):
+    mode = m.group(1).strip().lower()
+    if mode in ("online", "remote"):
+        return ("cmp", "has_room", "==", False)
+    if mode in ("onsite", "in person", "on-site"):
+        return ("cmp", "has_room", "==", True)
+    if mode == "hybrid":
+        return ("true",)
+    raise RuleError(f"Unknown delivery mode '{m.group(1)}'")
+
+
+@_sentence(r"^.+? has a specific duration of (\d+) minutes\.?$")
+def _duration(m):
+    return ("cmp", "duration", "==", int(m.group(1)))
+
+
+@_sentence(r"^.+? is unavailable on ([A-Za-z]+)\.?$")
+def _unavailable(m):
+    return ("cmp", "day", "!=", _coerce("day", m.group(1)))
+
+
+def parse_rule(text: Optional[str]) -> tuple:
+    text = (text or "").strip()
+    if not text:
+        raise RuleError("Empty rule")
+    for pattern, build in _SENTENCES:
+        m = pattern.match(text)
+        if m:
+            return build(m)
+    return _Parser(_tokenize(text)).parse()
+
+
+# --- columns + compilation ---
+
+class EntryTable:
+    """A semester's schedule entries as parallel NumPy columns."""
+
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+        self.n = len(rows)
+        self.cols: Dict[str, np.ndarray] = {}
+        self.vocab: Dict[str, Dict[str, int]] = {}
+
+        def ints(key):
+            return np.array([r[key] if r[key] is not None else -1 for r in rows], dtype=np.int64)
+
+        for f in ("day", "start", "end", "capacity", "lecturer", "group", "program", "room_id"):
+            self.cols[f] = ints(f)
+        self.cols["duration"] = np.where(
+            (self.cols["start"] >= 0) & (self.cols["end"] > self.cols["start"]),
+            self.cols["end"] - self.cols["start"], -1,
+        )
+        self.cols["has_room"] = self.cols["room_id"] >= 0
+        for f in CATEGORY_FIELDS:
+            vocab: Dict[str, int] = {}
+            self.cols[f] = np.array(
+                [vocab.setdefault((r[f] or "").strip().lower(), len(vocab)) for r in rows], dtype=np.int64
+            )
+            self.vocab[f] = vocab
+
+    def code(self, field: str, value: str) -> int:
+        return self.vocab[field].get(value, -2)
+
+
+Predicate = Callable[[EntryTable], np.ndarray]
+
+_OPS = {
+    "==": np.equal, "!=": np.not_equal,
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+}
+
+
+def compile_rule(node: tuple) -> Predicate:
+    kind = node[0]
+    if kind == "true":
+        return lambda t: np.ones(t.n, dtype=bool)
+    if kind in ("and", "or"):
+        a, b = compile_rule(node[1]), compile_rule(node[2])
+        if kind == "and":
+            return lambda t: a(t) & b(t)
+        return lambda t: a(t) | b(t)
+    if kind == "not":
+        a = compile_rule(node[1])
+        return lambda t: ~a(t)
+    if kind == "cmp":
+        _, field, op, value = node
+        fn = _OPS[op]
+        if field in CATEGORY_FIELDS:
+            return lambda t: fn(t.cols[field], t.code(field, value))
+        if field in NUMERIC_FIELDS or field == "day":
+            # unknown values (-1) can't be judged and never count as violations
+            return lambda t: (t.cols[field] < 0) | fn(t.cols[field], value)
+        return lambda t: fn(t.cols[field], value)
+    if kind == "in":
+        _, field, values, negate = node
+        if field in CATEGORY_FIELDS:
+            hit = lambda t: np.isin(t.cols[field], [t.code(field, v) for v in values])
+            return (lambda t: ~hit(t)) if negate else hit
+        arr = np.array(values, dtype=np.int64)
+        if negate:
+            return lambda t: ~np.isin(t.cols[field], arr)
+        return lambda t: (t.cols[field] < 0) | np.isin(t.cols[field], arr)
+    if kind == "slots":
+        _, slot, brk = node
+        # one or more back-to-back slots: n*slot + (n-1)*break
+        return lambda t: (t.cols["duration"] < 0) | (
+            (t.cols["duration"] >= slot) & ((t.cols["duration"] + brk) % (slot + brk) == 0)
+        )
+    raise RuleError(f"Unknown node {kind}")
+
+
+class CompiledRule:
+    def __init__(self, key: tuple, ast: Optional[tuple], predicate: Optional[Predicate], error: Optional[str],
+                 weekly: bool = True):
+        self.key = key
+        self.ast = ast
+        self.predicate = predicate
+        self.error = error
+        self.weekly = weekly
+
+
+class RuleCache:
+    """Compiled rules per constraint id, rebuilt only when updated_at or the text change."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules: Dict[int, CompiledRule] = {}
+        self.compiles = 0
+
+    def get(self, c: models.SchedulerConstraint) -> CompiledRule:
+        key = (c.updated_at, c.rule_text)
+        with self._lock:
+            hit = self._rules.get(c.id)
+            if hit is not None and hit.key == key:
+                return hit
+        try:
+            ast = parse_rule(c.rule_text)
+            rule = CompiledRule(key, ast, compile_rule(ast), None)
+        except NotWeekly as e:
+            rule = CompiledRule(key, None, None, str(e), weekly=False)
+        except RuleError as e:
+            rule = CompiledRule(key, None, None, f"Not a checkable rule: {e}")
+        with self._lock:
+            self._rules[c.id] = rule
+            self.compiles += 1
+        return rule
+
+    def prune(self, live_ids):
+        with self._lock:
+            for cid in list(self._rules):
+                if cid not in live_ids:
+                    del self._rules[cid]
+
+
+rule_cache = RuleCache()
+
+
+# --- evaluation ---
+
+def entry_rows(db: Session, semester: str) -> List[dict]:
+    entries = (
+        db.query(models.ScheduleEntry)
+        .filter(models.ScheduleEntry.semester == semester)
+        .options(
+            joinedload(models.ScheduleEntry.offered_module).joinedload(models.OfferedModule.module),
+            joinedload(models.ScheduleEntry.room),
+        )
+        .all()
+    )
+    rows = []
+    for e in entries:
+        offer = e.offered_module
+        module = offer.module if offer else None
+        room = e.room
+        rows.append({
+            "id": e.id,
+            "day": day_index(e.day_of_week),
+            "start": to_minutes(e.start_time),
+            "end": to_minutes(e.end_time),
+            "room_id": e.room_id,
+            "room": room.name if room else None,
+            "room_type": room.type if room else None,
+            "capacity": room.capacity if room else None,
+            "location": room.location if room else None,
+            "module": offer.module_code if offer else None,
+            "lecturer": offer.lecturer_id if offer else None,
+            "group": e.group_id,
+            "program": module.program_id if module else None,
+            # for reporting
+            "day_of_week": e.day_of_week,
+            "start_time": e.start_time,
+            "end_time": e.end_time,
+        })
+    return rows
+
+
+class ScopeResolver:
+    """Which entries a (scope, target_id) pair covers, as boolean masks over an EntryTable."""
+
+    def __init__(self, db: Session, table: EntryTable):
+        self.db = db
+        self.table = table
+        self._group_programs: Optional[Dict[int, int]] = None
+        self._hierarchy = None
+
+    def mask(self, scope: Optional[str], target_id: Optional[str]) -> np.ndarray:
+        t = self.table
+        scope = (scope or "").strip().lower()
+        target = str(target_id if target_id is not None else "0").strip()
+        everything = np.ones(t.n, dtype=bool)
+        if scope == "university":
+            if target in CAMPUS_TARGETS:
+                return t.cols["location"] == t.code("location", CAMPUS_TARGETS[target])
+            return everything
+        if target in ("", "0"):
+            return everything
+        if scope == "module":
+            return t.cols["module"] == t.code("module", target.lower())
+        if not target.isdigit():
+            return np.zeros(t.n, dtype=bool)
+        tid = int(target)
+        if scope == "lecturer":
+            return t.cols["lecturer"] == tid
+        if scope == "room":
+            return t.cols["room_id"] == tid
+        if scope == "program":
+            return t.cols["program"] == tid
+        if scope == "group":
+            if self._hierarchy is None:
+                self._hierarchy = get_hierarchy(self.db)
+            related = np.array(sorted(self._hierarchy.related(tid)), dtype=np.int64)
+            if self._group_programs is None:
+                self._group_programs = program_of_groups(self.db)
+            pid = self._group_programs.get(tid, -2)
+            # group-specific entries of this group's family, plus untargeted entries of its program
+            return np.isin(t.cols["group"], related) | ((t.cols["group"] < 0) & (t.cols["program"] == pid))
+        return np.zeros(t.n, dtype=bool)
+
+
+def in_window(c: models.SchedulerConstraint, start: Optional[datetime.date], end: Optional[datetime.date]) -> bool:
+    if start is not None and c.valid_to is not None and c.valid_to < start:
+        return False
+    if end is not None and c.valid_from is not None and c.valid_from > end:
+        return False
+    return True
+
+
+def evaluate(db: Session, semester: str) -> dict:
+    sem = db.query(models.Semester).filter(models.Semester.name == semester).first()
+    sem_start = sem.start_date if sem else None
+    sem_end = sem.end_date if sem else None
+
+    constraints = db.query(models.SchedulerConstraint).order_by(models.SchedulerConstraint.id).all()
+    rule_cache.prune({c.id for c in constraints})
+
+    table = EntryTable(entry_rows(db, semester))
+    scopes = ScopeResolver(db, table)
+
+    results = []
+    for c in constraints:
+        if not c.is_enabled or not in_window(c, sem_start, sem_end):
+            continue
+        rule = rule_cache.get(c)
+        item = {
+            "id": c.id, "name": c.name, "category": c.category, "scope": c.scope, "target_id": c.target_id,
+            "rule_text": c.rule_text, "checked": 0, "violations": [],
+        }
+        if rule.predicate is None:
+            item["status"] = "skipped"
+            item["reason"] = rule.error
+            results.append(item)
+            continue
+
+        in_scope = scopes.mask(c.scope, c.target_id)
+        bad = in_scope & ~rule.predicate(table)
+        item["checked"] = int(in_scope.sum())
+        item["violations"] = [
+            {
+                "entry_id": table.rows[i]["id"],
+                "module_code": table.rows[i]["module"],
+                "room_name": table.rows[i]["room"],
+                "day_of_week": table.rows[i]["day_of_week"],
+                "start_time": table.rows[i]["start_time"],
+                "end_time": table.rows[i]["end_time"],
+            }
+            for i in np.flatnonzero(bad)
+        ]
+        item["status"] = "violated" if item["violations"] else "ok"
+        results.append(item)
+
+    return {
+        "semester": semester,
+        "entries": table.n,
+        "evaluated": sum(1 for r in results if r["status"] != "skipped"),
+        "violated": sum(1 for r in results if r["status"] == "violated"),
+        "constraints": results,
+    }
@@ -0,0 +1,149 @@
+# api/constraint_index.py
+"""
+Lookup structure for "which constraints are active on date D for scope S / target T".
+
+Enabled constraints are grouped by a typed (scope, target) key - target_id is
+stored as text, here numeric ids become ints and module codes stay lowercase
+strings - and every group keeps a centered interval tree over its validity
+windows (open ends = unbounded). A stabbing query is O(log n + k).
+
+The whole index is rebuilt lazily after any committed constraint write
+(reported through the change feed).
+"""
+import datetime
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from . import models, schemas, changes
+
+Target = Union[int, str]
+
+_MIN = datetime.date.min.toordinal()
+_MAX = datetime.date.max.toordinal()
+
+
+def norm_scope(scope: Optional[str]) -> str:
+    return (scope or "").strip().lower()
+
+
+def norm_target(target_id) -> Target:
+    """'12' -> 12, 'M1' -> 'm1', None/'' -> 0 (all targets)."""
+    text = str(target_id if target_id is not None else "").strip()
+    if not text:
+        return 0
+    if text.lstrip("-").isdigit():
+        return int(text)
+    return text.lower()
+
+
+class _IntervalTree:
+    """Centered interval tree over closed [lo, hi] day ordinals."""
+
+    __slots__ = ("center", "by_lo", "by_hi", "left", "right")
+
+    def __init__(self, items: List[Tuple[int, int, int]]):
+        points = sorted(p for lo, hi, _ in items for p in (lo, hi))
+        self.center = points[len(points) // 2]
+        here = [it for it in items if it[0] <= self.center <= it[1]]
+        self.by_lo = sorted(here, key=lambda it: it[0])
+        self.by_hi = sorted(here, key=lambda it: -it[1])
+        left = [it for it in items if it[1] < self.center]
+        right = [it for it in items if it[0] > self.center]
+        self.left = _IntervalTree(left) if left else None
+        self.right = _IntervalTree(right) if right else None
+
+    def stab(self, x: int, out: List[int]):
+        node = self
+        while node is not None:
+            if x < node.center:
+                for lo, _, cid in node.by_lo:
+                    if lo > x:
+                        break
+                    out.append(cid)
+                node = node.left
+            elif x > node.center:
+                for _, hi, cid in node.by_hi:
+                    if hi < x:
+                        break
+                    out.append(cid)
+                node = node.right
+            else:
+                out.extend(cid for _, _, cid in node.by_lo)
+                return
+
+
+class ConstraintIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.rows: Dict[int, dict] = {}
+        self.by_key: Dict[Tuple[str, Target], _IntervalTree] = {}
+        self.by_scope: Dict[str, _IntervalTree] = {}
+        self.all: Optional[_IntervalTree] = None
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded = False
+
+    def ensure_loaded(self, db: Session) -> "ConstraintIndex":
+        with self._lock:
+            if self.loaded:
+                return self
+            rows = db.query(models.SchedulerConstraint).filter(models.SchedulerConstraint.is_enabled.is_(True)).all()
+            self.rows = {}
+            keyed: Dict[Tuple[str, Target], list] = {}
+            scoped: Dict[str, list] = {}
+            everything = []
+            for r in rows:
+                lo = r.valid_from.toordinal() if r.valid_from else _MIN
+                hi = r.valid_to.toordinal() if r.valid_to else _MAX
+                if hi < lo:
+                    continue
+                item = (lo, hi, r.id)
+                scope = norm_scope(r.scope)
+                keyed.setdefault((scope, norm_target(r.target_id)), []).append(item)
+                scoped.setdefault(scope, []).append(item)
+                everything.append(item)
+                self.rows[r.id] = schemas.SchedulerConstraintResponse.model_validate(r).model_dump()
+            self.by_key = {k: _IntervalTree(v) for k, v in keyed.items()}
+            self.by_scope = {k: _IntervalTree(v) for k, v in scoped.items()}
+            self.all = _IntervalTree(everything) if everything else None
+            self.loaded = True
+            return self
+
+    def active(self, on: datetime.date, scope: Optional[str] = None, target=None) -> List[dict]:
+        """
+        Constraints valid on `on`. With a target, the scope's catch-all rules
+        (target "0") are included too, since they apply to that target as well.
+        """
+        x = on.toordinal()
+        ids: List[int] = []
+        with self._lock:
+            if scope is None:
+                trees = [self.all]
+            elif target is None:
+                trees = [self.by_scope.get(norm_scope(scope))]
+            else:
+                s, t = norm_scope(scope), norm_target(target)
+                trees = [self.by_key.get((s, t))]
+                if t != 0:
+                    trees.append(self.by_key.get((s, 0)))
+            for tree in trees:
+                if tree is not None:
+                    tree.stab(x, ids)
+            return [self.rows[cid] for cid in sorted(set(ids))]
+
+
+constraint_index = ConstraintIndex()
+
+
+def get_constraint_index(db: Session) -> ConstraintIndex:
+    return constraint_index.ensure_loaded(db)
+
+
+@changes.subscribe
+def _on_changes(batch: List[dict]):
+    if any(c["entity"] == "scheduler_constraints" for c in batch):
+        constraint_index.invalidate()
@@ -0,0 +1,72 @@
+# api/equipment.py
+"""
+Equipment vocabulary.
+
+Room.equipment stays free text for display; what rooms have and what modules
+need is also stored as a bitmask over this vocabulary (Room.equipment_mask,
+Module.required_equipment_mask), so "has everything the module needs" is
+`room_mask & need == need`.
+
+Bits are persisted: only ever append to VOCABULARY, never reorder or remove.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (key, synonyms matched as whole words in free text)
+VOCABULARY: List[Tuple[str, Tuple[str, ...]]] = [
+    ("projector", ("projector", "beamer", "projection")),
+    ("whiteboard", ("whiteboard", "white board")),
+    ("smartboard", ("smartboard", "smart board", "interactive whiteboard", "interactive board")),
+    ("blackboard", ("blackboard", "chalkboard", "black board")),
+    ("lab_pcs", ("lab pcs", "lab pc", "pcs", "pc", "computers", "computer", "workstations", "pc pool")),
+    ("screen", ("screen", "display", "monitor", "tv")),
+    ("sound_system", ("sound system", "speakers", "speaker", "audio")),
+    ("microphone", ("microphone", "microphones", "mic")),
+    ("video_conferencing", ("video conferencing", "videoconference", "webcam", "camera", "zoom")),
+    ("document_camera", ("document camera", "visualizer")),
+    ("3d_printer", ("3d printer", "3d printers")),
+    ("vr", ("vr", "vr headsets", "virtual reality")),
+    ("green_screen", ("green screen", "greenscreen")),
+    ("drawing_tablets", ("drawing tablets", "drawing tablet", "graphic tablets", "wacom")),
+]
+
+BITS: Dict[str, int] = {key: 1 << i for i, (key, _) in enumerate(VOCABULARY)}
+
+# longest synonyms first, so "interactive whiteboard" wins over "whiteboard"
+_SYNONYMS = sorted(
+    ((syn, key) for key, syns in VOCABULARY for syn in syns),
+    key=lambda s: -len(s[0]),
+)
+_PATTERN = re.compile(
+    r"(?<![\w])(" + "|".join(re.escape(s) for s, _ in _SYNONYMS) + r")(?![\w])",
+    re.IGNORECASE,
+)
+_BY_SYNONYM = {s: key for s, key in _SYNONYMS}
+
+
+def parse_mask(text: Optional[str]) -> int:
+    """Free-text equipment ('Beamer, Whiteboard; 20 Lab PCs') -> bitmask. Unknown words are ignored."""
+    mask = 0
+    for m in _PATTERN.finditer(text or ""):
+        mask |= BITS[_BY_SYNONYM[m.group(1).lower()]]
+    return mask
+
+
+def mask_of(keys: Optional[Iterable[str]]) -> int:
+    """Vocabulary keys -> bitmask. Raises ValueError listing unknown keys."""
+    mask, unknown = 0, []
+    for k in keys or []:
+        k = (k or "").strip().lower()
+        if not k:
+            continue
+        if k in BITS:
+            mask |= BITS[k]
+        else:
+            unknown.append(k)
+    if unknown:
+        raise ValueError(f"Unknown equipment: {unknown}")
+    return mask
+
+
+def keys_of(mask: Optional[int]) -> List[str]:
+    return [key for key, _ in VOCABULARY if (mask or 0) & BITS[key]]
@@ -0,0 +1,85 @@
+# api/events.py
+"""
+In-process fan-out of committed changes to live viewers (server-sent events).
+
+Every committed ChangeLog record (see api/changes.py) is pushed once into the
+bounded queue of each connected client of the same semester. A client that
+falls behind does not hold memory: its queue is dropped and replaced by a
+single "resync" event, after which it catches up with GET /changes?since=.
+
+Only viewers connected to this process are reached; with several instances
+each one fans out its own writes and clients fall back to /changes on resync.
+"""
+import asyncio
+import itertools
+import threading
+from typing import Dict, Optional
+
+from . import changes
+
+QUEUE_SIZE = 200
+MAX_SUBSCRIBERS = 500
+
+
+class Subscriber:
+    def __init__(self, sid: int, semester: Optional[str], loop: asyncio.AbstractEventLoop):
+        self.id = sid
+        self.semester = semester
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = 0
+
+    def wants(self, semester: Optional[str]) -> bool:
+        return self.semester is None or semester is None or semester == self.semester
+
+    def offer(self, event: dict):
+        # runs on the subscriber's event loop
+        if self.queue.full():
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync", "seq": event.get("seq"), "dropped": self.dropped})
+            return
+        self.queue.put_nowait(event)
+
+
+class EventHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: Dict[int, Subscriber] = {}
+        self._ids = itertools.count(1)
+
+    def subscribe(self, semester: Optional[str]) -> Optional[Subscriber]:
+        with self._lock:
+            if len(self._subs) >= MAX_SUBSCRIBERS:
+                return None
+            sub = Subscriber(next(self._ids), semester, asyncio.get_running_loop())
+            self._subs[sub.id] = sub
+            return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self._subs.pop(sub.id, None)
+
+    def publish(self, event: dict, semester: Optional[str] = None):
+        """Thread-safe; called from sync route handlers after commit."""
+        with self._lock:
+            targets = [s for s in self._subs.values() if s.wants(semester)]
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                # loop already closed, client is gone
+                self.unsubscribe(sub)
+
+    def __len__(self):
+        return len(self._subs)
+
+
+hub = EventHub()
+
+
+@changes.subscribe
+def _publish_changes(records):
+    for r in records:
+        hub.publish({"type": "change", **r}, r.get("semester"))
@@ -0,0 +1,169 @@
+# api/feasibility.py
+"""
+Cheap necessary conditions for a semester to fit, checked before any placing.
+
+Demand is weekly hours per offering: the sum of its entries (one aggregate
+query), or DEFAULT_OFFERING_HOURS if it has none yet. Supply is measured in
+the window the search places into (timetable_search.TEACHING_DAYS,
+DAY_START..DAY_END). Each check is a cut bound of the placement flow network,
+so any failure means no timetable exists, while passing everything does not
+guarantee one:
+- room types: demand of a type <= hours of its active rooms
+- lecturers: assigned hours <= available hours inside the window
+- groups: hours every leaf group must attend (own, ancestors', program-wide) <= window hours
+
+Seats are only a soft constraint for the search (a too-small room is
+penalised, not forbidden), so the nested seat bound - for every threshold c,
+demand needing >= c seats <= hours of rooms with >= c seats - is reported
+as a warning and does not make the semester infeasible.
+"""
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .group_index import get_hierarchy
+from .permissions import program_of_groups
+from .room_analytics import program_attendance
+from .timeslots import DEFAULT_OFFERING_HOURS, SLOT_MINUTES, SLOTS_PER_DAY, availability_mask, mask_from_bytes
+from .timetable_search import DAY_END, DAY_START, TEACHING_DAYS
+from .workload import sql_minutes
+
+WINDOW_HOURS = TEACHING_DAYS * (DAY_END - DAY_START) * SLOT_MINUTES / 60.0
+_WINDOW_MASK = sum(((1 << (DAY_END - DAY_START)) - 1) << (d * SLOTS_PER_DAY + DAY_START) for d in range(TEACHING_DAYS))
+
+
+def _norm(text) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _check(kind: str, key, name: str, demand: float, supply: float, **extra) -> dict:
+    return {"kind": kind, "id": key, "name": name, "demand_hours": round(demand, 2),
+            "supply_hours": round(supply, 2), "slack_hours": round(supply - demand, 2), "ok": demand <= supply + 1e-9,
+            **extra}
+
+
+def semester_feasibility(db: Session, semester: str) -> dict:
+    E, O, M = models.ScheduleEntry, models.OfferedModule, models.Module
+
+    # hours per (offering, group) in one aggregate query
+    scheduled = (
+        db.query(E.offered_module_id, E.group_id, func.sum(sql_minutes(E.end_time) - sql_minutes(E.start_time)))
+        .filter(E.semester == semester)
+        .group_by(E.offered_module_id, E.group_id)
+        .all()
+    )
+    offers = (
+        db.query(O.id, O.lecturer_id, M.room_type, M.program_id, M.semester)
+        .join(M, O.module_code == M.module_code)
+        .filter(O.semester == semester)
+        .all()
+    )
+    offer = {o.id: o for o in offers}
+
+    # demand blocks: (offer id, group id or None, hours)
+    blocks: List[Tuple[int, object, float]] = [
+        (oid, gid, (minutes or 0) / 60.0) for oid, gid, minutes in scheduled if oid in offer
+    ]
+    has_entries = {oid for oid, _, _ in blocks}
+    blocks += [(o.id, None, DEFAULT_OFFERING_HOURS) for o in offers if o.id not in has_entries]
+
+    h = get_hierarchy(db)
+    groups = db.query(models.Group.id, models.Group.name, models.Group.size).all()
+    group_size = {g.id: g.size or 0 for g in groups}
+    group_program = program_of_groups(db)
+    attendance = program_attendance(db)
+
+    # --- rooms: per type, with nested seat thresholds ---
+    rooms = db.query(models.Room.type, models.Room.capacity).filter(models.Room.status.is_(True)).all()
+    caps_by_type: Dict[str, List[int]] = {}
+    for t, cap in rooms:
+        caps_by_type.setdefault(_norm(t), []).append(cap or 0)
+    need_by_type: Dict[str, List[Tuple[int, float]]] = {}
+    for oid, gid, hours in blocks:
+        o = offer[oid]
+        seats = group_size.get(gid, 0) if gid is not None else attendance.get(o.program_id, 0)
+        need_by_type.setdefault(_norm(o.room_type), []).append((seats, hours))
+
+    room_checks = []
+    for t in sorted(set(caps_by_type) | set(need_by_type)):
+        caps = sorted(caps_by_type.get(t, []), reverse=True)
+        needs = sorted(need_by_type.get(t, []), reverse=True)
+        demand = sum(hrs for _, hrs in needs)
+        worst = None
+        # largest rooms first: needs of >= c seats can only use rooms of >= c seats
+        i, big_demand = 0, 0.0
+        for seats, hrs in needs:
+            big_demand += hrs
+            while i < len(caps) and caps[i] >= seats:
+                i += 1
+            supply = i * WINDOW_HOURS
+            if big_demand > supply + 1e-9 and (worst is None or big_demand - supply > worst["deficit_hours"]):
+                worst = {"seats": seats, "demand_hours": round(big_demand, 2), "supply_hours": supply,
+                         "deficit_hours": round(big_demand - supply, 2)}
+        room_checks.append(_check("room_type", t or None, t or "(none)", demand, len(caps) * WINDOW_HOURS,
+                                  rooms=len(caps), seat_bottleneck=worst))
+
+    # --- lecturers: assigned hours vs available hours in the window ---
+    assigned: Dict[int, float] = {}
+    unassigned_hours = 0.0
+    for oid, _, hours in blocks:
+        lid = offer[oid].lecturer_id
+        if lid is None:
+            unassigned_hours += hours
+        else:
+            assigned[lid] = assigned.get(lid, 0.0) + hours
+    lecturer_checks = []
+    if assigned:
+        A, L = models.LecturerAvailability, models.Lecturer
+        avail = {
+            lid: mask_from_bytes(bitmap) if bitmap is not None else availability_mask(data)
+            for lid, bitmap, data in db.query(A.lecturer_id, A.slot_bitmap, A.schedule_data)
+            .filter(A.lecturer_id.in_(assigned)).all()
+        }
+        names = {lid: f"{first} {last or ''}".strip()
+                 for lid, first, last in db.query(L.id, L.first_name, L.last_name).filter(L.id.in_(assigned)).all()}
+        for lid in sorted(assigned):
+            # no availability recorded = free all week, like the search assumes
+            mask = avail.get(lid, _WINDOW_MASK) & _WINDOW_MASK
+            supply = bin(mask).count("1") * SLOT_MINUTES / 60.0
+            lecturer_checks.append(_check("lecturer", lid, names.get(lid, str(lid)), assigned[lid], supply,
+                                          availability_recorded=lid in avail))
+
+    # --- groups: every leaf sits through its own, its ancestors' and its program's blocks ---
+    targeted: Dict[int, float] = {}
+    program_wide: Dict[int, float] = {}
+    for oid, gid, hours in blocks:
+        if gid is not None:
+            targeted[gid] = targeted.get(gid, 0.0) + hours
+        elif offer[oid].program_id is not None:
+            pid = offer[oid].program_id
+            program_wide[pid] = program_wide.get(pid, 0.0) + hours
+    leaf_demand: Dict[int, float] = {}
+    for g in groups:
+        if not h.descendants(g.id):
+            leaf_demand[g.id] = sum(targeted.get(x, 0.0) for x in h.lineage(g.id)) \
+                + program_wide.get(group_program.get(g.id), 0.0)
+    group_checks = []
+    for g in groups:
+        below = [x for x in (h.descendants(g.id) | {g.id}) if x in leaf_demand]
+        demand = max((leaf_demand[x] for x in below), default=0.0)
+        if demand:
+            group_checks.append(_check("group", g.id, g.name, demand, WINDOW_HOURS))
+
+    checks = room_checks + lecturer_checks + group_checks
+    bottlenecks = sorted((c for c in checks if not c["ok"]), key=lambda c: c["slack_hours"])
+    return {
+        "semester": semester,
+        "feasible": not bottlenecks,
+        "window_hours": WINDOW_HOURS,
+        "offerings": len(offers),
+        "demand_hours": round(sum(hrs for _, _, hrs in blocks), 2),
+        "unassigned_hours": round(unassigned_hours, 2),
+        "bottlenecks": bottlenecks,
+        "warnings": [c for c in room_checks if c["ok"] and c["seat_bottleneck"]],
+        "room_types": room_checks,
+        "lecturers": lecturer_checks,
+        "groups": group_checks,
+    }
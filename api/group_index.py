@@ -0,0 +1,234 @@
+# api/group_index.py
+"""
+Ancestor/descendant closure over student groups.
+
+Group.parent_group stores the *name* of the parent, so resolving "which groups
+share students with X" used to mean walking all groups every time. This keeps a
+process-wide closure (id -> frozenset of ancestors / descendants) that is built
+from the DB and then patched by the groups router on create/update/delete,
+so lookups are a dict access. It is keyed on the change_log version of
+"groups" (changes.version), so group writes handled by another process make
+the next get_hierarchy() rebuild it.
+
+When several groups share a name, the one with the lowest id is the parent.
+"""
+import threading
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models, changes
+
+_EMPTY: FrozenSet[int] = frozenset()
+
+
+def _norm(name: Optional[str]) -> str:
+    return (name or "").strip().lower()
+
+
+class GroupHierarchy:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.version: Optional[Tuple[int, int]] = None  # changes.version of "groups" when loaded
+        self._clear()
+
+    def _clear(self):
+        self.name: Dict[int, str] = {}
+        self.parent_name: Dict[int, str] = {}
+        self.parent: Dict[int, Optional[int]] = {}
+        self.by_name: Dict[str, Set[int]] = {}
+        self.waiting: Dict[str, Set[int]] = {}  # parent name -> groups that point at it
+        self.anc: Dict[int, FrozenSet[int]] = {}
+        self.desc: Dict[int, FrozenSet[int]] = {}
+        self.broken: Set[int] = set()  # parent link dropped because it would loop
+
+    # --- loading ---
+
+    def load(self, rows: Iterable[Tuple[int, Optional[str], Optional[str]]]):
+        with self._lock:
+            self._clear()
+            for gid, name, parent_name in rows:
+                self._register(gid, name, parent_name)
+            for gid in self.name:
+                self.anc[gid] = _EMPTY
+                self.desc[gid] = _EMPTY
+            for gid in sorted(self.name):
+                self._attach(gid, self._resolve(gid))
+            self.loaded = True
+
+    def ensure_loaded(self, db: Session) -> "GroupHierarchy":
+        # read before the rows: a write racing the load only costs another reload
+        version = changes.version(db, ("groups",))
+        if not self.loaded or version != self.version:
+            rows = db.query(models.Group.id, models.Group.name, models.Group.parent_group).all()
+            self.load(rows)
+            self.version = version
+        return self
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+            self.loaded = False
+            self.version = None
+
+    # --- lookups (O(1)) ---
+
+    def ancestors(self, gid: int) -> FrozenSet[int]:
+        return self.anc.get(gid, _EMPTY)
+
+    def descendants(self, gid: int) -> FrozenSet[int]:
+        return self.desc.get(gid, _EMPTY)
+
+    def lineage(self, gid: int) -> FrozenSet[int]:
+        """The group itself and every group above it."""
+        return self.anc.get(gid, _EMPTY) | {gid}
+
+    def related(self, gid: int) -> FrozenSet[int]:
+        """Every group sharing students with gid: itself, its ancestors and its descendants."""
+        return self.anc.get(gid, _EMPTY) | self.desc.get(gid, _EMPTY) | {gid}
+
+    def would_cycle(self, gid: Optional[int], name: Optional[str], parent_name: Optional[str]) -> bool:
+        """
+        Would saving gid (None = new group) with this name/parent close a loop?
+        Renaming also re-points groups waiting on the old or new name, so those
+        are re-resolved on an overlay and every affected chain is walked up.
+        """
+        with self._lock:
+            n, pn = _norm(name), _norm(parent_name)
+            me = gid if gid is not None else max(self.name, default=0) + 1
+            old = self.name.get(me)
+            owners_cache: Dict[str, Set[int]] = {}
+
+            def owners(nm: str) -> Set[int]:
+                if nm not in owners_cache:
+                    ids = set(self.by_name.get(nm, ())) - {me}
+                    if nm == n:
+                        ids.add(me)
+                    owners_cache[nm] = ids
+                return owners_cache[nm]
+
+            def resolve(x: int) -> Optional[int]:
+                nm = pn if x == me else self.parent_name.get(x, "")
+                ids = owners(nm) - {x} if nm else ()
+                return min(ids) if ids else None
+
+            affected = {me} | self.waiting.get(n, set())
+            if old:
+                affected |= self.waiting.get(old, set())
+            overlay = {x: resolve(x) for x in affected}
+
+            for x in affected:
+                seen = {x}
+                p = overlay[x]
+                while p is not None:
+                    if p in seen:
+                        return True
+                    seen.add(p)
+                    p = overlay[p] if p in overlay else self.parent.get(p)
+            return False
+
+    # --- incremental maintenance ---
+
+    def upsert(self, gid: int, name: Optional[str], parent_name: Optional[str]):
+        with self._lock:
+            if not self.loaded:
+                return
+            old_name = self.name.get(gid)
+            if gid in self.name:
+                self._unregister(gid)
+            else:
+                self.anc[gid] = _EMPTY
+                self.desc[gid] = _EMPTY
+                self.parent[gid] = None
+            self._register(gid, name, parent_name)
+
+            affected = {gid}
+            for n in {old_name, self.name[gid]}:
+                if n:
+                    affected |= self.waiting.get(n, set())
+            self._reresolve(affected)
+
+    def remove(self, gid: int):
+        with self._lock:
+            if not self.loaded or gid not in self.name:
+                return
+            children = [c for c, p in self.parent.items() if p == gid]
+            name = self.name[gid]
+            self._unregister(gid)
+            self._attach(gid, None)
+            for c in children:
+                self._attach(c, None)
+            self.parent.pop(gid, None)
+            self.anc.pop(gid, None)
+            self.desc.pop(gid, None)
+            # the children (or another group with the same name) pick a new parent
+            self._reresolve(self.waiting.get(name, set()))
+
+    # --- internals ---
+
+    def _register(self, gid: int, name: Optional[str], parent_name: Optional[str]):
+        self.name[gid] = _norm(name)
+        self.parent_name[gid] = _norm(parent_name)
+        self.parent.setdefault(gid, None)
+        self.by_name.setdefault(self.name[gid], set()).add(gid)
+        if self.parent_name[gid]:
+            self.waiting.setdefault(self.parent_name[gid], set()).add(gid)
+
+    def _unregister(self, gid: int):
+        self.by_name.get(self.name[gid], set()).discard(gid)
+        if self.parent_name[gid]:
+            self.waiting.get(self.parent_name[gid], set()).discard(gid)
+        del self.name[gid]
+        del self.parent_name[gid]
+
+    def _resolve_name(self, parent_name: str, exclude: Optional[int] = None) -> Optional[int]:
+        if not parent_name:
+            return None
+        ids = [i for i in self.by_name.get(parent_name, ()) if i != exclude]
+        return min(ids) if ids else None
+
+    def _resolve(self, gid: int) -> Optional[int]:
+        if gid not in self.name:
+            return None
+        p = self._resolve_name(self.parent_name[gid], exclude=gid)
+        # never create a cycle; a broken link is treated as a root
+        if p is not None and (p == gid or p in self.desc.get(gid, _EMPTY)):
+            self.broken.add(gid)
+            return None
+        return p
+
+    def _reresolve(self, ids: Iterable[int]):
+        # links dropped earlier may be valid again after this change; retry them
+        # until a pass attaches nothing new
+        todo = (set(ids) | self.broken) & self.name.keys()
+        while todo:
+            self.broken = set()
+            changed = False
+            for gid in sorted(todo):
+                p = self._resolve(gid)
+                if p != self.parent.get(gid):
+                    self._attach(gid, p)
+                    changed = True
+            todo = set(self.broken) if changed else set()
+
+    def _attach(self, gid: int, new_parent: Optional[int]):
+        """Move gid (with its subtree) under new_parent, patching the closure of affected nodes only."""
+        subtree = self.desc.get(gid, _EMPTY) | {gid}
+        old_up = self.anc.get(gid, _EMPTY)
+        for a in old_up:
+            self.desc[a] = self.desc[a] - subtree
+
+        self.parent[gid] = new_parent
+        new_up = (self.anc.get(new_parent, _EMPTY) | {new_parent}) if new_parent is not None else _EMPTY
+        for s in subtree:
+            self.anc[s] = (self.anc.get(s, _EMPTY) - old_up) | new_up
+        for a in new_up:
+            self.desc[a] = self.desc.get(a, _EMPTY) | subtree
+
+
+hierarchy = GroupHierarchy()
+
+
+def get_hierarchy(db: Session) -> GroupHierarchy:
+    return hierarchy.ensure_loaded(db)
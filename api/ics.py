@@ -0,0 +1,107 @@
+# api/ics.py
+"""
+iCalendar (RFC 5545) output for timetable feeds.
+
+Weekly schedule rows are expanded into one VEVENT per teaching day between the
+semester's start and end date (occurrences.py, so holidays and cancelled
+dates are left out). Everything is produced line by line from
+generators so a feed is streamed, never held as one string.
+"""
+import datetime
+from typing import Iterable, Iterator, Optional
+
+from .timeslots import to_minutes
+
+TZID = "Europe/Berlin"
+
+# Minimal CET/CEST definition so TZID references resolve in every client
+_VTIMEZONE = [
+    "BEGIN:VTIMEZONE",
+    f"TZID:{TZID}",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:+0100",
+    "TZOFFSETTO:+0200",
+    "TZNAME:CEST",
+    "DTSTART:19700329T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:+0200",
+    "TZOFFSETTO:+0100",
+    "TZNAME:CET",
+    "DTSTART:19701025T030000",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+]
+
+
+def escape(text: Optional[str]) -> str:
+    return (
+        (text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    """Fold to 75 octets per physical line (continuations start with a space)."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts = []
+    limit = 75
+    while raw:
+        cut = min(limit, len(raw))
+        # don't split a multi-byte character
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(raw[:cut].decode("utf-8"))
+        raw = raw[cut:]
+        limit = 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _local(d: datetime.date, minutes: int) -> str:
+    return f"{d:%Y%m%d}T{minutes // 60:02d}{minutes % 60:02d}00"
+
+
+def _utc(ts: datetime.datetime) -> str:
+    return f"{ts:%Y%m%dT%H%M%S}Z"
+
+
+def event_lines(row: dict, on: datetime.date, stamp: datetime.datetime) -> Iterator[str]:
+    """VEVENT for one occurrence of a schedule row (as returned by schedule._map_entry)."""
+    s, e = to_minutes(row["start_time"]), to_minutes(row["end_time"])
+    if s is None or e is None or e <= s:
+        return
+    yield "BEGIN:VEVENT"
+    yield f"UID:entry-{row['id']}-{on:%Y%m%d}@icss"
+    yield f"DTSTAMP:{_utc(stamp)}"
+    yield f"DTSTART;TZID={TZID}:{_local(on, s)}"
+    yield f"DTEND;TZID={TZID}:{_local(on, e)}"
+    yield f"SUMMARY:{escape(row['module_name'])}"
+    yield f"LOCATION:{escape(row['room_name'])}"
+    yield f"DESCRIPTION:{escape('Lecturer: ' + row['lecturer_name'])}"
+    yield "END:VEVENT"
+
+
+def calendar(name: str, events: Iterable[str]) -> Iterator[str]:
+    """Wrap event lines into a VCALENDAR and yield folded CRLF lines."""
+    head = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//ICSS//Timetable//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape(name)}",
+        f"X-WR-TIMEZONE:{TZID}",
+    ]
+    for line in head + _VTIMEZONE:
+        yield fold(line)
+    for line in events:
+        yield fold(line)
+    yield fold("END:VCALENDAR")
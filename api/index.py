@@ -5,6 +5,7 @@ import datetime
 
 from .database import engine
 from . import models
+from .migrations import run_migrations
 from .routers.dev import router as dev_router
 from .routers.auth_routes import router as auth_router
 from .routers.programs import router as programs_router
@@ -20,10 +21,20 @@ from .routers.semesters import router as semesters_router
 from .routers.offered_modules import router as offered_modules_router
 from .routers.schedule import router as schedule_router
 from .routers.domains import router as domains_router
+from .routers.changes import router as changes_router
+from .routers.events import router as events_router
+from .routers.batch import router as batch_router
+from .routers.search import router as search_router
+from .routers.typeahead import router as typeahead_router
+from .routers.calendar import router as calendar_router
+from .routers.export import router as export_router
+from .routers.jobs import router as jobs_router
+from .jobs import runner as job_runner
 
 
 try:
     models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     print(" DB connected.")
 except Exception as e:
     print(" DB Startup Error:", e)
@@ -66,3 +77,15 @@ app.include_router(semesters_router)
 
 app.include_router(offered_modules_router)
 app.include_router(schedule_router)
+app.include_router(changes_router)
+app.include_router(events_router)
+app.include_router(batch_router)
+app.include_router(search_router)
+app.include_router(typeahead_router)
+app.include_router(calendar_router)
+app.include_router(export_router)
+app.include_router(analytics_router)
+app.include_router(jobs_router)
+
+# all job kinds are registered once the routers are imported
+job_runner.recover()
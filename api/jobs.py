@@ -0,0 +1,260 @@
+# api/jobs.py
+"""
+Background jobs for work that does not fit in one HTTP request.
+
+Routers register a kind with @runner.register("kind"), a function
+fn(ctx, db, params) -> JSON-able result. POST /jobs/ stores a Job row and
+hands the id to a bounded thread pool; the row carries status, progress and
+the result or error, so clients poll it and it survives restarts:
+recover() (called on startup) re-queues queued jobs and jobs whose process
+died (or fails them, for kinds that must not rerun).
+
+Job functions report with ctx.progress(fraction, message) and should call
+ctx.check() between steps; it raises JobCancelled once a cancel was requested.
+
+A job is claimed with a conditional UPDATE (queued -> running), so it never
+runs twice. Several processes may share the table (uvicorn workers,
+serverless instances): the claim stamps the job with this process as owner,
+a heartbeat thread renews heartbeat_at while it runs, and recovery only takes
+over running jobs whose lease is older than LEASE.
+"""
+import datetime
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from . import models
+from .database import SessionLocal
+
+MAX_WORKERS = 2
+MAX_PENDING = 20  # queued + running jobs accepted by this process
+HEARTBEAT_SECONDS = 15
+LEASE = datetime.timedelta(seconds=90)  # no heartbeat for this long: the owner is gone
+
+# this process, as recorded in Job.owner
+INSTANCE = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _update(job_id: str, only_if: Optional[str] = None, held: bool = False, **fields) -> int:
+    """held: only while this process still owns the job (recovery elsewhere may have taken it over)."""
+    db = SessionLocal()
+    try:
+        q = db.query(models.Job).filter(models.Job.id == job_id)
+        if only_if is not None:
+            q = q.filter(models.Job.status == only_if)
+        if held:
+            q = q.filter(models.Job.owner == INSTANCE)
+        n = q.update(fields, synchronize_session=False)
+        db.commit()
+        return n
+    finally:
+        db.close()
+
+
+class JobContext:
+    def __init__(self, job_id: str, params: dict, cancel: threading.Event):
+        self.job_id = job_id
+        self.params = params
+        self._cancel = cancel
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def progress(self, fraction: float, message: Optional[str] = None):
+        fields: Dict[str, Any] = {"progress": max(0.0, min(1.0, float(fraction))), "heartbeat_at": func.now()}
+        if message is not None:
+            fields["message"] = message[:500]
+        _update(self.job_id, held=True, **fields)
+        # a cancel may have been requested through another process
+        db = SessionLocal()
+        try:
+            if db.query(models.Job.cancel_requested).filter(models.Job.id == self.job_id).scalar():
+                self._cancel.set()
+        finally:
+            db.close()
+        self.check()
+
+
+class JobKind:
+    def __init__(self, fn: Callable[[JobContext, Session, dict], Any], restartable: bool):
+        self.fn = fn
+        self.restartable = restartable
+
+
+class JobRunner:
+    def __init__(self, max_workers: int = MAX_WORKERS, max_pending: int = MAX_PENDING):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.max_pending = max_pending
+        self.kinds: Dict[str, JobKind] = {}
+        self._futures: Dict[str, Future] = {}
+        self._cancel: Dict[str, threading.Event] = {}
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def register(self, kind: str, restartable: bool = True):
+        """restartable=False: a job interrupted by a restart is failed instead of run again."""
+        def deco(fn):
+            self.kinds[kind] = JobKind(fn, restartable)
+            return fn
+        return deco
+
+    # --- submit / cancel ---
+
+    def submit(self, db: Session, kind: str, params: Optional[dict] = None,
+               user_id: Optional[int] = None) -> models.Job:
+        if kind not in self.kinds:
+            raise KeyError(kind)
+        with self._lock:
+            if len(self._futures) >= self.max_pending:
+                raise QueueFull()
+        row = models.Job(id=uuid.uuid4().hex, kind=kind, params=jsonable_encoder(params or {}),
+                         status=QUEUED, progress=0.0, created_by=user_id)
+        db.add(row)
+        db.commit()
+        db.refresh(row)
+        self._enqueue(row.id)
+        return row
+
+    def cancel(self, db: Session, job: models.Job) -> models.Job:
+        job.cancel_requested = True
+        db.commit()
+        with self._lock:
+            event = self._cancel.get(job.id)
+            future = self._futures.get(job.id)
+        if event is not None:
+            event.set()
+        # not started yet (or not queued in this process): it will never run, finish it here
+        if future is None or future.cancel():
+            _update(job.id, only_if=QUEUED, status=CANCELLED, finished_at=func.now())
+        db.refresh(job)
+        return job
+
+    # --- execution ---
+
+    def _enqueue(self, job_id: str):
+        with self._lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+                self._heartbeat.start()
+            event = threading.Event()
+            self._cancel[job_id] = event
+            future = self._executor.submit(self._run, job_id, event)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._cancel.pop(job_id, None)
+
+    def _beat(self):
+        # renew the lease of every job this process is running
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            with self._lock:
+                busy = bool(self._futures)
+            if not busy:
+                continue
+            db = SessionLocal()
+            try:
+                db.query(models.Job).filter(models.Job.owner == INSTANCE, models.Job.status == RUNNING)\
+                    .update({"heartbeat_at": func.now()}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                print(" Job heartbeat error:", e)
+            finally:
+                db.close()
+
+    def _run(self, job_id: str, event: threading.Event):
+        if not _update(job_id, only_if=QUEUED, status=RUNNING, owner=INSTANCE, started_at=func.now(),
+                       heartbeat_at=func.now()):
+            return  # cancelled meanwhile, or claimed elsewhere
+        db = SessionLocal()
+        try:
+            job = db.get(models.Job, job_id)
+            kind = self.kinds.get(job.kind)
+            if kind is None:
+                raise RuntimeError(f"Unknown job kind {job.kind!r}")
+            if job.cancel_requested:
+                raise JobCancelled()
+            params = dict(job.params or {})
+            db.expunge(job)
+            result = kind.fn(JobContext(job_id, params, event), db, params)
+        except JobCancelled:
+            db.rollback()
+            _update(job_id, held=True, status=CANCELLED, finished_at=func.now())
+        except Exception as e:
+            db.rollback()
+            print(" Job error:", job_id, e)
+            _update(job_id, held=True, status=FAILED, error=f"{type(e).__name__}: {e}", finished_at=func.now())
+        else:
+            _update(job_id, held=True, status=SUCCEEDED, progress=1.0, result=jsonable_encoder(result),
+                    finished_at=func.now())
+        finally:
+            db.close()
+
+    def recover(self):
+        """
+        On startup: re-queue queued jobs, and running jobs whose lease expired
+        (their process died). Jobs other live processes are running keep
+        renewing their lease and are left alone.
+        """
+        db = SessionLocal()
+        try:
+            now = db.query(func.now()).scalar()
+            if isinstance(now, str):  # sqlite
+                now = datetime.datetime.fromisoformat(now)
+            cutoff = now.replace(tzinfo=None) - LEASE
+            J = models.Job
+            expired = db.query(J.id, J.kind, J.cancel_requested, J.heartbeat_at).filter(
+                J.status == RUNNING, or_(J.heartbeat_at.is_(None), J.heartbeat_at < cutoff)).all()
+            for job in expired:
+                kind = self.kinds.get(job.kind)
+                if kind is not None and kind.restartable and not job.cancel_requested:
+                    fields = {"status": QUEUED, "progress": 0.0, "owner": None,
+                              "message": "Restarted after interruption"}
+                else:
+                    fields = {"status": FAILED, "finished_at": func.now(), "error": "Interrupted by a restart"}
+                # same lease we saw: another process recovering at once, or a late heartbeat, wins
+                db.query(J).filter(J.id == job.id, J.status == RUNNING,
+                                   J.heartbeat_at.is_(None) if job.heartbeat_at is None
+                                   else J.heartbeat_at == job.heartbeat_at)\
+                    .update(fields, synchronize_session=False)
+            db.commit()
+            queued = db.query(models.Job.id).filter(models.Job.status == QUEUED)\
+                .order_by(models.Job.created_at).all()
+        except Exception as e:
+            print(" Job recovery error:", e)
+            return
+        finally:
+            db.close()
+        for (job_id,) in queued:
+            self._enqueue(job_id)
+
+
+runner = JobRunner()
@@ -0,0 +1,72 @@
+# api/migrations.py
+import json
+
+from sqlalchemy import inspect, text
+
+from .equipment import parse_mask
+from .timeslots import availability_mask, mask_to_bytes
+
+# create_all() only creates missing tables. Columns added to tables that already
+# exist in the deployed DB are listed here and added on startup (idempotent).
+# (table, column, DDL)
+_COLUMNS = [
+    ("schedule_entries", "group_id", "INTEGER REFERENCES groups(id) ON DELETE SET NULL"),
+    ("rooms", "equipment_mask", "BIGINT NOT NULL DEFAULT 0"),
+    ("modules", "required_equipment_mask", "BIGINT NOT NULL DEFAULT 0"),
+    ("lecturer_availabilities", "slot_bitmap", "BYTEA"),
+    ("lecturer_availabilities", "version", "INTEGER NOT NULL DEFAULT 0"),
+    ("jobs", "owner", "VARCHAR(100)"),
+    ("jobs", "heartbeat_at", "TIMESTAMP"),
+]
+
+# (index name, table, column)
+_INDEXES = [
+    ("ix_schedule_entries_group_id", "schedule_entries", "group_id"),
+    ("ix_schedule_entries_semester", "schedule_entries", "semester"),
+]
+
+# indexes that were created by earlier releases and serve no query
+# (a B-tree can't answer "equipment_mask & need = need")
+_DROPPED_INDEXES = ["ix_rooms_equipment_mask"]
+
+
+def _backfill_room_equipment(conn):
+    rows = conn.execute(text('SELECT id, "Equipment" FROM rooms')).fetchall()
+    for room_id, equipment in rows:
+        mask = parse_mask(equipment)
+        if mask:
+            conn.execute(text("UPDATE rooms SET equipment_mask = :m WHERE id = :id"), {"m": mask, "id": room_id})
+
+
+def _backfill_availability_bitmaps(conn):
+    rows = conn.execute(text("SELECT id, schedule_data FROM lecturer_availabilities")).fetchall()
+    for row_id, data in rows:
+        if isinstance(data, str):
+            data = json.loads(data or "{}")
+        conn.execute(text("UPDATE lecturer_availabilities SET slot_bitmap = :b WHERE id = :id"),
+                     {"b": mask_to_bytes(availability_mask(data)), "id": row_id})
+
+
+# run once, right after the column they fill was added: (table, column) -> fn(conn)
+_BACKFILLS = {
+    ("rooms", "equipment_mask"): _backfill_room_equipment,
+    ("lecturer_availabilities", "slot_bitmap"): _backfill_availability_bitmaps,
+}
+
+
+def run_migrations(engine):
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl in _COLUMNS:
+            if not insp.has_table(table):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{column}" {ddl}'))
+                if (table, column) in _BACKFILLS:
+                    _BACKFILLS[(table, column)](conn)
+
+        for name, table, column in _INDEXES:
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ("{column}")'))
+        for name in _DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
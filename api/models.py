@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Text, JSON, TIMESTAMP, Table
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Date, ForeignKey, Text, JSON, TIMESTAMP, Table, LargeBinary, Float
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
 
@@ -96,6 +96,7 @@ class Module(Base):
     semester = Column(Integer, nullable=False)
     category = Column(String, nullable=True)
     program_id = Column(Integer, ForeignKey("study_programs.id", ondelete="CASCADE"), nullable=True)
+    required_equipment_mask = Column(BigInteger, default=0, server_default="0", nullable=False)  # see equipment.py
 
     specializations = relationship("Specialization", secondary=module_specializations, back_populates="modules")
     lecturers = relationship("Lecturer", secondary=lecturer_modules, back_populates="modules")
@@ -133,6 +134,7 @@ class Room(Base):
     type = Column(String, nullable=False)
     status = Column(Boolean, default=True, nullable=False)
     equipment = Column("Equipment", String, nullable=True)
+    equipment_mask = Column(BigInteger, default=0, server_default="0", nullable=False)  # parsed from equipment
     location = Column(String(200), nullable=True)
 
 
@@ -141,6 +143,10 @@ class LecturerAvailability(Base):
     id = Column(Integer, primary_key=True, index=True)
     lecturer_id = Column(Integer, ForeignKey("lecturers.ID", ondelete="CASCADE"), unique=True, nullable=False)
     schedule_data = Column(JSON, default={}, nullable=False)
+    # schedule_data as a weekly slot bitmap (timeslots.mask_to_bytes), kept in sync on every write
+    slot_bitmap = Column(LargeBinary, nullable=True)
+    # bumped on every write; slot PATCHes can send it to detect concurrent edits
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
 
 class SchedulerConstraint(Base):
@@ -197,7 +203,60 @@ class ScheduleEntry(Base):
     start_time = Column(String, nullable=False)  # "08:00"
     end_time = Column(String, nullable=False)  # "10:00"
 
-    semester = Column(String, nullable=False)
+    semester = Column(String, nullable=False, index=True)
+
+    # optional: the student group attending (parents/subgroups are resolved via api/group_index.py)
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="SET NULL"), nullable=True, index=True)
 
     offered_module = relationship("OfferedModule")
-    room = relationship("Room")
\ No newline at end of file
+    room = relationship("Room")
+    group = relationship("Group")
+
+class ChangeLog(Base):
+    """Append-only change sequence used by GET /changes (delta sync) and live updates."""
+    __tablename__ = "change_log"
+
+    seq = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(40), nullable=False, index=True)  # "schedule", "offered_modules", "modules", ...
+    entity_id = Column(String, nullable=False)
+    op = Column(String(10), nullable=False)  # insert / update / delete
+    semester = Column(String, nullable=True)
+    changed_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+
+
+class Job(Base):
+    """Background job (see api/jobs.py). Rows outlive the process: queued work is picked up again on startup."""
+    __tablename__ = "jobs"
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String(60), nullable=False, index=True)
+    params = Column(JSON, default={}, nullable=False)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued/running/succeeded/failed/cancelled
+    progress = Column(Float, nullable=False, default=0.0)
+    message = Column(String(500), nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    # lease of a running job: the process running it and its last sign of life
+    owner = Column(String(100), nullable=True)
+    heartbeat_at = Column(TIMESTAMP, nullable=True)
+    created_by = Column(Integer, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+    started_at = Column(TIMESTAMP, nullable=True)
+    finished_at = Column(TIMESTAMP, nullable=True)
+
+
+class ScheduleException(Base):
+    """A date range on which weekly entries do not take place (see api/occurrences.py)."""
+    __tablename__ = "schedule_exceptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(20), nullable=False, default="holiday")  # holiday / cancelled
+    name = Column(String, nullable=True)
+    # what it applies to, like scheduler constraints; entry_id narrows it to one entry
+    scope = Column(String(20), nullable=False, default="university")
+    target_id = Column(String, nullable=True, default="0")
+    entry_id = Column(Integer, ForeignKey("schedule_entries.id", ondelete="CASCADE"), nullable=True, index=True)
+    start_date = Column(Date, nullable=False, index=True)
+    end_date = Column(Date, nullable=True)  # inclusive, None = start_date only
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
@@ -0,0 +1,183 @@
+# api/occurrences.py
+"""
+Dated occurrences of the weekly schedule.
+
+A ScheduleEntry is a weekly pattern: it takes place on its weekday between
+its semester's start_date and end_date, except on dates covered by
+- a ScheduleException: a holiday / closure for a scope and target (the same
+  scope + target_id pairs as scheduler constraints, e.g. university-wide, one
+  campus, one room or one group family), or a one-off cancellation of a
+  single entry (entry_id)
+- an enabled "Holiday '...' is from ... to ..." scheduler constraint, over its
+  valid_from..valid_to and for its scope + target
+
+Nothing is stored per date. An ExceptionCalendar only loads the exceptions
+that overlap the requested window, and expand() walks that window day by
+day over the entries of the semesters it touches, so a query costs one pass
+over those entries plus the occurrences it returns.
+"""
+import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from . import models
+from .constraint_engine import CAMPUS_TARGETS, entry_rows, rule_cache
+from .constraint_index import norm_scope, norm_target
+from .group_index import get_hierarchy
+from .permissions import program_of_groups
+from .timeslots import day_index
+
+_DAY = datetime.timedelta(days=1)
+
+
+def weekly_dates(day_of_week: str, start: datetime.date, end: datetime.date) -> Iterator[datetime.date]:
+    d = day_index(day_of_week)
+    if d is None:
+        return
+    current = start + datetime.timedelta(days=(d - start.weekday()) % 7)
+    week = datetime.timedelta(days=7)
+    while current <= end:
+        yield current
+        current += week
+
+
+class ExceptionCalendar:
+    """
+    Exceptions overlapping [date_from, date_to]. Rows passed in are entry rows
+    as built by constraint_engine.entry_rows (lecturer, room_id, group, program, ...).
+    """
+
+    def __init__(self, db: Session, date_from: datetime.date, date_to: datetime.date):
+        self.db = db
+        # (first day, last day, scope, target, entry id or None, reason)
+        self.rules: List[Tuple[datetime.date, datetime.date, str, object, Optional[int], str]] = []
+
+        X = models.ScheduleException
+        for x in db.query(X).filter(X.start_date <= date_to,
+                                    func.coalesce(X.end_date, X.start_date) >= date_from).all():
+            reason = f"{x.kind}: {x.name}" if x.name else x.kind
+            self.rules.append((x.start_date, x.end_date or x.start_date, norm_scope(x.scope),
+                               norm_target(x.target_id), x.entry_id, reason))
+
+        C = models.SchedulerConstraint
+        for c in db.query(C).filter(C.is_enabled.is_(True), C.valid_from.isnot(None), C.valid_from <= date_to,
+                                    or_(C.valid_to.is_(None), C.valid_to >= date_from)).all():
+            # holidays are the rules that are about dates, not weekly slots
+            if rule_cache.get(c).weekly:
+                continue
+            self.rules.append((c.valid_from, c.valid_to or c.valid_from, norm_scope(c.scope),
+                               norm_target(c.target_id), None, f"holiday: {c.name}"))
+
+        self._group_programs: Optional[Dict[int, int]] = None
+        self._hierarchy = None
+        self._by_entry: Dict[int, List[Tuple[datetime.date, datetime.date, str]]] = {}
+
+    def _applies(self, scope: str, target, row: dict) -> bool:
+        if scope == "university":
+            campus = CAMPUS_TARGETS.get(str(target))
+            return campus is None or (row["location"] or "").strip().lower() == campus
+        if target == 0:
+            return True
+        if scope == "module":
+            return (row["module"] or "").strip().lower() == str(target)
+        if scope == "lecturer":
+            return row["lecturer"] == target
+        if scope == "room":
+            return row["room_id"] == target
+        if scope == "program":
+            return row["program"] == target
+        if scope == "group" and isinstance(target, int):
+            # same reach as the group's timetable: its family's entries plus its program's untargeted ones
+            if row["group"] is not None:
+                if self._hierarchy is None:
+                    self._hierarchy = get_hierarchy(self.db)
+                return row["group"] in self._hierarchy.related(target)
+            if self._group_programs is None:
+                self._group_programs = program_of_groups(self.db)
+            return row["program"] is not None and row["program"] == self._group_programs.get(target)
+        return False
+
+    def blackouts(self, row: dict) -> List[Tuple[datetime.date, datetime.date, str]]:
+        hit = self._by_entry.get(row["id"])
+        if hit is None:
+            hit = []
+            for lo, hi, scope, target, entry_id, reason in self.rules:
+                if row["id"] == entry_id if entry_id is not None else self._applies(scope, target, row):
+                    hit.append((lo, hi, reason))
+            self._by_entry[row["id"]] = hit
+        return hit
+
+    def reason(self, row: dict, on: datetime.date) -> Optional[str]:
+        """Why the entry does not take place on `on`, or None if it does."""
+        for lo, hi, why in self.blackouts(row):
+            if lo <= on <= hi:
+                return why
+        return None
+
+    def dates(self, row: dict, start: datetime.date, end: datetime.date) -> Iterator[datetime.date]:
+        """Teaching dates of a weekly row between start and end."""
+        for on in weekly_dates(row["day_of_week"], start, end):
+            if not self.rules or self.reason(row, on) is None:
+                yield on
+
+
+def expand(db: Session, date_from: datetime.date, date_to: datetime.date, semester: Optional[str] = None,
+           keep: Optional[Callable[[dict], bool]] = None, include_cancelled: bool = False) -> Iterator[dict]:
+    """
+    Occurrences between date_from and date_to (inclusive), ordered by date and
+    start time, as JSON-ready dicts. keep(row) filters the entry rows; cancelled
+    dates are skipped unless include_cancelled, then they carry the reason.
+    """
+    S = models.Semester
+    q = db.query(S).filter(S.start_date <= date_to, S.end_date >= date_from)
+    if semester is not None:
+        q = q.filter(S.name == semester)
+    semesters = q.order_by(S.start_date).all()
+    if not semesters:
+        return
+    calendar = ExceptionCalendar(db, date_from, date_to)
+
+    # per semester: weekday -> rows by start time
+    by_day: Dict[str, Dict[int, List[dict]]] = {}
+    for s in semesters:
+        days: Dict[int, List[dict]] = {}
+        for row in entry_rows(db, s.name):
+            if row["day"] is not None and (keep is None or keep(row)):
+                days.setdefault(row["day"], []).append(row)
+        for rows in days.values():
+            rows.sort(key=lambda r: (r["start"] if r["start"] is not None else -1, r["id"]))
+        by_day[s.name] = days
+
+    on = max(date_from, min(s.start_date for s in semesters))
+    last = min(date_to, max(s.end_date for s in semesters))
+    while on <= last:
+        today = []
+        for s in semesters:
+            if s.start_date <= on <= s.end_date:
+                today.extend((s.name, r) for r in by_day[s.name].get(on.weekday(), []))
+        if len(semesters) > 1:
+            today.sort(key=lambda it: it[1]["start"] if it[1]["start"] is not None else -1)
+        for sem, row in today:
+            why = calendar.reason(row, on) if calendar.rules else None
+            if why is not None and not include_cancelled:
+                continue
+            item = {
+                "date": on.isoformat(),
+                "entry_id": row["id"],
+                "semester": sem,
+                "day_of_week": row["day_of_week"],
+                "start_time": row["start_time"],
+                "end_time": row["end_time"],
+                "module_code": row["module"],
+                "lecturer_id": row["lecturer"],
+                "room_id": row["room_id"],
+                "room_name": row["room"],
+                "group_id": row["group"],
+            }
+            if include_cancelled:
+                item["cancelled"] = why is not None
+                item["reason"] = why
+            yield item
+        on += _DAY
@@ -1,7 +1,7 @@
 # api/permissions.py
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from . import models
 
@@ -47,13 +47,37 @@ def check_is_hosp_for_program(user: models.User, program: models.StudyProgram):
         return True
     raise HTTPException(status_code=403, detail="Access denied")
 
+def program_key(text: Optional[str]) -> str:
+    return (text or "").strip().lower()
+
+
+def program_keys(db: Session) -> Dict[str, int]:
+    """Group.program is free text: a program's name, acronym or id. Normalized key -> program id."""
+    keys: Dict[str, int] = {}
+    for p in db.query(models.StudyProgram).all():
+        for k in (p.name, p.acronym, str(p.id)):
+            keys.setdefault(program_key(k), p.id)
+    return keys
+
+
+def program_of_groups(db: Session) -> Dict[int, int]:
+    """group id -> program id, for groups whose program text matches a program."""
+    keys = program_keys(db)
+    out = {}
+    for g in db.query(models.Group.id, models.Group.program).all():
+        pid = keys.get(program_key(g.program))
+        if pid is not None:
+            out[g.id] = pid
+    return out
+
+
 def group_payload_in_hosp_domain(db: Session, user: models.User, program_field: Optional[str]) -> bool:
     progs = hosp_programs(db, user)
-    val = (program_field or "").strip().lower()
+    val = program_key(program_field)
     allowed = set()
     for p in progs:
-        allowed.add((p.name or "").strip().lower())
-        allowed.add((p.acronym or "").strip().lower())
+        allowed.add(program_key(p.name))
+        allowed.add(program_key(p.acronym))
         allowed.add(str(p.id))
     return val in allowed
 
@@ -63,6 +87,8 @@ def group_is_in_hosp_domain(db: Session, user: models.User, group: models.Group)
 
 def hosp_can_manage_constraint(db: Session, user: models.User, scope: str, target_id: Optional[int]) -> bool:
     scope_norm = (scope or "").strip().lower()
-    if scope_norm == "program" and target_id is not None:
-        return target_id in hosp_program_ids(db, user)
+    # target_id is stored as text ("12"), program ids are ints
+    target = str(target_id).strip() if target_id is not None else ""
+    if scope_norm == "program" and target.isdigit():
+        return int(target) in hosp_program_ids(db, user)
     return False
@@ -0,0 +1,183 @@
+# api/room_analytics.py
+"""
+Room utilization for one semester from a rooms x weekly-slots occupancy matrix.
+
+All entries are loaded in one query and written into two NumPy matrices with
+difference arrays (+1 at the start slot, -1 at the end slot, cumsum per row):
+  bookings[r, s]  how many entries use room r in slot s (> 1 = double booked)
+  seats[r, s]     how many students sit in room r in slot s
+Everything else is reductions over those matrices.
+"""
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models
+from .permissions import program_of_groups
+from .timeslots import DAYS, SLOT_MINUTES, SLOTS_PER_DAY, day_index, format_minutes, to_minutes
+
+WEEK_SLOTS = len(DAYS) * SLOTS_PER_DAY
+PEAK_SLOTS = 5
+
+
+def program_attendance(db: Session) -> Dict[int, int]:
+    """program id -> students attending an untargeted entry (sum of its top-level groups)."""
+    group_program = program_of_groups(db)
+    out: Dict[int, int] = {}
+    for g in db.query(models.Group).all():
+        pid = group_program.get(g.id)
+        if pid is not None and not (g.parent_group or "").strip():
+            out[pid] = out.get(pid, 0) + (g.size or 0)
+    return out
+
+
+def _open_mask(open_from: int, open_to: int, days: int) -> np.ndarray:
+    """Boolean mask over the week's slots that count as teaching time."""
+    mask = np.zeros(WEEK_SLOTS, dtype=bool)
+    first, last = open_from // SLOT_MINUTES, -(-open_to // SLOT_MINUTES)
+    for d in range(days):
+        mask[d * SLOTS_PER_DAY + first:d * SLOTS_PER_DAY + last] = True
+    return mask
+
+
+def _ratio(a: float, b: float) -> float:
+    return round(a / b, 4) if b else 0.0
+
+
+def room_utilization(db: Session, semester: str, open_from: str = "08:00", open_to: str = "20:00",
+                     include_weekend: bool = False) -> dict:
+    rooms = db.query(models.Room).order_by(models.Room.id).all()
+    row_of = {r.id: i for i, r in enumerate(rooms)}
+    capacity = np.array([r.capacity or 0 for r in rooms], dtype=np.float64)
+
+    # plain column rows: no ORM objects for what can be thousands of entries
+    entries = (
+        db.query(
+            models.ScheduleEntry.room_id, models.ScheduleEntry.day_of_week, models.ScheduleEntry.start_time,
+            models.ScheduleEntry.end_time, models.ScheduleEntry.group_id, models.Module.program_id,
+        )
+        .outerjoin(models.OfferedModule, models.ScheduleEntry.offered_module_id == models.OfferedModule.id)
+        .outerjoin(models.Module, models.OfferedModule.module_code == models.Module.module_code)
+        .filter(models.ScheduleEntry.semester == semester)
+        .all()
+    )
+    attendance = program_attendance(db)
+    group_size = dict(db.query(models.Group.id, models.Group.size).all())
+
+    # entries -> (row, first slot, end slot, students)
+    rows, firsts, lasts, students = [], [], [], []
+    unroomed = 0
+    for room_id, day, start, end, group_id, program_id in entries:
+        if room_id is None or room_id not in row_of:
+            unroomed += 1
+            continue
+        d, s, t = day_index(day), to_minutes(start), to_minutes(end)
+        if d is None or s is None or t is None or t <= s:
+            continue
+        if group_id is not None:
+            size = group_size.get(group_id) or 0
+        else:
+            size = attendance.get(program_id, 0)
+        rows.append(row_of[room_id])
+        firsts.append(d * SLOTS_PER_DAY + s // SLOT_MINUTES)
+        lasts.append(d * SLOTS_PER_DAY + -(-t // SLOT_MINUTES))
+        students.append(size)
+
+    n = len(rooms)
+    diff = np.zeros((n, WEEK_SLOTS + 1), dtype=np.int32)
+    seat_diff = np.zeros((n, WEEK_SLOTS + 1), dtype=np.float64)
+    if rows:
+        r = np.array(rows)
+        a, b = np.array(firsts), np.array(lasts)
+        w = np.array(students, dtype=np.float64)
+        np.add.at(diff, (r, a), 1)
+        np.add.at(diff, (r, b), -1)
+        np.add.at(seat_diff, (r, a), w)
+        np.add.at(seat_diff, (r, b), -w)
+    bookings = np.cumsum(diff, axis=1)[:, :WEEK_SLOTS]
+    seats = np.cumsum(seat_diff, axis=1)[:, :WEEK_SLOTS]
+
+    window = _open_mask(to_minutes(open_from) or 0, to_minutes(open_to) or 24 * 60, 7 if include_weekend else 5)
+    open_slots = int(window.sum())
+    slot_hours = SLOT_MINUTES / 60.0
+
+    busy = (bookings > 0) & window
+    booked_slots = busy.sum(axis=1)
+    conflict_slots = ((bookings > 1) & window).sum(axis=1)
+    seats_in_window = np.where(busy, seats, 0.0)
+    cap = capacity[:, None]
+    idle_seats = np.where(busy, np.clip(cap - seats, 0, None), 0.0).sum(axis=1) * slot_hours
+    over_slots = (busy & (seats > cap)).sum(axis=1)
+    fill = np.divide(seats_in_window.sum(axis=1), booked_slots * capacity,
+                     out=np.zeros(n), where=(booked_slots * capacity) > 0)
+
+    per_room = []
+    for i, room in enumerate(rooms):
+        per_room.append({
+            "room_id": room.id,
+            "name": room.name,
+            "type": room.type,
+            "capacity": room.capacity,
+            "hours_booked": round(float(booked_slots[i]) * slot_hours, 2),
+            "utilization": _ratio(float(booked_slots[i]), open_slots),
+            "seat_fill": round(float(fill[i]), 4),
+            "idle_seat_hours": round(float(idle_seats[i]), 1),
+            "double_booked_hours": round(float(conflict_slots[i]) * slot_hours, 2),
+            "over_capacity_hours": round(float(over_slots[i]) * slot_hours, 2),
+        })
+
+    # per type: same reductions over the rows of that type
+    types: Dict[str, List[int]] = {}
+    for i, room in enumerate(rooms):
+        types.setdefault((room.type or "Unknown").strip() or "Unknown", []).append(i)
+    per_type = []
+    for t, idx in sorted(types.items()):
+        sub = busy[idx]
+        occupied = sub.sum(axis=0)
+        booked = float(sub.sum())
+        seat_capacity = float((sub * capacity[idx][:, None]).sum())
+        per_type.append({
+            "type": t,
+            "rooms": len(idx),
+            "seats": int(capacity[idx].sum()),
+            "hours_booked": round(booked * slot_hours, 2),
+            "utilization": _ratio(booked, open_slots * len(idx)),
+            "seat_fill": _ratio(float(seats_in_window[idx].sum()), seat_capacity),
+            "idle_seat_hours": round(float(idle_seats[idx].sum()), 1),
+            "peak_saturation": _ratio(float(occupied.max()) if occupied.size else 0.0, len(idx)),
+        })
+
+    # peak slots: share of all rooms in use
+    in_use = busy.sum(axis=0)
+    saturation = in_use / n if n else np.zeros(WEEK_SLOTS)
+    order = [s for s in np.argsort(-saturation, kind="stable") if window[s] and in_use[s] > 0][:PEAK_SLOTS]
+    peaks = [
+        {
+            "day_of_week": DAYS[s // SLOTS_PER_DAY],
+            "start_time": format_minutes((s % SLOTS_PER_DAY) * SLOT_MINUTES),
+            "end_time": format_minutes((s % SLOTS_PER_DAY + 1) * SLOT_MINUTES),
+            "rooms_in_use": int(in_use[s]),
+            "saturation": round(float(saturation[s]), 4),
+        }
+        for s in order
+    ]
+
+    total_booked = float(booked_slots.sum())
+    return {
+        "semester": semester,
+        "rooms": n,
+        "entries": len(entries),
+        "entries_without_room": unroomed,
+        "open_hours_per_room": round(open_slots * slot_hours, 2),
+        "summary": {
+            "utilization": _ratio(total_booked, open_slots * n),
+            "seat_fill": _ratio(float(seats_in_window.sum()), float((busy * cap).sum())),
+            "idle_seat_hours": round(float(idle_seats.sum()), 1),
+            "peak_saturation": peaks[0]["saturation"] if peaks else 0.0,
+            "double_booked_hours": round(float(conflict_slots.sum()) * slot_hours, 2),
+        },
+        "peak_slots": peaks,
+        "by_type": per_type,
+        "by_room": per_room,
+    }
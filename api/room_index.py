@@ -0,0 +1,173 @@
+# api/room_index.py
+"""
+Room lookup for placing schedule entries.
+
+- capacity/type index: active rooms per normalized type, sorted by capacity,
+  so "smallest room of type T with at least N seats" is a bisect; equipment
+  is compared as bitmasks (see equipment.py)
+- occupancy index: per semester, one weekly slot bitmap per room (see
+  timeslots.window_mask), so "is room R free at D start-end" is one AND
+
+Both are built on first use and keyed on the change_log version of what they
+are built from (changes.version), so writes handled by another process are
+noticed on the next lookup; the change feed only drops this process's copy
+early (room writes rebuild the capacity index, schedule writes drop that
+semester's occupancy).
+"""
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models, changes
+from .equipment import keys_of
+from .timeslots import window_mask
+
+
+def _norm(text: Optional[str]) -> str:
+    return " ".join((text or "").lower().split())
+
+
+class RoomInfo:
+    __slots__ = ("id", "name", "type", "capacity", "location", "equipment", "row")
+
+    def __init__(self, r: models.Room):
+        self.id = r.id
+        self.name = r.name
+        self.type = _norm(r.type)
+        self.capacity = r.capacity or 0
+        self.location = _norm(r.location)
+        self.equipment = r.equipment_mask or 0
+        self.row = {"type": r.type, "location": r.location, "equipment": r.equipment}  # as entered, for output
+
+
+class RoomIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rooms: Optional[Dict[int, RoomInfo]] = None
+        self.rooms_version: Optional[Tuple[int, int]] = None
+        # type -> (capacities ascending, room ids in the same order)
+        self.by_type: Dict[str, Tuple[List[int], List[int]]] = {}
+        # semester -> (changes.version it was built at, room id -> busy slots)
+        self.occupancy: Dict[str, Tuple[Tuple[int, int], Dict[int, int]]] = {}
+
+    # --- maintenance ---
+
+    def invalidate_rooms(self):
+        with self._lock:
+            self.rooms = None
+
+    def invalidate_occupancy(self, semester: Optional[str] = None):
+        with self._lock:
+            if semester is None:
+                self.occupancy.clear()
+            else:
+                self.occupancy.pop(semester, None)
+
+    def _ensure_rooms(self, db: Session):
+        # versions are read before the rows, so a build racing a write is redone next time
+        version = changes.version(db, ("rooms",))
+        if self.rooms is not None and self.rooms_version == version:
+            return
+        rooms = {r.id: RoomInfo(r) for r in db.query(models.Room).filter(models.Room.status.is_(True)).all()}
+        grouped: Dict[str, List[Tuple[int, int]]] = {}
+        for info in rooms.values():
+            grouped.setdefault(info.type, []).append((info.capacity, info.id))
+        by_type = {}
+        for t, pairs in grouped.items():
+            pairs.sort()
+            by_type[t] = ([c for c, _ in pairs], [i for _, i in pairs])
+        self.rooms, self.by_type, self.rooms_version = rooms, by_type, version
+
+    def _ensure_occupancy(self, db: Session, semester: str) -> Dict[int, int]:
+        version = changes.version(db, ("schedule", "rooms"), semester)
+        hit = self.occupancy.get(semester)
+        busy = hit[1] if hit is not None and hit[0] == version else None
+        if busy is None:
+            busy = {}
+            rows = (
+                db.query(models.ScheduleEntry.room_id, models.ScheduleEntry.day_of_week,
+                         models.ScheduleEntry.start_time, models.ScheduleEntry.end_time)
+                .filter(models.ScheduleEntry.semester == semester, models.ScheduleEntry.room_id.isnot(None))
+                .all()
+            )
+            for room_id, day, start, end in rows:
+                busy[room_id] = busy.get(room_id, 0) | window_mask(day, start, end)
+            self.occupancy[semester] = (version, busy)
+        return busy
+
+    # --- queries ---
+
+    def at_least(self, room_type: str, seats: int) -> List[int]:
+        """Rooms of a type with >= seats, smallest first."""
+        caps, ids = self.by_type.get(_norm(room_type), ([], []))
+        return ids[bisect_left(caps, seats):]
+
+    def recommend(self, db: Session, semester: str, need: int, room_type: Optional[str], seats: Optional[int],
+                  equipment: int, location: Optional[str], limit: int) -> List[dict]:
+        """
+        Free rooms ranked by: type match, enough seats, missing equipment,
+        same location as the lecturer, then fewest spare seats.
+        Rooms of the right type that fit are taken from the index first; the
+        rest of the rooms are only looked at when that tier has too few.
+        """
+        with self._lock:
+            self._ensure_rooms(db)
+            busy = self._ensure_occupancy(db, semester)
+            rooms = self.rooms
+            want_type = _norm(room_type)
+            want_loc = _norm(location)
+            seats = seats or 0
+
+            def rank(info: RoomInfo) -> tuple:
+                missing = bin(equipment & ~info.equipment).count("1")
+                return (
+                    0 if not want_type or info.type == want_type else 1,
+                    0 if info.capacity >= seats else 1,
+                    missing,
+                    0 if not want_loc or info.location == want_loc else 1,
+                    abs(info.capacity - seats),
+                    info.name,
+                )
+
+            def free(rid: int) -> bool:
+                return not (busy.get(rid, 0) & need)
+
+            first = [rid for rid in self.at_least(want_type, seats) if free(rid)] if want_type else []
+            picked = [rooms[rid] for rid in first]
+            if len(picked) < limit:
+                seen = set(first)
+                picked += [info for rid, info in rooms.items() if rid not in seen and free(rid)]
+            picked.sort(key=rank)
+
+            out = []
+            for info in picked[:limit]:
+                r = rank(info)
+                out.append({
+                    "room_id": info.id,
+                    "name": info.name,
+                    "type": info.row["type"],
+                    "capacity": info.capacity,
+                    "location": info.row["location"],
+                    "equipment": info.row["equipment"],
+                    "type_match": r[0] == 0,
+                    "fits": r[1] == 0,
+                    "missing_equipment": keys_of(equipment & ~info.equipment),
+                    "same_location": r[3] == 0,
+                    "spare_seats": info.capacity - seats,
+                })
+            return out
+
+
+room_index = RoomIndex()
+
+
+@changes.subscribe
+def _on_changes(batch: List[dict]):
+    for c in batch:
+        if c["entity"] == "rooms":
+            room_index.invalidate_rooms()
+            room_index.invalidate_occupancy()
+        elif c["entity"] == "schedule":
+            room_index.invalidate_occupancy(c["semester"])
@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from ..database import get_db
-from .. import models
+from .. import models, auth
+from ..permissions import role_of, is_admin_or_pm
+from ..room_analytics import room_utilization
+from ..workload import lecturer_workload
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
+
+def _require_planner(user: models.User):
+    if not (role_of(user) == "hosp" or is_admin_or_pm(user)):
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+
 @router.get("/metrics")
-def get_analytics_metrics(semester_id: int, db: Session = Depends(get_db)):
+def get_analytics_metrics(semester_id: int, db: Session = Depends(get_db),
+                          current_user: models.User = Depends(auth.get_current_user)):
+    _require_planner(current_user)
 
     # 1️⃣ Total Modules in Semester
     total_modules = db.query(models.Module)\
@@ -73,4 +84,22 @@ def get_analytics_metrics(semester_id: int, db: Session = Depends(get_db)):
         },
         "lecturer_stats": staff_data,
         "bar_data": bar_data
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/rooms")
+def get_room_analytics(semester: str, open_from: str = "08:00", open_to: str = "20:00",
+                       include_weekend: bool = False, db: Session = Depends(get_db),
+                       current_user: models.User = Depends(auth.get_current_user)):
+    _require_planner(current_user)
+    # utilization is measured against open_from..open_to on weekdays (plus weekends if asked)
+    return room_utilization(db, semester, open_from, open_to, include_weekend)
+
+
+@router.get("/workload")
+def get_workload_analytics(semester: str, db: Session = Depends(get_db),
+                           current_user: models.User = Depends(auth.get_current_user)):
+    # names and teaching loads: same audience as GET /lecturers/
+    _require_planner(current_user)
+    # weekly contact hours per lecturer vs. their teaching load, one aggregate query
+    return lecturer_workload(db, semester)
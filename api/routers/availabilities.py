@@ -1,11 +1,17 @@
 # api/routers/availabilities.py
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ..database import get_db
-from .. import models, schemas, auth
+from .. import models, schemas, auth, changes
+from ..availability_index import availability_index
 from ..permissions import role_of, is_admin_or_pm, require_lecturer_link
+from ..timeslots import (
+    DAYS, SLOTS_PER_DAY, availability_mask, inner_mask, mask_from_bytes, mask_to_bytes, slot_ranges, to_minutes,
+    window_mask,
+)
 
 router = APIRouter(prefix="/availabilities", tags=["availabilities"])
 
@@ -22,6 +28,41 @@ def read_availabilities(db: Session = Depends(get_db),
         ).all()
     raise HTTPException(status_code=403, detail="Not allowed")
 
+@router.get("/free")
+def free_lecturers(day: str, start: str, end: str, module_code: Optional[str] = None,
+                   db: Session = Depends(get_db),
+                   current_user: models.User = Depends(auth.get_current_user)):
+    if not (is_admin_or_pm(current_user) or role_of(current_user) == "hosp"):
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    need = window_mask(day, start, end)
+    if not need:
+        raise HTTPException(status_code=400, detail="Invalid day or time window")
+
+    q = db.query(
+        models.Lecturer.id, models.Lecturer.title, models.Lecturer.first_name,
+        models.Lecturer.last_name, models.LecturerAvailability.slot_bitmap,
+    ).join(models.LecturerAvailability, models.LecturerAvailability.lecturer_id == models.Lecturer.id)
+    if module_code:
+        q = q.join(models.lecturer_modules, models.lecturer_modules.c.lecturer_id == models.Lecturer.id)\
+             .filter(models.lecturer_modules.c.module_code == module_code)
+
+    # only the 42-byte bitmaps are read; no availability JSON is parsed
+    return [
+        {"lecturer_id": lid, "title": title, "first_name": first, "last_name": last}
+        for lid, title, first, last, bitmap in q.order_by(models.Lecturer.id).all()
+        if mask_from_bytes(bitmap) & need == need
+    ]
+
+@router.get("/heatmap")
+def availability_heatmap(domain_id: Optional[int] = None, program_id: Optional[int] = None,
+                         db: Session = Depends(get_db),
+                         current_user: models.User = Depends(auth.get_current_user)):
+    if not (is_admin_or_pm(current_user) or role_of(current_user) == "hosp"):
+        raise HTTPException(status_code=403, detail="Not allowed")
+    # counts[day][slot] = lecturers of the domain/program (both: intersection) free in that slot
+    return availability_index.heatmap(db, domain_id, program_id)
+
 @router.post("/update", response_model=schemas.AvailabilityResponse)
 def update_availability(payload: schemas.AvailabilityUpdate, db: Session = Depends(get_db),
                         current_user: models.User = Depends(auth.get_current_user)):
@@ -36,22 +77,110 @@ def update_availability(payload: schemas.AvailabilityUpdate, db: Session = Depen
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
 
+    # ranges that are not times of one day would be dropped from the bitmap without a word
+    for day, info in (payload.schedule_data or {}).items():
+        for rng in (info.get("ranges") or []) if isinstance(info, dict) else []:
+            if isinstance(rng, dict) and (to_minutes(rng.get("start")) is None or to_minutes(rng.get("end")) is None):
+                raise HTTPException(status_code=400, detail=f"Invalid time range on {day}: {rng}")
+
     existing = db.query(models.LecturerAvailability).filter(
         models.LecturerAvailability.lecturer_id == payload.lecturer_id
     ).first()
 
+    bitmap = mask_to_bytes(availability_mask(payload.schedule_data))
     if existing:
         existing.schedule_data = payload.schedule_data
+        existing.slot_bitmap = bitmap
+        existing.version = (existing.version or 0) + 1
+        changes.record(db, "availability", payload.lecturer_id, changes.UPDATE)
         db.commit()
         db.refresh(existing)
         return existing
 
-    row = models.LecturerAvailability(**payload.model_dump())
+    row = models.LecturerAvailability(**payload.model_dump(), slot_bitmap=bitmap)
     db.add(row)
+    changes.record(db, "availability", payload.lecturer_id, changes.INSERT)
     db.commit()
     db.refresh(row)
     return row
 
+def _day_json(old: dict, ranges: List[dict]) -> dict:
+    # an emptied day keeps its last ranges but is switched off, like the frontend toggle
+    if not ranges:
+        return {**old, "is_available": False}
+    return {**old, "is_available": True, "ranges": [{"start": r["start"], "end": r["end"]} for r in ranges]}
+
+@router.patch("/lecturer/{lecturer_id}")
+def patch_availability(lecturer_id: int, payload: schemas.AvailabilityPatch, db: Session = Depends(get_db),
+                       current_user: models.User = Depends(auth.get_current_user)):
+    r = role_of(current_user)
+    if is_admin_or_pm(current_user):
+        pass
+    elif r == "lecturer":
+        lec_id = require_lecturer_link(current_user)
+        if lec_id != lecturer_id:
+            raise HTTPException(status_code=403, detail="Cannot edit other lecturer availability")
+    else:
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    # validate everything before touching the row
+    ops = []
+    for i, op in enumerate(payload.ops):
+        # adding only counts whole free slots, removing blocks every slot the range touches
+        bits = (inner_mask if op.op == "add" else window_mask)(op.day, op.start, op.end)
+        if not bits:
+            raise HTTPException(status_code=400, detail=f"Invalid slot range in op {i}")
+        ops.append((op.op, bits))
+
+    # row lock serializes concurrent PATCHes; the version check catches edits made from a stale view
+    locked = db.query(models.LecturerAvailability).filter(
+        models.LecturerAvailability.lecturer_id == lecturer_id
+    ).with_for_update()
+    row = locked.first()
+    if row is None:
+        if not db.query(models.Lecturer.id).filter(models.Lecturer.id == lecturer_id).first():
+            raise HTTPException(status_code=404, detail="Lecturer not found")
+        # two first PATCHes can both get here: the loser's insert fails on the unique
+        # lecturer_id, and it locks the winner's row instead
+        try:
+            with db.begin_nested():
+                db.add(models.LecturerAvailability(lecturer_id=lecturer_id, schedule_data={}, version=0))
+        except IntegrityError:
+            pass
+        row = locked.first()
+    if payload.version is not None and payload.version != (row.version or 0):
+        raise HTTPException(status_code=409, detail=f"Availability changed (now version {row.version or 0})")
+
+    before = mask_from_bytes(row.slot_bitmap) if row.slot_bitmap is not None else availability_mask(row.schedule_data)
+    after = before
+    for kind, bits in ops:
+        after = after | bits if kind == "add" else after & ~bits
+
+    changed = before ^ after
+    if changed:
+        data = dict(row.schedule_data or {})
+        day_bits = (1 << SLOTS_PER_DAY) - 1
+        by_day = {}
+        for rng in slot_ranges(after):
+            by_day.setdefault(rng["day"], []).append(rng)
+        # regenerate only the days the ops touched, the rest of the document is left as sent
+        for d, day in enumerate(DAYS):
+            if (changed >> (d * SLOTS_PER_DAY)) & day_bits:
+                old = data.get(day) if isinstance(data.get(day), dict) else {}
+                data[day] = _day_json(old, by_day.get(day, []))
+        row.schedule_data = data
+        row.slot_bitmap = mask_to_bytes(after)
+        row.version = (row.version or 0) + 1
+        changes.record(db, "availability", lecturer_id, changes.UPDATE)
+    db.commit()
+
+    return {
+        "lecturer_id": lecturer_id,
+        "version": row.version or 0,
+        "added": slot_ranges(after & ~before),
+        "removed": slot_ranges(before & ~after),
+    }
+
 @router.delete("/lecturer/{lecturer_id}")
 def delete_availability(lecturer_id: int, db: Session = Depends(get_db),
                         current_user: models.User = Depends(auth.get_current_user)):
@@ -70,5 +199,6 @@ def delete_availability(lecturer_id: int, db: Session = Depends(get_db),
     ).first()
     if row:
         db.delete(row)
+        changes.record(db, "availability", lecturer_id, changes.DELETE)
         db.commit()
     return {"ok": True}
@@ -0,0 +1,153 @@
+# api/routers/batch.py
+import inspect
+from typing import Any, List, Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from .. import models, auth
+from ..group_index import hierarchy
+from . import schedule, offered_modules, modules, rooms, groups, lecturers, constraints
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+MAX_OPERATIONS = 100
+
+# (entity, op) -> route handler. The handlers run unchanged, so every check they
+# do (validation, RBAC, 404/409) applies exactly as for the single-call endpoint.
+_HANDLERS = {
+    ("schedule", "create"): schedule.create_schedule_entry,
+    ("schedule", "delete"): schedule.delete_schedule_entry,
+    ("offered-modules", "create"): offered_modules.create_offer,
+    ("offered-modules", "update"): offered_modules.update_offer,
+    ("offered-modules", "delete"): offered_modules.delete_offer,
+    ("modules", "create"): modules.create_module,
+    ("modules", "update"): modules.update_module,
+    ("modules", "delete"): modules.delete_module,
+    ("rooms", "create"): rooms.create_room,
+    ("rooms", "update"): rooms.update_room,
+    ("rooms", "delete"): rooms.delete_room,
+    ("groups", "create"): groups.create_group,
+    ("groups", "update"): groups.update_group,
+    ("groups", "delete"): groups.delete_group,
+    ("lecturers", "create"): lecturers.create_lecturer,
+    ("lecturers", "update"): lecturers.update_lecturer,
+    ("lecturers", "delete"): lecturers.delete_lecturer,
+    ("scheduler-constraints", "create"): constraints.create_scheduler_constraint,
+    ("scheduler-constraints", "update"): constraints.update_scheduler_constraint,
+    ("scheduler-constraints", "delete"): constraints.delete_scheduler_constraint,
+}
+
+_RESPONSE_MODELS = {
+    route.endpoint: route.response_model
+    for r in (schedule, offered_modules, modules, rooms, groups, lecturers, constraints)
+    for route in r.router.routes
+    if getattr(route, "response_model", None) is not None
+}
+
+
+class BatchOperation(BaseModel):
+    entity: str  # "schedule", "offered-modules", "modules", "rooms", "groups", "lecturers", "scheduler-constraints"
+    op: str  # "create" | "update" | "delete"
+    id: Optional[Union[int, str]] = None
+    data: Optional[dict] = None
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., max_length=MAX_OPERATIONS)
+
+
+class BatchResult(BaseModel):
+    index: int
+    status: int
+    result: Any = None
+    error: Optional[Any] = None
+
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: List[BatchResult]
+
+
+class _BatchSession:
+    """
+    Session proxy for running several handlers in one transaction:
+    their db.commit() only flushes, the batch commits (or rolls back) once.
+    """
+
+    def __init__(self, db: Session):
+        self._db = db
+
+    def commit(self):
+        self._db.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+def _call(handler, op: BatchOperation, db, current_user):
+    kwargs = {}
+    for name, param in inspect.signature(handler).parameters.items():
+        if name == "db":
+            kwargs[name] = db
+        elif name == "current_user":
+            kwargs[name] = current_user
+        elif inspect.isclass(param.annotation) and issubclass(param.annotation, BaseModel):
+            kwargs[name] = param.annotation.model_validate(op.data or {})
+        else:
+            if op.id is None:
+                raise HTTPException(status_code=400, detail="id is required for this operation")
+            kwargs[name] = TypeAdapter(param.annotation).validate_python(op.id)
+
+    result = handler(**kwargs)
+    model = _RESPONSE_MODELS.get(handler)
+    if model is not None:
+        result = TypeAdapter(model).validate_python(result, from_attributes=True)
+    return jsonable_encoder(result)
+
+
+@router.post("/", response_model=BatchResponse)
+def run_batch(
+    p: BatchRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Run create/update/delete operations across routers with one auth check and
+    one transaction. All-or-nothing: the first failing operation rolls back the
+    whole batch and the remaining ones are reported as skipped (424).
+    """
+    for i, op in enumerate(p.operations):
+        if (op.entity, op.op) not in _HANDLERS:
+            raise HTTPException(status_code=400, detail=f"Operation {i}: unsupported {op.op} on {op.entity}")
+
+    batch_db = _BatchSession(db)
+    results: List[BatchResult] = []
+    failed = False
+    for i, op in enumerate(p.operations):
+        if failed:
+            results.append(BatchResult(index=i, status=424, error="Skipped, an earlier operation failed"))
+            continue
+        try:
+            out = _call(_HANDLERS[(op.entity, op.op)], op, batch_db, current_user)
+            results.append(BatchResult(index=i, status=200, result=out))
+        except HTTPException as e:
+            failed = True
+            results.append(BatchResult(index=i, status=e.status_code, error=e.detail))
+        except ValidationError as e:
+            failed = True
+            results.append(BatchResult(index=i, status=422, error=jsonable_encoder(e.errors())))
+        except Exception as e:
+            failed = True
+            results.append(BatchResult(index=i, status=400, error=str(e)))
+
+    if failed:
+        db.rollback()
+        # handlers may have patched in-memory indexes before the rollback
+        hierarchy.reset()
+    else:
+        db.commit()
+    return BatchResponse(committed=not failed, results=results)
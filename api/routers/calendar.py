@@ -0,0 +1,163 @@
+# api/routers/calendar.py
+import datetime
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, joinedload
+
+from ..database import get_db
+from .. import models, ics
+from ..constraint_engine import entry_rows
+from ..occurrences import ExceptionCalendar
+from ..timetable_cache import TIMETABLE_ENTITIES
+from .schedule import _map_entry, cached_group_timetables
+
+router = APIRouter(prefix="/calendar", tags=["calendar"])
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _semesters(db: Session, semester: Optional[str]) -> List[models.Semester]:
+    query = db.query(models.Semester)
+    if semester is not None:
+        query = query.filter(models.Semester.name == semester)
+    return query.order_by(models.Semester.start_date).all()
+
+
+# everything a feed's events, dates or labels are built from
+FEED_ENTITIES = TIMETABLE_ENTITIES + ("schedule_exceptions", "scheduler_constraints")
+
+
+def _version(db: Session, feed: str, semester: Optional[str], semesters: List[models.Semester]):
+    """
+    ETag + Last-Modified for a feed, from the change records it depends on:
+    those entities only, and for one semester its own records plus the ones
+    without a semester. The record count is part of the tag so a lower seq
+    committing late still changes it. Semester dates are hashed in directly.
+    """
+    C = models.ChangeLog
+    q = db.query(func.count(C.seq), func.coalesce(func.max(C.seq), 0), func.max(C.changed_at))\
+        .filter(C.entity.in_(FEED_ENTITIES))
+    if semester is not None:
+        q = q.filter(or_(C.semester == semester, C.semester.is_(None)))
+    count, seq, changed_at = q.one()
+    modified = _EPOCH
+    if changed_at:
+        modified = changed_at
+        if modified.tzinfo is None:
+            modified = modified.replace(tzinfo=datetime.timezone.utc)
+    digest = hashlib.sha1(
+        repr([(s.name, s.start_date, s.end_date) for s in semesters]).encode()
+    ).hexdigest()[:12]
+    return f'"{feed}-{count}-{seq}-{digest}"', modified.replace(microsecond=0)
+
+
+def _not_modified(request: Request, etag: str, modified: datetime.datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    since = request.headers.get("if-modified-since")
+    if since:
+        try:
+            ts = parsedate_to_datetime(since)
+        except (TypeError, ValueError):
+            return False
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=datetime.timezone.utc)
+        return modified <= ts
+    return False
+
+
+def _feed(request: Request, db: Session, feed: str, name: str, semester: Optional[str], load_rows):
+    """
+    Shared body of the three feeds. `load_rows(semester_name)` returns the mapped
+    weekly rows of one semester; it is only called when the client's copy is stale.
+    """
+    semesters = _semesters(db, semester)
+    etag, modified = _version(db, feed, semester, semesters)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(modified, usegmt=True),
+        "Cache-Control": "private, max-age=0, must-revalidate",
+    }
+    if _not_modified(request, etag, modified):
+        return Response(status_code=304, headers=headers)
+
+    rows_by_semester: Dict[str, List[dict]] = {s.name: load_rows(s.name) for s in semesters}
+    stamp = modified.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+    # loaded here, the response streams after the session is gone
+    calendars: Dict[str, ExceptionCalendar] = {}
+    entries: Dict[str, Dict[int, dict]] = {}
+    for s in semesters:
+        cal = calendars[s.name] = ExceptionCalendar(db, s.start_date, s.end_date)
+        if cal.rules:
+            entries[s.name] = {r["id"]: r for r in entry_rows(db, s.name)}
+            for row in rows_by_semester[s.name]:
+                if row["id"] in entries[s.name]:
+                    cal.blackouts(entries[s.name][row["id"]])
+
+    def events() -> Iterator[str]:
+        for s in semesters:
+            cal, full = calendars[s.name], entries.get(s.name, {})
+            for row in rows_by_semester[s.name]:
+                for on in cal.dates(full.get(row["id"], row), s.start_date, s.end_date):
+                    yield from ics.event_lines(row, on, stamp)
+
+    headers["Content-Disposition"] = f'inline; filename="{feed}.ics"'
+    return StreamingResponse(ics.calendar(name, events()), media_type="text/calendar; charset=utf-8", headers=headers)
+
+
+def _entries(db: Session, semester: str, *criteria) -> List[dict]:
+    rows = (
+        db.query(models.ScheduleEntry)
+        .join(models.OfferedModule, models.ScheduleEntry.offered_module_id == models.OfferedModule.id)
+        .filter(models.ScheduleEntry.semester == semester, *criteria)
+        .options(
+            joinedload(models.ScheduleEntry.offered_module).joinedload(models.OfferedModule.module),
+            joinedload(models.ScheduleEntry.offered_module).joinedload(models.OfferedModule.lecturer),
+            joinedload(models.ScheduleEntry.room),
+        )
+        .all()
+    )
+    return [_map_entry(r) for r in rows]
+
+
+# Feeds are read-only like GET /schedule/ (calendar apps can't send bearer tokens).
+
+@router.get("/lecturer/{id}.ics")
+def lecturer_calendar(id: int, request: Request, semester: Optional[str] = None, db: Session = Depends(get_db)):
+    lec = db.query(models.Lecturer).filter(models.Lecturer.id == id).first()
+    if not lec:
+        raise HTTPException(status_code=404, detail="Lecturer not found")
+    return _feed(
+        request, db, f"lecturer-{id}", f"{lec.first_name} {lec.last_name or ''}".strip(), semester,
+        lambda sem: _entries(db, sem, models.OfferedModule.lecturer_id == id),
+    )
+
+
+@router.get("/room/{id}.ics")
+def room_calendar(id: int, request: Request, semester: Optional[str] = None, db: Session = Depends(get_db)):
+    room = db.query(models.Room).filter(models.Room.id == id).first()
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    return _feed(
+        request, db, f"room-{id}", room.name, semester,
+        lambda sem: _entries(db, sem, models.ScheduleEntry.room_id == id),
+    )
+
+
+@router.get("/group/{id}.ics")
+def group_calendar(id: int, request: Request, semester: Optional[str] = None, db: Session = Depends(get_db)):
+    group = db.query(models.Group).filter(models.Group.id == id).first()
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return _feed(
+        request, db, f"group-{id}", group.name, semester,
+        lambda sem: cached_group_timetables(db, sem).get(id, []),
+    )
@@ -0,0 +1,153 @@
+# api/routers/changes.py
+import datetime
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, joinedload
+from typing import Dict, List, Optional
+
+from ..database import get_db
+from .. import models, changes, auth
+from .schedule import _map_entry
+from .offered_modules import _map_offer
+from .modules import _make_response
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+def _load_schedule(db: Session, ids: List[str]) -> Dict[str, dict]:
+    rows = (
+        db.query(models.ScheduleEntry)
+        .options(
+            joinedload(models.ScheduleEntry.offered_module).joinedload(models.OfferedModule.module),
+            joinedload(models.ScheduleEntry.offered_module).joinedload(models.OfferedModule.lecturer),
+            joinedload(models.ScheduleEntry.room),
+        )
+        .filter(models.ScheduleEntry.id.in_([int(i) for i in ids]))
+        .all()
+    )
+    return {str(r.id): _map_entry(r) for r in rows}
+
+
+def _load_offers(db: Session, ids: List[str]) -> Dict[str, dict]:
+    rows = (
+        db.query(models.OfferedModule)
+        .options(joinedload(models.OfferedModule.module), joinedload(models.OfferedModule.lecturer))
+        .filter(models.OfferedModule.id.in_([int(i) for i in ids]))
+        .all()
+    )
+    return {str(r.id): _map_offer(r) for r in rows}
+
+
+def _load_modules(db: Session, ids: List[str]) -> Dict[str, dict]:
+    rows = (
+        db.query(models.Module)
+        .options(joinedload(models.Module.specializations))
+        .filter(models.Module.module_code.in_(ids))
+        .all()
+    )
+    return {r.module_code: _make_response(r).model_dump() for r in rows}
+
+
+# schedule and offer ids are integers, module ids are module codes
+_INT_IDS = {"schedule", "offered_modules"}
+
+# entity -> loader returning the current rows (same shape as the list endpoints)
+_LOADERS = {
+    "schedule": _load_schedule,
+    "offered_modules": _load_offers,
+    "modules": _load_modules,
+}
+
+
+def _typed_id(entity: str, entity_id: str):
+    return int(entity_id) if entity in _INT_IDS else entity_id
+
+
+# a missing seq older than this is a rolled-back insert, not one still in flight
+GAP_GRACE = datetime.timedelta(seconds=60)
+
+
+def _safe_head(db: Session, since: int, limit: int):
+    """
+    Highest seq a client may move its cursor to, and whether more follows.
+    seq is taken when a transaction inserts but only becomes visible when it
+    commits, so a gap below a visible seq may be a change still in flight:
+    the cursor stops before the first gap unless the row after it is older
+    than GAP_GRACE.
+    """
+    now = db.query(func.now()).scalar()
+    if isinstance(now, str):  # sqlite
+        now = datetime.datetime.fromisoformat(now)
+    now = now.replace(tzinfo=None)
+    rows = (
+        db.query(models.ChangeLog.seq, models.ChangeLog.changed_at)
+        .filter(models.ChangeLog.seq > since)
+        .order_by(models.ChangeLog.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    head = since
+    for seq, changed_at in rows[:limit]:
+        if seq != head + 1 and (changed_at is None or now - changed_at.replace(tzinfo=None) < GAP_GRACE):
+            return head, False  # poll again later, not straight away
+        head = seq
+    return head, len(rows) > limit
+
+
+@router.get("/")
+def get_changes(
+    since: int = 0,
+    semester: Optional[str] = None,
+    limit: int = Query(5000, ge=1, le=50000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Everything that changed after `since`, collapsed per row:
+    inserted/updated come with the current row, deleted with the id only.
+    Clients store `seq` and pass it as `since` next time; `has_more` means
+    call again straight away. `seq` never moves past a change that may still
+    be committing (see _safe_head).
+    """
+    head, has_more = _safe_head(db, since, limit)
+    query = db.query(models.ChangeLog).filter(
+        models.ChangeLog.seq > since,
+        models.ChangeLog.seq <= head,
+        models.ChangeLog.entity.in_(list(_LOADERS.keys())),
+    )
+    if semester is not None:
+        # module rows have no semester and are always included
+        query = query.filter(or_(models.ChangeLog.semester == semester, models.ChangeLog.semester.is_(None)))
+    rows = query.order_by(models.ChangeLog.seq).all()
+    latest = head
+
+    # first and last op per row decide the outcome
+    first_op: Dict[tuple, str] = {}
+    last_op: Dict[tuple, str] = {}
+    for r in rows:
+        key = (r.entity, r.entity_id)
+        first_op.setdefault(key, r.op)
+        last_op[key] = r.op
+
+    result = {entity: {"inserted": [], "updated": [], "deleted": []} for entity in _LOADERS}
+    wanted: Dict[str, Dict[str, str]] = {entity: {} for entity in _LOADERS}
+    for key, op in last_op.items():
+        entity, entity_id = key
+        if op == changes.DELETE:
+            if first_op[key] != changes.INSERT:
+                result[entity]["deleted"].append(_typed_id(entity, entity_id))
+        else:
+            wanted[entity][entity_id] = "inserted" if first_op[key] == changes.INSERT else "updated"
+
+    for entity, ids in wanted.items():
+        if not ids:
+            continue
+        current = _LOADERS[entity](db, list(ids.keys()))
+        for entity_id, bucket in ids.items():
+            if entity_id in current:
+                result[entity][bucket].append(current[entity_id])
+            elif bucket == "updated":
+                # gone without a logged delete (e.g. cascaded outside these routers)
+                result[entity]["deleted"].append(_typed_id(entity, entity_id))
+
+    return {"since": since, "seq": latest, "has_more": has_more, "changes": result}
@@ -1,11 +1,14 @@
 # api/routers/constraints.py
+import datetime
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ..database import get_db
-from .. import models, schemas, auth
+from .. import models, schemas, auth, changes
 from ..permissions import role_of, is_admin_or_pm, hosp_can_manage_constraint
+from ..constraint_engine import evaluate
+from ..constraint_index import get_constraint_index
 
 router = APIRouter(tags=["constraints"])
 
@@ -19,6 +22,15 @@ def read_scheduler_constraints(db: Session = Depends(get_db),
                                current_user: models.User = Depends(auth.get_current_user)):
     return db.query(models.SchedulerConstraint).all()
 
+@router.get("/scheduler-constraints/active", response_model=List[schemas.SchedulerConstraintResponse])
+def read_active_scheduler_constraints(date: Optional[datetime.date] = None, scope: Optional[str] = None,
+                                      target: Optional[str] = None, db: Session = Depends(get_db),
+                                      current_user: models.User = Depends(auth.get_current_user)):
+    # enabled constraints valid on `date` (default today); target also returns the scope's catch-all rules
+    if target is not None and scope is None:
+        raise HTTPException(status_code=400, detail="target requires scope")
+    return get_constraint_index(db).active(date or datetime.date.today(), scope, target)
+
 @router.post("/scheduler-constraints/", response_model=schemas.SchedulerConstraintResponse)
 def create_scheduler_constraint(p: schemas.SchedulerConstraintCreate, db: Session = Depends(get_db),
                                 current_user: models.User = Depends(auth.get_current_user)):
@@ -36,6 +48,8 @@ def create_scheduler_constraint(p: schemas.SchedulerConstraintCreate, db: Sessio
     # Create using new schema fields (name, category, rule_text, etc.)
     row = models.SchedulerConstraint(**p.model_dump())
     db.add(row)
+    db.flush()
+    changes.record(db, "scheduler_constraints", row.id, changes.INSERT)
     db.commit()
     db.refresh(row)
     return row
@@ -68,6 +82,7 @@ def update_scheduler_constraint(id: int, p: schemas.SchedulerConstraintUpdate, d
     for k, v in data.items():
         setattr(row, k, v)
 
+    changes.record(db, "scheduler_constraints", row.id, changes.UPDATE)
     db.commit()
     db.refresh(row)
     return row
@@ -90,5 +105,12 @@ def delete_scheduler_constraint(id: int, db: Session = Depends(get_db),
         raise HTTPException(status_code=403, detail="Not allowed")
 
     db.delete(row)
+    changes.record(db, "scheduler_constraints", id, changes.DELETE)
     db.commit()
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+@router.get("/scheduler-constraints/evaluate")
+def evaluate_scheduler_constraints(semester: str, db: Session = Depends(get_db),
+                                   current_user: models.User = Depends(auth.get_current_user)):
+    """Check every enabled, in-window constraint against the semester's schedule."""
+    return evaluate(db, semester)
@@ -0,0 +1,92 @@
+# api/routers/events.py
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from ..database import SessionLocal
+from .. import models, auth
+from ..events import hub, QUEUE_SIZE
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+
+
+def _format(event: dict) -> str:
+    head = f"id: {event['seq']}\n" if event.get("seq") is not None else ""
+    return f"{head}event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def _authenticate(token: str) -> models.User:
+    # same check as auth.get_current_user, on a short-lived session of its own
+    db = SessionLocal()
+    try:
+        return auth.get_current_user(token, db)
+    finally:
+        db.close()
+
+
+def _missed(last_id: int) -> List[dict]:
+    # blocking DB read, run in the thread pool so reconnects don't stall the event loop
+    db = SessionLocal()
+    try:
+        # one more than fits: an overflow turns into a resync event
+        rows = db.query(models.ChangeLog).filter(models.ChangeLog.seq > last_id)\
+            .order_by(models.ChangeLog.seq).limit(QUEUE_SIZE + 1).all()
+        return [{"type": "change", "seq": r.seq, "entity": r.entity, "entity_id": r.entity_id,
+                 "op": r.op, "semester": r.semester} for r in rows]
+    finally:
+        db.close()
+
+
+@router.get("/stream")
+async def stream_events(request: Request, semester: Optional[str] = None, token: Optional[str] = None):
+    """
+    Server-sent events for schedule, offer, module and room changes.
+    Each event carries seq/entity/entity_id/op; clients apply it via GET /changes?since=.
+    Reconnects send Last-Event-ID and get the missed events replayed from change_log.
+    EventSource can't set headers, so the access token may come as ?token=.
+    """
+    if token is None:
+        scheme, _, value = request.headers.get("authorization", "").partition(" ")
+        token = value if scheme.lower() == "bearer" else None
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    await run_in_threadpool(_authenticate, token)
+
+    sub = hub.subscribe(semester)
+    if sub is None:
+        raise HTTPException(status_code=503, detail="Too many live viewers, poll /changes instead")
+
+    last_id = request.headers.get("last-event-id")
+    if last_id and last_id.isdigit():
+        try:
+            missed = await run_in_threadpool(_missed, int(last_id))
+        except Exception:
+            hub.unsubscribe(sub)
+            raise
+        for event in missed:
+            if sub.wants(event["semester"]):
+                sub.offer(event)
+
+    async def gen():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _format(event)
+        finally:
+            hub.unsubscribe(sub)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(gen(), media_type="text/event-stream", headers=headers)
@@ -0,0 +1,115 @@
+# api/routers/export.py
+import csv
+import io
+import json
+import zlib
+from typing import Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+
+from ..database import get_db, SessionLocal
+from .. import models, auth
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+YIELD_PER = 1000
+CHUNK_BYTES = 64 * 1024
+
+COLUMNS = [
+    "offered_module_id", "module_code", "module_name", "ects", "room_type", "program_id", "module_semester",
+    "lecturer_id", "lecturer_first_name", "lecturer_last_name", "offer_status",
+    "schedule_entry_id", "day_of_week", "start_time", "end_time", "group_id",
+    "room_id", "room_name", "room_location",
+]
+
+
+def _statement(semester: str):
+    """One row per schedule entry (or per offer without entries), everything joined in."""
+    O, M, L, E, R = models.OfferedModule, models.Module, models.Lecturer, models.ScheduleEntry, models.Room
+    return (
+        select(
+            O.id, M.module_code, M.name, M.ects, M.room_type, M.program_id, M.semester,
+            L.id, L.first_name, L.last_name, O.status,
+            E.id, E.day_of_week, E.start_time, E.end_time, E.group_id,
+            R.id, R.name, R.location,
+        )
+        .select_from(O)
+        .join(M, O.module_code == M.module_code)
+        .outerjoin(L, O.lecturer_id == L.id)
+        .outerjoin(E, and_(E.offered_module_id == O.id, E.semester == semester))
+        .outerjoin(R, E.room_id == R.id)
+        .where(O.semester == semester)
+        .order_by(O.id, E.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+
+
+def _rows(semester: str) -> Iterator[tuple]:
+    # own session: the request's session is closed before the body is streamed
+    db = SessionLocal()
+    try:
+        for row in db.execute(_statement(semester)):
+            yield tuple(row)
+    finally:
+        db.close()
+
+
+def _ndjson(semester: str) -> Iterator[bytes]:
+    buf = io.StringIO()
+    for row in _rows(semester):
+        buf.write(json.dumps(dict(zip(COLUMNS, row)), default=str))
+        buf.write("\n")
+        if buf.tell() >= CHUNK_BYTES:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _csv_gz(semester: str) -> Iterator[bytes]:
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    for row in _rows(semester):
+        writer.writerow(row)
+        if buf.tell() >= CHUNK_BYTES:
+            out = gz.compress(buf.getvalue().encode("utf-8"))
+            buf.seek(0)
+            buf.truncate()
+            if out:
+                yield out
+    yield gz.compress(buf.getvalue().encode("utf-8")) + gz.flush()
+
+
+@router.get("/semester/{name}")
+def export_semester(
+    name: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Denormalized offers x schedule x room/lecturer/module rows for one semester,
+    streamed in ~64 KB chunks from a server-side cursor. csv comes gzip-compressed.
+    """
+    if not db.query(models.OfferedModule.id).filter(models.OfferedModule.semester == name).first() and \
+            not db.query(models.Semester.id).filter(models.Semester.name == name).first():
+        raise HTTPException(status_code=404, detail="Semester not found")
+
+    filename = name.replace('"', "").replace(" ", "_")
+    if format == "csv":
+        return StreamingResponse(
+            _csv_gz(name),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.csv.gz"'},
+        )
+    return StreamingResponse(
+        _ndjson(name),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson"'},
+    )
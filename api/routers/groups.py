@@ -4,8 +4,9 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from ..database import get_db
-from .. import models, schemas, auth
-from ..permissions import role_of, is_admin_or_pm, group_payload_in_hosp_domain
+from .. import models, schemas, auth, changes
+from ..permissions import role_of, is_admin_or_pm, group_payload_in_hosp_domain, group_is_in_hosp_domain
+from ..group_index import get_hierarchy
 
 router = APIRouter(prefix="/groups", tags=["groups"])
 
@@ -18,6 +19,28 @@ def read_groups(db: Session = Depends(get_db)):
     return db.query(models.Group).all()
 
 
+def _groups_by_ids(db: Session, ids) -> List[models.Group]:
+    if not ids:
+        return []
+    return db.query(models.Group).filter(models.Group.id.in_(ids)).order_by(models.Group.id).all()
+
+
+@router.get("/{id}/descendants", response_model=List[schemas.GroupResponse])
+def read_group_descendants(id: int, db: Session = Depends(get_db)):
+    h = get_hierarchy(db)
+    if id not in h.name:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return _groups_by_ids(db, h.descendants(id))
+
+
+@router.get("/{id}/ancestors", response_model=List[schemas.GroupResponse])
+def read_group_ancestors(id: int, db: Session = Depends(get_db)):
+    h = get_hierarchy(db)
+    if id not in h.name:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return _groups_by_ids(db, h.ancestors(id))
+
+
 # --- ESCRITURA (POST/PUT/DELETE) ---
 # Aquí mantenemos la protección para que el estudiante no rompa nada,
 # pero la lectura de arriba ya está arreglada.
@@ -30,10 +53,17 @@ def create_group(p: schemas.GroupCreate, db: Session = Depends(get_db),
         if role_of(current_user) == "hosp" and not group_payload_in_hosp_domain(db, current_user, p.program):
             raise HTTPException(status_code=403, detail="Unauthorized for this program")
 
+        h = get_hierarchy(db)
+        if h.would_cycle(None, p.name, p.parent_group):
+            raise HTTPException(status_code=400, detail="Parent group would create a cycle")
+
         row = models.Group(**p.model_dump())
         db.add(row)
+        db.flush()
+        changes.record(db, "groups", row.id, changes.INSERT)
         db.commit()
         db.refresh(row)
+        h.upsert(row.id, row.name, row.parent_group)
         return row
     raise HTTPException(status_code=403, detail="Not allowed")
 
@@ -52,10 +82,16 @@ def update_group(id: int, p: schemas.GroupUpdate, db: Session = Depends(get_db),
                 raise HTTPException(status_code=403, detail="Unauthorized")
 
         data = p.model_dump(exclude_unset=True)
+        h = get_hierarchy(db)
+        if h.would_cycle(id, data.get("name", row.name), data.get("parent_group", row.parent_group)):
+            raise HTTPException(status_code=400, detail="Parent group would create a cycle")
+
         for k, v in data.items():
             setattr(row, k, v)
+        changes.record(db, "groups", row.id, changes.UPDATE)
         db.commit()
         db.refresh(row)
+        h.upsert(row.id, row.name, row.parent_group)
         return row
     raise HTTPException(status_code=403, detail="Not allowed")
 
@@ -68,6 +104,8 @@ def delete_group(id: int, db: Session = Depends(get_db),
         row = db.query(models.Group).filter(models.Group.id == id).first()
         if row:
             db.delete(row)
+            changes.record(db, "groups", id, changes.DELETE)
             db.commit()
+            get_hierarchy(db).remove(id)
         return {"ok": True}
     raise HTTPException(status_code=403, detail="Not allowed")
\ No newline at end of file
@@ -0,0 +1,81 @@
+# api/routers/jobs.py
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from .. import models, schemas, auth
+from ..jobs import runner, QueueFull, FINISHED, SUCCEEDED
+from ..permissions import is_admin_or_pm
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def submit_job(db: Session, current_user: models.User, kind: str, params: dict) -> models.Job:
+    """Shared by POST /jobs/ and the routers' own "run in background" endpoints."""
+    try:
+        return runner.submit(db, kind, params, current_user.id)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind: {kind}")
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Too many jobs queued, try again later")
+
+
+def _get_job(db: Session, job_id: str, current_user: models.User) -> models.Job:
+    job = db.get(models.Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.created_by != current_user.id and not is_admin_or_pm(current_user):
+        raise HTTPException(status_code=403, detail="Not allowed")
+    return job
+
+
+@router.get("/kinds", response_model=List[str])
+def list_job_kinds(current_user: models.User = Depends(auth.get_current_user)):
+    return sorted(runner.kinds)
+
+
+@router.post("/", response_model=schemas.JobResponse, status_code=202)
+def create_job(payload: schemas.JobSubmit, db: Session = Depends(get_db),
+               current_user: models.User = Depends(auth.get_current_user)):
+    return submit_job(db, current_user, payload.kind, payload.params)
+
+
+@router.get("/", response_model=List[schemas.JobResponse])
+def list_jobs(status: Optional[str] = None, kind: Optional[str] = None, limit: int = 50,
+              db: Session = Depends(get_db),
+              current_user: models.User = Depends(auth.get_current_user)):
+    q = db.query(models.Job)
+    if not is_admin_or_pm(current_user):
+        q = q.filter(models.Job.created_by == current_user.id)
+    if status:
+        q = q.filter(models.Job.status == status)
+    if kind:
+        q = q.filter(models.Job.kind == kind)
+    return q.order_by(models.Job.created_at.desc()).limit(max(1, min(limit, 200))).all()
+
+
+@router.get("/{job_id}", response_model=schemas.JobResponse)
+def get_job(job_id: str, db: Session = Depends(get_db),
+            current_user: models.User = Depends(auth.get_current_user)):
+    return _get_job(db, job_id, current_user)
+
+
+@router.post("/{job_id}/cancel", response_model=schemas.JobResponse)
+def cancel_job(job_id: str, db: Session = Depends(get_db),
+               current_user: models.User = Depends(auth.get_current_user)):
+    job = _get_job(db, job_id, current_user)
+    if job.status in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return runner.cancel(db, job)
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str, db: Session = Depends(get_db),
+                   current_user: models.User = Depends(auth.get_current_user)):
+    job = _get_job(db, job_id, current_user)
+    if job.status != SUCCEEDED:
+        detail = job.error if job.error else f"Job is {job.status}"
+        raise HTTPException(status_code=409, detail=detail)
+    return job.result
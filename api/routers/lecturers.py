@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session, joinedload
 from typing import List
 
 from ..database import get_db
-from .. import models, schemas, auth
+from .. import models, schemas, auth, changes
 from ..permissions import role_of, is_admin_or_pm, require_admin_or_pm, require_lecturer_link
 
 router = APIRouter(prefix="/lecturers", tags=["lecturers"])
@@ -130,6 +130,7 @@ def update_my_lecturer_profile(
     for k, v in data.items():
         setattr(lec, k, v)
 
+    changes.record(db, "lecturers", lec.id, changes.UPDATE)
     db.commit()
 
     lec = (
@@ -167,6 +168,8 @@ def create_lecturer(
     _sync_single_domain_fk(row)
 
     db.add(row)
+    db.flush()
+    changes.record(db, "lecturers", row.id, changes.INSERT)
     db.commit()
 
     row = _load_lecturer_with_relations(db, row.id)
@@ -197,10 +200,26 @@ def update_lecturer(
             row.domains = _validate_and_fetch_domains(db, domain_ids)
             _sync_single_domain_fk(row)
 
+    renamed = any(k in data and data[k] != getattr(row, k) for k in ("first_name", "last_name"))
     # keep old behavior for all other fields
     for k, v in data.items():
         setattr(row, k, v)
 
+    changes.record(db, "lecturers", row.id, changes.UPDATE)
+    if renamed:
+        # offer and schedule rows show the lecturer name
+        offers = db.query(models.OfferedModule.id, models.OfferedModule.semester)\
+            .filter(models.OfferedModule.lecturer_id == row.id).all()
+        for offer_id, semester in offers:
+            changes.record(db, "offered_modules", offer_id, changes.UPDATE, semester)
+        entries = (
+            db.query(models.ScheduleEntry.id, models.ScheduleEntry.semester)
+            .join(models.OfferedModule, models.ScheduleEntry.offered_module_id == models.OfferedModule.id)
+            .filter(models.OfferedModule.lecturer_id == row.id)
+            .all()
+        )
+        for entry_id, semester in entries:
+            changes.record(db, "schedule", entry_id, changes.UPDATE, semester)
     db.commit()
 
     row = _load_lecturer_with_relations(db, id)
@@ -217,6 +236,7 @@ def delete_lecturer(
     row = db.query(models.Lecturer).filter(models.Lecturer.id == id).first()
     if row:
         db.delete(row)
+        changes.record(db, "lecturers", id, changes.DELETE)
         db.commit()
     return {"ok": True}
 
@@ -275,6 +295,7 @@ def set_lecturer_modules(
             raise HTTPException(status_code=400, detail=f"Unknown module_code(s): {missing}")
         lec.modules = mods
 
+    changes.record(db, "lecturers", lec.id, changes.UPDATE)
     db.commit()
 
     lec = (
@@ -4,8 +4,10 @@ from typing import List, Optional, Any
 import json
 
 from ..database import get_db
-from .. import models, schemas, auth
+from .. import models, schemas, auth, changes
 from ..permissions import role_of, is_admin_or_pm, hosp_program_ids
+from ..equipment import mask_of, keys_of
+from .offered_modules import record_offer_delete
 
 router = APIRouter(prefix="/modules", tags=["modules"])
 
@@ -112,6 +114,13 @@ def _normalize_assessments(breakdown) -> List[dict]:
 
 
 
+def _equipment_mask(keys) -> int:
+    try:
+        return mask_of(keys)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 def _make_response(row: models.Module) -> schemas.ModuleResponse:
     payload = _parse_module_payload(row.assessment_type)
     assessments = payload.get("assessments") or []
@@ -133,7 +142,8 @@ def _make_response(row: models.Module) -> schemas.ModuleResponse:
         category=row.category,
         program_id=row.program_id,
         specializations=specializations_mapped,
-        assessment_breakdown=assessments
+        assessment_breakdown=assessments,
+        required_equipment=keys_of(row.required_equipment_mask),
     )
 
 
@@ -175,6 +185,7 @@ def create_module(
     data = p.model_dump()
     spec_ids = data.pop("specialization_ids", None)
     assessment_breakdown = data.pop("assessment_breakdown", None)
+    data["required_equipment_mask"] = _equipment_mask(data.pop("required_equipment", None))
 
     if assessment_breakdown is not None:
         normalized = _normalize_assessments(assessment_breakdown)
@@ -187,6 +198,7 @@ def create_module(
         row.specializations = specs
 
     db.add(row)
+    changes.record(db, "modules", row.module_code, changes.INSERT)
     db.commit()
     db.refresh(row)
 
@@ -243,9 +255,30 @@ def update_module(
         normalized = _normalize_assessments(assessment_breakdown)
         row.assessment_type = json.dumps({"assessments": normalized, "lecturer_assignments": []})
 
+    if "required_equipment" in data:
+        required = data.pop("required_equipment")
+        if required is not None:
+            row.required_equipment_mask = _equipment_mask(required)
+
+    renamed = "name" in data and data["name"] != row.name
     for k, v in data.items():
         setattr(row, k, v)
 
+    changes.record(db, "modules", row.module_code, changes.UPDATE)
+    if renamed:
+        # offer and schedule rows show the module name
+        offers = db.query(models.OfferedModule).filter(models.OfferedModule.module_code == row.module_code).all()
+        for o in offers:
+            changes.record(db, "offered_modules", o.id, changes.UPDATE, o.semester)
+        entries = (
+            db.query(models.ScheduleEntry.id, models.ScheduleEntry.semester)
+            .join(models.OfferedModule, models.ScheduleEntry.offered_module_id == models.OfferedModule.id)
+            .filter(models.OfferedModule.module_code == row.module_code)
+            .all()
+        )
+        for entry_id, semester in entries:
+            changes.record(db, "schedule", entry_id, changes.UPDATE, semester)
+
     db.commit()
     db.refresh(row)
     return _make_response(row)
@@ -273,6 +306,11 @@ def delete_module(
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
 
+    # offers (and their schedule entries) go with the module (ON DELETE CASCADE)
+    for o in db.query(models.OfferedModule).filter(models.OfferedModule.module_code == module_code).all():
+        record_offer_delete(db, o)
+    changes.record(db, "modules", module_code, changes.DELETE)
+
     db.delete(row)
     db.commit()
     return {"ok": True}
\ No newline at end of file
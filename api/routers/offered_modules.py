@@ -4,7 +4,10 @@ from typing import List, Optional
 from pydantic import BaseModel
 
 from ..database import get_db
-from .. import models, auth
+from .. import models, auth, changes, schemas
+from ..assignment import compute_assignment
+from ..jobs import runner
+from .jobs import submit_job
 
 router = APIRouter(prefix="/offered-modules", tags=["offered-modules"])
 
@@ -33,6 +36,64 @@ class OfferResponse(BaseModel):
         orm_mode = True
 
 
+class AssignmentProposal(BaseModel):
+    offered_module_id: int
+    module_code: str
+    module_name: str
+    lecturer_id: int
+    lecturer_name: str
+    cost: int
+
+
+class AssignmentSkipped(BaseModel):
+    offered_module_id: int
+    module_code: str
+    reason: str
+
+
+class AssignmentPreview(BaseModel):
+    semester: str
+    proposals: List[AssignmentProposal]
+    unassigned: List[AssignmentSkipped]
+    total_cost: int
+
+
+class AssignmentItem(BaseModel):
+    offered_module_id: int
+    lecturer_id: int
+
+
+class AssignmentApply(BaseModel):
+    assignments: List[AssignmentItem]
+
+
+def _map_offer(r: models.OfferedModule) -> dict:
+    return {
+        "id": r.id,
+        "module_code": r.module_code,
+        "module_name": r.module.name if r.module else "Unknown Module",
+        "lecturer_name": f"{r.lecturer.first_name} {r.lecturer.last_name}" if r.lecturer else "Unassigned",
+        "semester": r.semester,
+        "status": r.status,
+    }
+
+
+def _record_offer_update(db: Session, offer: models.OfferedModule):
+    # schedule rows carry the lecturer name, so they change with the offer
+    changes.record(db, "offered_modules", offer.id, changes.UPDATE, offer.semester)
+    entry_ids = db.query(models.ScheduleEntry.id).filter(models.ScheduleEntry.offered_module_id == offer.id).all()
+    for (entry_id,) in entry_ids:
+        changes.record(db, "schedule", entry_id, changes.UPDATE, offer.semester)
+
+
+def record_offer_delete(db: Session, offer: models.OfferedModule):
+    # schedule entries go with the offer (ON DELETE CASCADE)
+    entry_ids = db.query(models.ScheduleEntry.id).filter(models.ScheduleEntry.offered_module_id == offer.id).all()
+    for (entry_id,) in entry_ids:
+        changes.record(db, "schedule", entry_id, changes.DELETE, offer.semester)
+    changes.record(db, "offered_modules", offer.id, changes.DELETE, offer.semester)
+
+
 @router.get("/", response_model=List[OfferResponse])
 def get_offers(
     semester: str = None,
@@ -47,20 +108,7 @@ def get_offers(
         query = query.filter(models.OfferedModule.semester == semester)
 
     results = query.all()
-
-    mapped = []
-    for r in results:
-        mapped.append(
-            {
-                "id": r.id,
-                "module_code": r.module_code,
-                "module_name": r.module.name if r.module else "Unknown Module",
-                "lecturer_name": f"{r.lecturer.first_name} {r.lecturer.last_name}" if r.lecturer else "Unassigned",
-                "semester": r.semester,
-                "status": r.status,
-            }
-        )
-    return mapped
+    return [_map_offer(r) for r in results]
 
 
 @router.post("/", response_model=OfferResponse)
@@ -80,6 +128,8 @@ def create_offer(
 
     new_offer = models.OfferedModule(**offer.dict())
     db.add(new_offer)
+    db.flush()
+    changes.record(db, "offered_modules", new_offer.id, changes.INSERT, new_offer.semester)
     db.commit()
     db.refresh(new_offer)
 
@@ -112,6 +162,7 @@ def update_offer(
             raise HTTPException(status_code=400, detail="Invalid lecturer_id")
 
     item.lecturer_id = p.lecturer_id
+    _record_offer_update(db, item)
     db.commit()
 
     # reload for correct names
@@ -122,14 +173,89 @@ def update_offer(
         .first()
     )
 
-    return {
-        "id": item.id,
-        "module_code": item.module_code,
-        "module_name": item.module.name if item.module else "Unknown Module",
-        "lecturer_name": f"{item.lecturer.first_name} {item.lecturer.last_name}" if item.lecturer else "Unassigned",
-        "semester": item.semester,
-        "status": item.status,
+    return _map_offer(item)
+
+
+# Auto-assignment: preview the optimal lecturer assignment for all unassigned
+# offerings of a semester, then apply the (possibly edited) list in one commit.
+@router.get("/assignment/preview", response_model=AssignmentPreview)
+def preview_assignment(
+    semester: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    return compute_assignment(db, semester)
+
+
+@runner.register("offered_modules.assignment_preview")
+def _assignment_preview_job(ctx, db: Session, params: dict):
+    semester = params.get("semester")
+    if not semester:
+        raise ValueError("params.semester is required")
+    ctx.progress(0.0, f"Computing assignment for {semester}")
+    return compute_assignment(db, semester)
+
+
+# same preview as a background job (GET /jobs/{id}/result returns the AssignmentPreview)
+@router.post("/assignment/preview/job", response_model=schemas.JobResponse, status_code=202)
+def preview_assignment_job(
+    semester: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    return submit_job(db, current_user, "offered_modules.assignment_preview", {"semester": semester})
+
+
+@router.post("/assignment/apply", response_model=List[OfferResponse])
+def apply_assignment(
+    p: AssignmentApply,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    ids = [a.offered_module_id for a in p.assignments]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Duplicate offered_module_id in assignments")
+    if not ids:
+        return []
+
+    offers = {o.id: o for o in db.query(models.OfferedModule).filter(models.OfferedModule.id.in_(ids)).all()}
+    missing = [i for i in ids if i not in offers]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Offered module(s) not found: {missing}")
+
+    lec_ids = {a.lecturer_id for a in p.assignments}
+    found = {l.id for l in db.query(models.Lecturer.id).filter(models.Lecturer.id.in_(lec_ids)).all()}
+    bad = sorted(lec_ids - found)
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Invalid lecturer_id(s): {bad}")
+
+    qual = {
+        (r.lecturer_id, r.module_code)
+        for r in db.query(models.lecturer_modules)
+        .filter(models.lecturer_modules.c.lecturer_id.in_(lec_ids))
+        .all()
     }
+    for a in p.assignments:
+        offer = offers[a.offered_module_id]
+        if offer.lecturer_id is not None and offer.lecturer_id != a.lecturer_id:
+            raise HTTPException(status_code=409, detail=f"Offered module {offer.id} was assigned in the meantime")
+        if (a.lecturer_id, offer.module_code) not in qual:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Lecturer {a.lecturer_id} is not qualified for {offer.module_code}",
+            )
+        offer.lecturer_id = a.lecturer_id
+        _record_offer_update(db, offer)
+
+    db.commit()
+
+    rows = (
+        db.query(models.OfferedModule)
+        .options(joinedload(models.OfferedModule.module), joinedload(models.OfferedModule.lecturer))
+        .filter(models.OfferedModule.id.in_(ids))
+        .all()
+    )
+    return [_map_offer(r) for r in rows]
 
 
 @router.delete("/{id}")
@@ -142,6 +268,7 @@ def delete_offer(
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
 
+    record_offer_delete(db, item)
     db.delete(item)
     db.commit()
     return {"ok": True}
@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session, joinedload
 from typing import List
 
 from ..database import get_db
-from .. import models, schemas, auth
+from .. import models, schemas, auth, changes
 from ..permissions import role_of, is_admin_or_pm
 
 router = APIRouter(prefix="/study-programs", tags=["study-programs"])
@@ -38,6 +38,8 @@ def create_program(
 
     db_program = models.StudyProgram(**program.model_dump())
     db.add(db_program)
+    db.flush()
+    changes.record(db, "programs", db_program.id, changes.INSERT)
     db.commit()
     db.refresh(db_program)
     return db_program
@@ -60,6 +62,7 @@ def update_program(
     for key, value in program.model_dump(exclude_unset=True).items():
         setattr(db_program, key, value)
 
+    changes.record(db, "programs", db_program.id, changes.UPDATE)
     db.commit()
     db.refresh(db_program)
     return db_program
@@ -79,5 +82,6 @@ def delete_program(
         raise HTTPException(status_code=404, detail="Program not found")
 
     db.delete(db_program)
+    changes.record(db, "programs", program_id, changes.DELETE)
     db.commit()
     return {"ok": True}
\ No newline at end of file
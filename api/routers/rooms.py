@@ -1,24 +1,108 @@
 # api/routers/rooms.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
 
 from ..database import get_db
-from .. import models, schemas, auth
-from ..permissions import require_admin_or_pm
+from .. import models, schemas, auth, changes
+from ..permissions import program_of_groups, require_admin_or_pm
+from ..room_index import room_index
+from ..equipment import VOCABULARY, BITS, parse_mask, mask_of
+from ..timeslots import window_mask
 
 router = APIRouter(prefix="/rooms", tags=["rooms"])
 
+def _required_mask(equipment: Optional[str]) -> int:
+    try:
+        return mask_of((equipment or "").split(","))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/", response_model=List[schemas.RoomResponse])
-def read_rooms(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    return db.query(models.Room).all()
+def read_rooms(equipment: Optional[str] = None, db: Session = Depends(get_db),
+               current_user: models.User = Depends(auth.get_current_user)):
+    # ?equipment=projector,lab_pcs -> rooms having all of them
+    query = db.query(models.Room)
+    need = _required_mask(equipment)
+    if need:
+        query = query.filter(models.Room.equipment_mask.op("&")(need) == need)
+    return query.all()
+
+
+@router.get("/equipment")
+def read_equipment_vocabulary(current_user: models.User = Depends(auth.get_current_user)):
+    return [{"key": key, "bit": BITS[key], "synonyms": list(syns)} for key, syns in VOCABULARY]
+
+
+def _attending_size(db: Session, module: Optional[models.Module], group_id: Optional[int]) -> Optional[int]:
+    """Explicit group, else the top-level groups of the module's program (they all attend)."""
+    if group_id is not None:
+        group = db.query(models.Group).filter(models.Group.id == group_id).first()
+        if not group:
+            raise HTTPException(status_code=404, detail="Group not found")
+        return group.size
+    if not module or module.program_id is None:
+        return None
+    group_program = program_of_groups(db)
+    sizes = [
+        g.size for g in db.query(models.Group).all()
+        if group_program.get(g.id) == module.program_id and not (g.parent_group or "").strip()
+    ]
+    return sum(sizes) if sizes else None
+
+
+@router.get("/recommend")
+def recommend_rooms(
+    offered_module_id: int,
+    day: str,
+    start: str,
+    end: str,
+    group_id: Optional[int] = None,
+    equipment: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """Free rooms for an offered module at day/start-end, best first.
+    Equipment = the module's required equipment plus ?equipment=key,key."""
+    offer = (
+        db.query(models.OfferedModule)
+        .options(joinedload(models.OfferedModule.module), joinedload(models.OfferedModule.lecturer))
+        .filter(models.OfferedModule.id == offered_module_id)
+        .first()
+    )
+    if not offer:
+        raise HTTPException(status_code=404, detail="Offered module not found")
+    need = window_mask(day, start, end)
+    if not need:
+        raise HTTPException(status_code=400, detail="Invalid day or time range")
+
+    module = offer.module
+    seats = _attending_size(db, module, group_id)
+    return {
+        "offered_module_id": offer.id,
+        "room_type": module.room_type if module else None,
+        "attendees": seats,
+        "rooms": room_index.recommend(
+            db, offer.semester, need,
+            room_type=module.room_type if module else None,
+            seats=seats,
+            equipment=(module.required_equipment_mask if module else 0) | _required_mask(equipment),
+            location=offer.lecturer.location if offer.lecturer else None,
+            limit=limit,
+        ),
+    }
 
 @router.post("/", response_model=schemas.RoomResponse)
 def create_room(p: schemas.RoomCreate, db: Session = Depends(get_db),
                 current_user: models.User = Depends(auth.get_current_user)):
     require_admin_or_pm(current_user)
     row = models.Room(**p.model_dump())
+    row.equipment_mask = parse_mask(row.equipment)
     db.add(row)
+    db.flush()
+    changes.record(db, "rooms", row.id, changes.INSERT)
     db.commit()
     db.refresh(row)
     return row
@@ -32,9 +116,19 @@ def update_room(id: int, p: schemas.RoomUpdate, db: Session = Depends(get_db),
         raise HTTPException(status_code=404, detail="Room not found")
 
     data = p.model_dump(exclude_unset=True)
+    renamed = "name" in data and data["name"] != row.name
     for k, v in data.items():
         setattr(row, k, v)
+    if "equipment" in data:
+        row.equipment_mask = parse_mask(row.equipment)
 
+    changes.record(db, "rooms", row.id, changes.UPDATE)
+    if renamed:
+        # schedule rows show the room name
+        entries = db.query(models.ScheduleEntry.id, models.ScheduleEntry.semester)\
+            .filter(models.ScheduleEntry.room_id == row.id).all()
+        for entry_id, semester in entries:
+            changes.record(db, "schedule", entry_id, changes.UPDATE, semester)
     db.commit()
     db.refresh(row)
     return row
@@ -46,5 +140,6 @@ def delete_room(id: int, db: Session = Depends(get_db),
     row = db.query(models.Room).filter(models.Room.id == id).first()
     if row:
         db.delete(row)
+        changes.record(db, "rooms", id, changes.DELETE)
         db.commit()
     return {"ok": True}
@@ -1,12 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
 from ..database import get_db
-from .. import models, auth
+from .. import models, auth, changes, schemas
+from ..feasibility import semester_feasibility
+from ..group_index import get_hierarchy
+from ..jobs import runner
+from ..occurrences import expand
+from ..permissions import program_of_groups, require_admin_or_pm
+from ..scoring import scorers
+from ..timetable_cache import TIMETABLE_ENTITIES, group_timetables
+from ..timeslots import to_minutes, overlaps, day_index
+from .. import timetable_search
+from .jobs import submit_job
 
 router = APIRouter(prefix="/schedule", tags=["schedule"])
 
+MAX_OCCURRENCE_DAYS = 366
+EXCEPTION_SCOPES = ("university", "program", "group", "lecturer", "room", "module")
+
 
 
 class ScheduleCreate(BaseModel):
@@ -16,6 +32,27 @@ class ScheduleCreate(BaseModel):
     start_time: str  # "08:00"
     end_time: str  # "10:00"
     semester: str  # "Winter 2024"
+    group_id: Optional[int] = None
+
+
+class ScheduleSearch(BaseModel):
+    semester: str
+    starts: int = Field(4, ge=1, le=64)  # independent randomized runs, spread over the CPU cores
+    iterations: int = Field(3000, ge=0, le=200000)  # local-search moves per run
+    seconds: float = Field(20.0, gt=0, le=600)  # time limit per run
+    seed: int = 0
+    keep_existing: bool = False  # True: only place offerings that have no entries yet
+    apply: bool = False  # write the best timetable (updates moved entries, adds new ones)
+
+
+class ScheduleRepair(BaseModel):
+    semester: str
+    # what changed; entries touching any of these count as broken (all empty: check every entry)
+    room_ids: List[int] = []
+    lecturer_ids: List[int] = []
+    offered_module_ids: List[int] = []
+    seed: int = 0
+    apply: bool = True  # False: only report the moves
 
 
 class ScheduleResponse(BaseModel):
@@ -28,6 +65,7 @@ class ScheduleResponse(BaseModel):
     start_time: str
     end_time: str
     semester: str
+    group_id: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -46,29 +84,210 @@ def get_schedule(semester: str, db: Session = Depends(get_db)):
     )
 
     results = query.all()
+    return [_map_entry(r) for r in results]
+
+
+def _map_entry(r: models.ScheduleEntry) -> dict:
+    mod_name = r.offered_module.module.name if (r.offered_module and r.offered_module.module) else "Unknown"
+    lec_name = "Unassigned"
+    if r.offered_module and r.offered_module.lecturer:
+        lec_name = f"{r.offered_module.lecturer.first_name} {r.offered_module.lecturer.last_name}"
+
+    room_name = r.room.name if r.room else "No Room"
+
+    return {
+        "id": r.id,
+        "offered_module_id": r.offered_module_id,
+        "module_name": mod_name,
+        "lecturer_name": lec_name,
+        "room_name": room_name,
+        "day_of_week": r.day_of_week,
+        "start_time": r.start_time,
+        "end_time": r.end_time,
+        "semester": r.semester,
+        "group_id": r.group_id
+    }
+
+
+def _build_group_timetables(db: Session, semester: str) -> Dict[int, List[dict]]:
+    """
+    One query for the whole semester, fanned out to every group:
+    - entries for a group are shown to that group and all of its subgroups
+    - entries without a group are shown to every group of the module's program
+    """
+    h = get_hierarchy(db)
+    results = db.query(models.ScheduleEntry).filter(
+        models.ScheduleEntry.semester == semester
+    ).options(
+        joinedload(models.ScheduleEntry.offered_module).joinedload(models.OfferedModule.module),
+        joinedload(models.ScheduleEntry.offered_module).joinedload(models.OfferedModule.lecturer),
+        joinedload(models.ScheduleEntry.room)
+    ).all()
+
+    by_group: Dict[int, List[dict]] = {gid: [] for (gid,) in db.query(models.Group.id).all()}
+    groups_by_program: Dict[int, List[int]] = {}
+    for gid, pid in program_of_groups(db).items():
+        groups_by_program.setdefault(pid, []).append(gid)
+
+    for r in sorted(results, key=lambda e: (day_index(e.day_of_week) or 0, to_minutes(e.start_time) or 0)):
+        row = _map_entry(r)
+        if r.group_id is not None:
+            targets = h.descendants(r.group_id) | {r.group_id}
+        else:
+            module = r.offered_module.module if r.offered_module else None
+            targets = groups_by_program.get(module.program_id, []) if module else []
+        for gid in targets:
+            if gid in by_group:
+                by_group[gid].append(row)
+    return by_group
+
+
+def cached_group_timetables(db: Session, semester: str) -> Dict[int, List[dict]]:
+    version = changes.version(db, TIMETABLE_ENTITIES, semester)
+    by_group = group_timetables.get(semester, version)
+    if by_group is None:
+        by_group = _build_group_timetables(db, semester)
+        group_timetables.put(semester, version, by_group)
+    return by_group
+
+
+@router.get("/feasibility")
+def get_feasibility(semester: str, db: Session = Depends(get_db)):
+    # demand vs supply bounds per room type, lecturer and group; any bottleneck means it cannot fit
+    return semester_feasibility(db, semester)
+
+
+@router.get("/score")
+def get_score(semester: str, db: Session = Depends(get_db)):
+    """Weighted penalty breakdown of the semester's timetable (lower is better)."""
+    return scorers.get(db, semester).report()
+
+
+@router.get("/score/delta")
+def get_score_delta(entry_id: int, day_of_week: Optional[str] = None, start_time: Optional[str] = None,
+                    end_time: Optional[str] = None, room_id: Optional[int] = None,
+                    db: Session = Depends(get_db)):
+    """Score impact of moving one entry (omitted fields stay as they are); nothing is saved."""
+    entry = db.query(models.ScheduleEntry).filter(models.ScheduleEntry.id == entry_id).first()
+    if not entry:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    if day_of_week is not None and day_index(day_of_week) is None:
+        raise HTTPException(status_code=400, detail="Invalid day_of_week")
+    scorer = scorers.get(db, entry.semester)
+    if entry_id not in scorer.rows:
+        raise HTTPException(status_code=409, detail="Entry changed, reload the schedule")
+    try:
+        row = scorer.moved_row(entry_id, day_of_week, start_time, end_time, room_id)
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Invalid room_id")
+    if row["start"] is None or row["end"] is None or row["end"] <= row["start"]:
+        raise HTTPException(status_code=400, detail="Invalid start_time/end_time")
+    return scorer.delta(db, row)
+
+
+@router.get("/occurrences")
+def get_occurrences(date_from: datetime.date = Query(..., alias="from"), date_to: datetime.date = Query(..., alias="to"),
+                    semester: Optional[str] = None, lecturer_id: Optional[int] = None,
+                    room_id: Optional[int] = None, group_id: Optional[int] = None,
+                    include_cancelled: bool = False, db: Session = Depends(get_db)):
+    """Dated teaching occurrences in [from, to], generated from the weekly entries minus exceptions."""
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="'to' is before 'from'")
+    if (date_to - date_from).days > MAX_OCCURRENCE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Window is limited to {MAX_OCCURRENCE_DAYS} days")
+
+    tests = []
+    if lecturer_id is not None:
+        tests.append(lambda r: r["lecturer"] == lecturer_id)
+    if room_id is not None:
+        tests.append(lambda r: r["room_id"] == room_id)
+    if group_id is not None:
+        # what the group's timetable shows: its own and its ancestors' entries, and its program's untargeted ones
+        lineage = get_hierarchy(db).lineage(group_id)
+        program = program_of_groups(db).get(group_id)
+        tests.append(lambda r: r["group"] in lineage if r["group"] is not None
+                     else program is not None and r["program"] == program)
+    keep = (lambda r: all(t(r) for t in tests)) if tests else None
+    # rows are plain JSON already; skip the per-item encoder pass
+    return JSONResponse(list(expand(db, date_from, date_to, semester, keep, include_cancelled)))
+
 
-    mapped = []
-    for r in results:
+@router.get("/exceptions", response_model=List[schemas.ScheduleExceptionResponse])
+def list_exceptions(date_from: Optional[datetime.date] = Query(None, alias="from"),
+                    date_to: Optional[datetime.date] = Query(None, alias="to"), db: Session = Depends(get_db)):
+    X = models.ScheduleException
+    q = db.query(X)
+    if date_to is not None:
+        q = q.filter(X.start_date <= date_to)
+    if date_from is not None:
+        q = q.filter(func.coalesce(X.end_date, X.start_date) >= date_from)
+    return q.order_by(X.start_date, X.id).all()
 
-        mod_name = r.offered_module.module.name if (r.offered_module and r.offered_module.module) else "Unknown"
-        lec_name = "Unassigned"
-        if r.offered_module and r.offered_module.lecturer:
-            lec_name = f"{r.offered_module.lecturer.first_name} {r.offered_module.lecturer.last_name}"
 
-        room_name = r.room.name if r.room else "No Room"
+@router.post("/exceptions", response_model=schemas.ScheduleExceptionResponse)
+def create_exception(p: schemas.ScheduleExceptionCreate, db: Session = Depends(get_db),
+                     current_user: models.User = Depends(auth.get_current_user)):
+    require_admin_or_pm(current_user)
+    if p.end_date is not None and p.end_date < p.start_date:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+    if (p.scope or "").strip().lower() not in EXCEPTION_SCOPES:
+        raise HTTPException(status_code=400, detail=f"scope must be one of {', '.join(EXCEPTION_SCOPES)}")
+    if p.entry_id is not None and not db.query(models.ScheduleEntry.id).filter(
+            models.ScheduleEntry.id == p.entry_id).first():
+        raise HTTPException(status_code=404, detail="Entry not found")
+
+    row = models.ScheduleException(**p.model_dump())
+    db.add(row)
+    db.flush()
+    changes.record(db, "schedule_exceptions", row.id, changes.INSERT)
+    db.commit()
+    db.refresh(row)
+    return row
+
+
+@router.delete("/exceptions/{id}")
+def delete_exception(id: int, db: Session = Depends(get_db),
+                     current_user: models.User = Depends(auth.get_current_user)):
+    require_admin_or_pm(current_user)
+    row = db.query(models.ScheduleException).filter(models.ScheduleException.id == id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Exception not found")
+    db.delete(row)
+    changes.record(db, "schedule_exceptions", id, changes.DELETE)
+    db.commit()
+    return {"ok": True}
+
+
+@router.get("/group/{group_id}", response_model=List[ScheduleResponse])
+def get_group_schedule(group_id: int, semester: str, db: Session = Depends(get_db)):
+    rows = cached_group_timetables(db, semester).get(group_id)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return rows
+
 
-        mapped.append({
-            "id": r.id,
-            "offered_module_id": r.offered_module_id,
-            "module_name": mod_name,
-            "lecturer_name": lec_name,
-            "room_name": room_name,
-            "day_of_week": r.day_of_week,
-            "start_time": r.start_time,
-            "end_time": r.end_time,
-            "semester": r.semester
-        })
-    return mapped
+def _check_group_clash(db: Session, entry: ScheduleCreate):
+    # a parent's lecture clashes with any subgroup's seminar and vice versa
+    h = get_hierarchy(db)
+    if entry.group_id not in h.name:
+        raise HTTPException(status_code=400, detail="Invalid group_id")
+
+    start, end = to_minutes(entry.start_time), to_minutes(entry.end_time)
+    if start is None or end is None or end <= start:
+        raise HTTPException(status_code=400, detail="Invalid start_time/end_time")
+
+    same_slot = db.query(models.ScheduleEntry).filter(
+        models.ScheduleEntry.semester == entry.semester,
+        models.ScheduleEntry.day_of_week == entry.day_of_week,
+        models.ScheduleEntry.group_id.in_(h.related(entry.group_id)),
+    ).all()
+    for other in same_slot:
+        o_start, o_end = to_minutes(other.start_time), to_minutes(other.end_time)
+        if o_start is not None and o_end is not None and overlaps(start, end, o_start, o_end):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Group clash with entry {other.id} ({other.start_time}-{other.end_time})",
+            )
 
 
 @router.post("/", response_model=ScheduleResponse)
@@ -80,6 +299,9 @@ def create_schedule_entry(entry: ScheduleCreate, db: Session = Depends(get_db)):
     if not offer:
         raise HTTPException(status_code=404, detail="Offered Module not found")
 
+    _lock_semester(db, entry.semester)
+    if entry.group_id is not None:
+        _check_group_clash(db, entry)
 
     new_entry = models.ScheduleEntry(
         offered_module_id=entry.offered_module_id,
@@ -87,10 +309,13 @@ def create_schedule_entry(entry: ScheduleCreate, db: Session = Depends(get_db)):
         day_of_week=entry.day_of_week,
         start_time=entry.start_time,
         end_time=entry.end_time,
-        semester=entry.semester
+        semester=entry.semester,
+        group_id=entry.group_id
     )
 
     db.add(new_entry)
+    db.flush()
+    changes.record(db, "schedule", new_entry.id, changes.INSERT, new_entry.semester)
     db.commit()
     db.refresh(new_entry)
 
@@ -104,7 +329,8 @@ def create_schedule_entry(entry: ScheduleCreate, db: Session = Depends(get_db)):
         "day_of_week": new_entry.day_of_week,
         "start_time": new_entry.start_time,
         "end_time": new_entry.end_time,
-        "semester": new_entry.semester
+        "semester": new_entry.semester,
+        "group_id": new_entry.group_id
     }
 
 
@@ -114,6 +340,156 @@ def delete_schedule_entry(id: int, db: Session = Depends(get_db)):
     if not entry:
         raise HTTPException(status_code=404, detail="Entry not found")
 
+    semester = entry.semester
+    _lock_semester(db, semester)
     db.delete(entry)
+    changes.record(db, "schedule", id, changes.DELETE, semester)
     db.commit()
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+
+def _lock_semester(db: Session, semester: str):
+    """Serializes writers of one semester's schedule until commit (row lock on the semester)."""
+    db.query(models.Semester.id).filter(models.Semester.name == semester).with_for_update().first()
+
+
+def _schedule_head(db: Session, semester: str) -> int:
+    return db.query(func.max(models.ChangeLog.seq)).filter(
+        models.ChangeLog.entity == "schedule", models.ChangeLog.semester == semester
+    ).scalar() or 0
+
+
+@runner.register("schedule.search", restartable=False)  # a rerun with apply could write twice
+def _search_job(ctx, db: Session, params: dict):
+    req = ScheduleSearch(**params)
+    head = _schedule_head(db, req.semester)
+    problem = timetable_search.build_problem(db, req.semester, keep_existing=req.keep_existing)
+    db.rollback()  # don't hold the read transaction while the workers run
+    ctx.progress(0.0, f"{problem.n} blocks, {req.starts} starts")
+
+    found = timetable_search.search(
+        problem, req.starts, req.iterations, req.seconds, req.seed,
+        on_start=lambda done: ctx.progress(done / req.starts, f"{done}/{req.starts} starts finished"),
+        cancelled=lambda: ctx.cancelled,
+    )
+    ctx.check()
+    best = found["best"]
+    if best is None:
+        return {"semester": req.semester, "blocks": 0, "entries": [], **found}
+
+    rows = timetable_search.placements(problem, best["at"], best["rm"])
+    result = {
+        "semester": req.semester,
+        "blocks": problem.n,
+        "best_seed": best["seed"],
+        "cost": timetable_search.breakdown(problem, best["at"], best["rm"]),
+        "workers": found["workers"],
+        "seconds": found["seconds"],
+        "runs": found["runs"],
+        "entries": rows,
+        "applied": False,
+    }
+    if req.apply:
+        hard = {k: v for k, v in result["cost"].items() if k in timetable_search.HARD and v}
+        if hard:
+            raise RuntimeError(f"Best timetable still violates hard constraints {hard}; result not applied")
+        # held until the commit, so no schedule write lands between the check and ours
+        _lock_semester(db, req.semester)
+        if _schedule_head(db, req.semester) != head:
+            raise RuntimeError("Schedule changed while searching; result not applied")
+        stored = {e.id: e for e in db.query(models.ScheduleEntry).filter(
+            models.ScheduleEntry.semester == req.semester).all()}
+        for row in rows:
+            fields = {k: row[k] for k in ("day_of_week", "start_time", "end_time", "room_id")}
+            entry = stored.get(row["entry_id"]) if row["entry_id"] is not None else None
+            if entry is not None:
+                if row["moved"]:
+                    for k, v in fields.items():
+                        setattr(entry, k, v)
+                    changes.record(db, "schedule", entry.id, changes.UPDATE, req.semester)
+            else:
+                entry = models.ScheduleEntry(offered_module_id=row["offered_module_id"], group_id=row["group_id"],
+                                             semester=req.semester, **fields)
+                db.add(entry)
+                db.flush()
+                row["entry_id"] = entry.id
+                changes.record(db, "schedule", entry.id, changes.INSERT, req.semester)
+        db.commit()
+        result["applied"] = True
+    return result
+
+
+@router.post("/search", response_model=schemas.JobResponse, status_code=202)
+def search_schedule(payload: ScheduleSearch, db: Session = Depends(get_db),
+                    current_user: models.User = Depends(auth.get_current_user)):
+    """Multi-start timetable search as a background job; GET /jobs/{id}/result has the best timetable."""
+    return submit_job(db, current_user, "schedule.search", payload.model_dump())
+
+
+
+def _slot(row: dict) -> dict:
+    return {k: row[k] for k in ("day_of_week", "start_time", "end_time", "room_id")}
+
+
+@router.post("/repair")
+def repair_schedule(payload: ScheduleRepair, db: Session = Depends(get_db),
+                    current_user: models.User = Depends(auth.get_current_user)):
+    """
+    Re-place only the entries a room closure, availability change or offering
+    change broke (plus whatever they now clash with) and write the minimal diff.
+    """
+    require_admin_or_pm(current_user)
+    if payload.apply:
+        _lock_semester(db, payload.semester)
+    entries = (
+        db.query(models.ScheduleEntry)
+        .options(joinedload(models.ScheduleEntry.offered_module))
+        .filter(models.ScheduleEntry.semester == payload.semester)
+        .all()
+    )
+    by_id = {e.id: e for e in entries}
+    scope = None
+    if payload.room_ids or payload.lecturer_ids or payload.offered_module_ids:
+        rooms, lecturers, offers = set(payload.room_ids), set(payload.lecturer_ids), set(payload.offered_module_ids)
+        scope = {
+            e.id for e in entries
+            if e.room_id in rooms or e.offered_module_id in offers
+            or (e.offered_module is not None and e.offered_module.lecturer_id in lecturers)
+        }
+
+    problem = timetable_search.build_problem(db, payload.semester, include_unscheduled=False)
+    fixed = timetable_search.repair(problem, scope, seed=payload.seed)
+    before = timetable_search.placements(problem, problem.init_at, problem.init_room)
+    after = timetable_search.placements(problem, fixed["at"], fixed["rm"])
+
+    def entry_id(b: int) -> int:
+        return before[b]["entry_id"]
+
+    moves = []
+    for b in fixed["moved"]:
+        entry = by_id[entry_id(b)]
+        # "from" is the stored entry; a room-only move keeps its day and times as stored
+        was = {k: getattr(entry, k) for k in ("day_of_week", "start_time", "end_time", "room_id")}
+        to = _slot(after[b]) if fixed["at"][b] != problem.init_at[b] else dict(was, room_id=after[b]["room_id"])
+        moves.append({"entry_id": entry.id, "from": was, "to": to})
+
+    if payload.apply and moves:
+        for m in moves:
+            entry = by_id[m["entry_id"]]
+            for k, v in m["to"].items():
+                if v != m["from"][k]:
+                    setattr(entry, k, v)
+            changes.record(db, "schedule", entry.id, changes.UPDATE, payload.semester)
+        db.commit()
+
+    return {
+        "semester": payload.semester,
+        "affected": [{"entry_id": entry_id(b), "reasons": why} for b, why in sorted(fixed["affected"].items())],
+        "moved": moves,
+        "unresolved": [{"entry_id": entry_id(b), "reasons": why} for b, why in fixed["unresolved"].items()],
+        "cost_before": fixed["cost_before"],
+        "cost_after": fixed["cost_after"],
+        "candidates": fixed["movable"],
+        "seconds": fixed["seconds"],
+        "applied": bool(payload.apply and moves),
+    }
@@ -0,0 +1,35 @@
+# api/routers/search.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from ..database import get_db
+from .. import models, auth
+from ..permissions import role_of, is_admin_or_pm
+from ..search_index import get_search_index, ENTITIES
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+def _lecturer_filter(current_user: models.User):
+    """Same visibility as GET /lecturers/: hosp/admin/pm see all, a lecturer only themself."""
+    r = role_of(current_user)
+    if r == "hosp" or is_admin_or_pm(current_user):
+        return None
+    own = str(current_user.lecturer_id) if r == "lecturer" and current_user.lecturer_id is not None else None
+    return lambda key: key[0] != "lecturers" or key[1] == own
+
+
+@router.get("/")
+def search(
+    q: str = Query(..., min_length=1, max_length=100),
+    entity: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    entities = entity or list(ENTITIES)
+    unknown = [e for e in entities if e not in ENTITIES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown entity: {unknown}")
+    return get_search_index(db).search(q, entities, limit, allow=_lecturer_filter(current_user))
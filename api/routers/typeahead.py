@@ -0,0 +1,29 @@
+# api/routers/typeahead.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from .. import models, auth
+from ..typeahead import typeahead, ENTITIES
+from .search import _lecturer_filter
+
+router = APIRouter(prefix="/typeahead", tags=["typeahead"])
+
+
+@router.get("/{entity}")
+def read_typeahead(
+    entity: str,
+    prefix: str = Query("", max_length=100),
+    k: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """Top-k {id, label} pairs whose label (or any word of it) starts with `prefix`."""
+    if entity not in ENTITIES:
+        raise HTTPException(status_code=404, detail="Unknown entity")
+    allow = None
+    if entity == "lecturers":
+        visible = _lecturer_filter(current_user)
+        if visible is not None:
+            allow = lambda item: visible(("lecturers", item))
+    return typeahead.lookup(db, entity, prefix, k, allow)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Literal
 from datetime import date, datetime
 
 # --- AUTH ---
@@ -154,6 +154,7 @@ class ModuleBase(BaseModel):
 class ModuleCreate(ModuleBase):
     specialization_ids: Optional[List[int]] = []
     assessment_breakdown: Optional[List[AssessmentPart]] = None
+    required_equipment: Optional[List[str]] = []  # keys from equipment.VOCABULARY
 
 class ModuleUpdate(BaseModel):
     name: Optional[str] = None
@@ -165,10 +166,12 @@ class ModuleUpdate(BaseModel):
     category: Optional[str] = None
     program_id: Optional[int] = None
     specialization_ids: Optional[List[int]] = None
+    required_equipment: Optional[List[str]] = None
 
 class ModuleResponse(ModuleBase):
     assessment_breakdown: List[AssessmentPart] = []
     specializations: List[SpecializationResponse] = []
+    required_equipment: List[str] = []
     model_config = {"from_attributes": True}
 
 # --- GROUPS ---
@@ -217,6 +220,7 @@ class RoomUpdate(BaseModel):
 
 class RoomResponse(RoomBase):
     id: int
+    equipment_mask: int = 0
     model_config = {"from_attributes": True}
 
 # --- AVAILABILITY ---
@@ -228,8 +232,20 @@ class AvailabilityResponse(BaseModel):
     id: int
     lecturer_id: int
     schedule_data: Any
+    version: int = 0
     model_config = {"from_attributes": True}
 
+class AvailabilitySlotOp(BaseModel):
+    op: Literal["add", "remove"]
+    day: str
+    start: str
+    end: str
+
+class AvailabilityPatch(BaseModel):
+    # version the client last saw; omit to apply the ops to whatever is stored
+    version: Optional[int] = None
+    ops: List[AvailabilitySlotOp]
+
 # --- SCHEDULER CONSTRAINTS ---
 class SchedulerConstraintBase(BaseModel):
     name: str
@@ -277,4 +293,41 @@ class SemesterUpdate(BaseModel):
 
 class SemesterResponse(SemesterBase):
     id: int
-    model_config = {"from_attributes": True}
\ No newline at end of file
+    model_config = {"from_attributes": True}
+
+# --- SCHEDULE EXCEPTIONS ---
+class ScheduleExceptionBase(BaseModel):
+    kind: Literal["holiday", "cancelled"] = "holiday"
+    name: Optional[str] = None
+    scope: str = "university"
+    target_id: Optional[str] = "0"
+    entry_id: Optional[int] = None
+    start_date: date
+    end_date: Optional[date] = None
+
+class ScheduleExceptionCreate(ScheduleExceptionBase):
+    pass
+
+class ScheduleExceptionResponse(ScheduleExceptionBase):
+    id: int
+    created_at: Optional[datetime] = None
+    model_config = {"from_attributes": True}
+
+# --- JOBS ---
+class JobSubmit(BaseModel):
+    kind: str
+    params: dict = {}
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    params: Any
+    status: str
+    progress: float
+    message: Optional[str] = None
+    error: Optional[str] = None
+    created_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    model_config = {"from_attributes": True}
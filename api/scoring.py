@@ -0,0 +1,297 @@
+# api/scoring.py
+"""
+Timetable quality score (lower is better) with cheap what-if moves.
+
+A semester's penalty is a weighted sum of:
+  clashes          hours two entries overlap for the same lecturer, group or room
+  lecturer_gaps    idle hours between a lecturer's entries on a day (beyond a short break)
+  group_gaps       the same for every leaf group
+  late             hours taught after LATE_FROM
+  room_changes     consecutive entries of a lecturer or group on a day in different rooms
+  soft_constraints (entry, scheduler constraint) pairs that violate an enabled rule
+
+Everything but late and soft_constraints is a sum over "resource days"
+(one lecturer, leaf group or room on one weekday), so the Scorer keeps each
+resource day's entry list and amounts. Moving one entry only touches its
+old and new day of its lecturer, its room and the k leaf groups that attend
+it, plus one row checked against the compiled rules: delta() is O(k) in the
+entries of those days, never the whole semester.
+
+Scorers are cached per semester, keyed on the change_log version of what
+they are built from (so writes by another process are noticed too), and
+dropped early by the change feed.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models, changes
+from .constraint_engine import EntryTable, ScopeResolver, entry_rows, in_window, rule_cache
+from .group_index import get_hierarchy
+from .permissions import program_of_groups
+from .timeslots import day_index, to_minutes
+from .timetable_search import LATE_FROM, SLOT_MINUTES
+
+WEIGHTS = {
+    "clashes": 100.0,  # per overlapping hour
+    "lecturer_gaps": 2.0,  # per idle hour
+    "group_gaps": 3.0,  # per idle hour
+    "late": 2.0,  # per hour after LATE_FROM
+    "room_changes": 1.0,  # per change
+    "soft_constraints": 5.0,  # per violation
+}
+UNITS = {"clashes": "hours", "lecturer_gaps": "hours", "group_gaps": "hours", "late": "hours",
+         "room_changes": "changes", "soft_constraints": "violations"}
+BREAK_MINUTES = 15  # a gap this short is a break, not idle time
+LATE_MINUTES = LATE_FROM * SLOT_MINUTES
+
+Key = Tuple[str, int, int]  # (resource kind, id, day)
+
+
+def _day_amounts(kind: str, items: Iterable[tuple]) -> Dict[str, float]:
+    """Amounts of one resource day; items are (start, end, room_id) in minutes."""
+    clash = gap = moves = 0
+    reach, last_room = None, None
+    for start, end, room in sorted(items, key=lambda it: (it[0], it[1])):
+        if reach is not None:
+            if start < reach:
+                clash += min(end, reach) - start
+            elif start - reach > BREAK_MINUTES:
+                gap += start - reach
+            if room is not None and last_room is not None and room != last_room:
+                moves += 1
+        reach = end if reach is None else max(reach, end)
+        if room is not None:
+            last_room = room
+    out = {"clashes": clash / 60.0}
+    if kind != "room":
+        out["room_changes"] = moves
+        out["lecturer_gaps" if kind == "lecturer" else "group_gaps"] = gap / 60.0
+    return out
+
+
+def _late(row: dict) -> float:
+    if row["start"] is None or row["end"] is None:
+        return 0.0
+    return max(0, row["end"] - max(row["start"], LATE_MINUTES)) / 60.0
+
+
+def _add(into: Dict[str, float], amounts: Dict[str, float], sign: int = 1):
+    for k, v in amounts.items():
+        into[k] = into.get(k, 0.0) + sign * v
+
+
+def _penalty(amounts: Dict[str, float]) -> float:
+    return sum(WEIGHTS[k] * v for k, v in amounts.items())
+
+
+class Scorer:
+    def __init__(self, db: Session, semester: str):
+        self.semester = semester
+        self.rows: Dict[int, dict] = {r["id"]: r for r in entry_rows(db, semester)}
+        self.rooms = {r.id: r for r in db.query(models.Room.id, models.Room.name, models.Room.type,
+                                                    models.Room.capacity, models.Room.location).all()}
+
+        # leaf groups attending an entry: below its group, or all of its program's when untargeted
+        h = get_hierarchy(db)
+        group_program = program_of_groups(db)
+        gids = [g for (g,) in db.query(models.Group.id).all()]
+        self._leaves = {g for g in gids if not h.descendants(g)}
+        self._leaves_by_program: Dict[int, List[int]] = {}
+        for g in sorted(self._leaves):
+            if g in group_program:
+                self._leaves_by_program.setdefault(group_program[g], []).append(g)
+        self._hierarchy = h
+        self._leaves_below: Dict[int, List[int]] = {}
+
+        # compiled weekly rules in force this semester
+        sem = db.query(models.Semester).filter(models.Semester.name == semester).first()
+        self.rules = []
+        for c in db.query(models.SchedulerConstraint).order_by(models.SchedulerConstraint.id).all():
+            if c.is_enabled and in_window(c, sem.start_date if sem else None, sem.end_date if sem else None):
+                rule = rule_cache.get(c)
+                if rule.predicate is not None:
+                    self.rules.append((c.id, c.name, c.scope, c.target_id, rule.predicate))
+
+        self.days: Dict[Key, List[int]] = {}
+        for eid, row in self.rows.items():
+            for key in self._keys(row):
+                self.days.setdefault(key, []).append(eid)
+        self.day_amounts = {key: _day_amounts(key[0], self._items(ids)) for key, ids in self.days.items()}
+
+        self.violations: Dict[int, List[int]] = {}  # entry id -> violated constraint ids
+        table = EntryTable(list(self.rows.values()))
+        scopes = ScopeResolver(db, table)
+        for cid, _, scope, target, predicate in self.rules:
+            bad = scopes.mask(scope, target) & ~predicate(table)
+            for i in np.flatnonzero(bad):
+                self.violations.setdefault(table.rows[i]["id"], []).append(cid)
+
+        self.amounts: Dict[str, float] = {k: 0.0 for k in WEIGHTS}
+        for a in self.day_amounts.values():
+            _add(self.amounts, a)
+        self.amounts["late"] = sum(_late(r) for r in self.rows.values())
+        self.amounts["soft_constraints"] = float(sum(len(v) for v in self.violations.values()))
+
+    # --- resource days ---
+
+    def _attendees(self, row: dict) -> List[int]:
+        g = row["group"]
+        if g is None:
+            return self._leaves_by_program.get(row["program"], [])
+        below = self._leaves_below.get(g)
+        if below is None:
+            below = sorted(x for x in self._hierarchy.descendants(g) | {g} if x in self._leaves)
+            self._leaves_below[g] = below
+        return below
+
+    def _keys(self, row: dict) -> List[Key]:
+        day = row["day"]
+        if day is None or row["start"] is None or row["end"] is None:
+            return []
+        keys = [("group", g, day) for g in self._attendees(row)]
+        if row["lecturer"] is not None:
+            keys.append(("lecturer", row["lecturer"], day))
+        if row["room_id"] is not None:
+            keys.append(("room", row["room_id"], day))
+        return keys
+
+    def _items(self, ids: Iterable[int], override: Optional[dict] = None) -> List[tuple]:
+        out = []
+        for eid in ids:
+            r = override if override is not None and eid == override["id"] else self.rows[eid]
+            out.append((r["start"], r["end"], r["room_id"]))
+        return out
+
+    # --- reporting ---
+
+    def breakdown(self, amounts: Optional[Dict[str, float]] = None) -> dict:
+        amounts = self.amounts if amounts is None else amounts
+        components = {
+            k: {"amount": round(amounts.get(k, 0.0), 2), "unit": UNITS[k], "weight": WEIGHTS[k],
+                "penalty": round(WEIGHTS[k] * amounts.get(k, 0.0), 2)}
+            for k in WEIGHTS
+        }
+        return {"total": round(_penalty(amounts), 2), "components": components}
+
+    def report(self) -> dict:
+        worst: Dict[str, List[dict]] = {"lecturer": [], "group": []}
+        for (kind, rid, day), a in self.day_amounts.items():
+            if kind in worst:
+                worst[kind].append({"id": rid, "day": day, "penalty": round(_penalty(a), 2)})
+        by_rule: Dict[int, int] = {}
+        for cids in self.violations.values():
+            for cid in cids:
+                by_rule[cid] = by_rule.get(cid, 0) + 1
+        names = {cid: name for cid, name, *_ in self.rules}
+        return {
+            "semester": self.semester,
+            "entries": len(self.rows),
+            **self.breakdown(),
+            "worst_lecturer_days": sorted(worst["lecturer"], key=lambda x: -x["penalty"])[:10],
+            "worst_group_days": sorted(worst["group"], key=lambda x: -x["penalty"])[:10],
+            "constraints": [{"id": cid, "name": names[cid], "violations": n} for cid, n in sorted(by_rule.items())],
+        }
+
+    # --- what-if ---
+
+    def moved_row(self, entry_id: int, day_of_week: Optional[str] = None, start_time: Optional[str] = None,
+                  end_time: Optional[str] = None, room_id: Optional[int] = None) -> dict:
+        """The entry's row as it would look after the move (None keeps a field)."""
+        row = dict(self.rows[entry_id])
+        if day_of_week is not None:
+            row["day"], row["day_of_week"] = day_index(day_of_week), day_of_week
+        if start_time is not None:
+            row["start"], row["start_time"] = to_minutes(start_time), start_time
+        if end_time is not None:
+            row["end"], row["end_time"] = to_minutes(end_time), end_time
+        if room_id is not None and room_id != row["room_id"]:
+            room = self.rooms.get(room_id)
+            if room is None:
+                raise KeyError(room_id)
+            row.update(room_id=room.id, room=room.name, room_type=room.type, capacity=room.capacity,
+                       location=room.location)
+        return row
+
+    def _violated(self, db: Session, row: dict) -> List[int]:
+        table = EntryTable([row])
+        scopes = ScopeResolver(db, table)
+        return [cid for cid, _, scope, target, predicate in self.rules
+                if (scopes.mask(scope, target) & ~predicate(table))[0]]
+
+    def delta(self, db: Session, new: dict) -> dict:
+        old = self.rows[new["id"]]
+        diff: Dict[str, float] = {}
+        new_keys = set(self._keys(new))
+        touched = set(self._keys(old)) | new_keys
+        for key in touched:
+            ids = [i for i in self.days.get(key, []) if i != new["id"]]
+            if key in new_keys:
+                ids.append(new["id"])
+            _add(diff, self.day_amounts.get(key, {}), -1)
+            _add(diff, _day_amounts(key[0], self._items(ids, new)))
+        diff["late"] = _late(new) - _late(old)
+        before = set(self.violations.get(old["id"], []))
+        after = set(self._violated(db, new))
+        diff["soft_constraints"] = float(len(after) - len(before))
+
+        moved = dict(self.amounts)
+        _add(moved, diff)
+        return {
+            "entry_id": new["id"],
+            "from": {"day_of_week": old["day_of_week"], "start_time": old["start_time"],
+                     "end_time": old["end_time"], "room_id": old["room_id"]},
+            "to": {"day_of_week": new["day_of_week"], "start_time": new["start_time"],
+                   "end_time": new["end_time"], "room_id": new["room_id"]},
+            "before": round(_penalty(self.amounts), 2),
+            "after": round(_penalty(moved), 2),
+            "delta": round(_penalty(diff), 2),
+            "components": {k: round(WEIGHTS[k] * diff.get(k, 0.0), 2) for k in WEIGHTS},
+            "new_violations": sorted(after - before),
+            "resolved_violations": sorted(before - after),
+            "resource_days": len(touched),
+        }
+
+
+class ScorerCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Tuple[Tuple[int, int], Scorer]] = {}
+
+    def get(self, db: Session, semester: str) -> Scorer:
+        # read before building: a write racing the build changes it, so the scorer is rebuilt next time
+        version = changes.version(db, _ENTITIES, semester)
+        with self._lock:
+            hit = self._data.get(semester)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        scorer = Scorer(db, semester)
+        with self._lock:
+            self._data[semester] = (version, scorer)
+        return scorer
+
+    def invalidate(self, semester: Optional[str] = None):
+        with self._lock:
+            if semester is None:
+                self._data.clear()
+            else:
+                self._data.pop(semester, None)
+
+
+scorers = ScorerCache()
+
+# anything an entry row or a rule is built from
+_SHARED = {"rooms", "lecturers", "groups", "modules", "offered_modules", "programs", "scheduler_constraints"}
+_ENTITIES = ("schedule",) + tuple(sorted(_SHARED))
+
+
+@changes.subscribe
+def _on_changes(batch: List[dict]):
+    for c in batch:
+        if c["entity"] == "schedule":
+            scorers.invalidate(c["semester"])
+        elif c["entity"] in _SHARED:
+            scorers.invalidate()
+            return
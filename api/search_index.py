@@ -0,0 +1,184 @@
+# api/search_index.py
+"""
+Fuzzy search over modules, lecturers, rooms and groups.
+
+Every document (one row) is split into character trigrams of its searchable
+text; a posting map trigram -> documents answers a query by counting shared
+trigrams, so typos and partial words still match. The index is built from the
+DB on first use and then kept current through the change feed: committed
+changes only mark rows dirty, and the next search reloads just those rows.
+"""
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models, changes
+
+ENTITIES = ("modules", "lecturers", "rooms", "groups")
+
+# below this share of the query's trigrams a document is not a match
+MIN_SIMILARITY = 0.3
+
+Key = Tuple[str, str]  # (entity, id as string)
+
+
+def _norm(text: Optional[str]) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Trigrams of every word, padded so that short words and word starts count."""
+    grams = set()
+    for word in _norm(text).split(" "):
+        if not word:
+            continue
+        w = f"  {word} "
+        for i in range(len(w) - 2):
+            grams.add(w[i:i + 3])
+    return frozenset(grams)
+
+
+def _module_doc(m: models.Module) -> dict:
+    return {"id": m.module_code, "label": m.name, "detail": m.module_code, "text": f"{m.module_code} {m.name}"}
+
+
+def _lecturer_doc(l: models.Lecturer) -> dict:
+    name = f"{l.first_name} {l.last_name or ''}".strip()
+    return {"id": l.id, "label": name, "detail": l.mdh_email or l.personal_email,
+            "text": f"{name} {l.mdh_email or ''} {l.personal_email or ''}"}
+
+
+def _room_doc(r: models.Room) -> dict:
+    return {"id": r.id, "label": r.name, "detail": r.location, "text": r.name}
+
+
+def _group_doc(g: models.Group) -> dict:
+    return {"id": g.id, "label": g.name, "detail": g.program, "text": g.name}
+
+
+# entity -> (model, primary key column, row -> document)
+_SOURCES = {
+    "modules": (models.Module, models.Module.module_code, _module_doc),
+    "lecturers": (models.Lecturer, models.Lecturer.id, _lecturer_doc),
+    "rooms": (models.Room, models.Room.id, _room_doc),
+    "groups": (models.Group, models.Group.id, _group_doc),
+}
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.docs: Dict[Key, dict] = {}
+        self.grams: Dict[Key, FrozenSet[str]] = {}
+        self.postings: Dict[str, Set[Key]] = {}
+        self.dirty: Set[Key] = set()
+
+    # --- maintenance ---
+
+    def _add(self, key: Key, doc: dict):
+        self._drop(key)
+        self.docs[key] = doc
+        self.grams[key] = trigrams(doc["text"])
+        for g in self.grams[key]:
+            self.postings.setdefault(g, set()).add(key)
+
+    def _drop(self, key: Key):
+        for g in self.grams.pop(key, ()):
+            bucket = self.postings.get(g)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.postings[g]
+        self.docs.pop(key, None)
+
+    def mark_dirty(self, keys: Iterable[Key]):
+        with self._lock:
+            if self.loaded:
+                self.dirty.update(keys)
+
+    def reset(self):
+        with self._lock:
+            self.docs, self.grams, self.postings, self.dirty = {}, {}, {}, set()
+            self.loaded = False
+
+    def ensure_current(self, db: Session) -> "SearchIndex":
+        with self._lock:
+            if not self.loaded:
+                for entity, (model, _, to_doc) in _SOURCES.items():
+                    for row in db.query(model).all():
+                        doc = to_doc(row)
+                        self._add((entity, str(doc["id"])), doc)
+                self.dirty = set()
+                self.loaded = True
+            elif self.dirty:
+                todo, self.dirty = self.dirty, set()
+                by_entity: Dict[str, Set[str]] = {}
+                for entity, entity_id in todo:
+                    by_entity.setdefault(entity, set()).add(entity_id)
+                for entity, ids in by_entity.items():
+                    model, pk, to_doc = _SOURCES[entity]
+                    wanted = ids if entity == "modules" else [int(i) for i in ids if i.lstrip("-").isdigit()]
+                    found = set()
+                    for row in db.query(model).filter(pk.in_(wanted)).all():
+                        doc = to_doc(row)
+                        found.add(str(doc["id"]))
+                        self._add((entity, str(doc["id"])), doc)
+                    for entity_id in ids - found:
+                        self._drop((entity, entity_id))
+        return self
+
+    # --- query ---
+
+    def search(self, q: str, entities: Iterable[str], limit: int = 20,
+               allow=None) -> List[dict]:
+        """
+        Rank by trigram similarity (shared / query trigrams), with a bonus for
+        substring and prefix hits. `allow(key)` can hide rows per caller.
+        """
+        needle = _norm(q)
+        qgrams = trigrams(needle)
+        if not qgrams:
+            return []
+        wanted = set(entities)
+        with self._lock:
+            counts: Counter = Counter()
+            for g in qgrams:
+                for key in self.postings.get(g, ()):
+                    if key[0] in wanted:
+                        counts[key] += 1
+
+            hits = []
+            for key, shared in counts.items():
+                score = shared / len(qgrams)
+                if score < MIN_SIMILARITY:
+                    continue
+                if allow is not None and not allow(key):
+                    continue
+                doc = self.docs[key]
+                text = _norm(doc["text"])
+                if needle in text:
+                    score += 0.5 if (text.startswith(needle) or f" {needle}" in text) else 0.25
+                hits.append((score, key[0], doc))
+
+        hits.sort(key=lambda h: (-h[0], h[1], str(h[2]["label"]).lower()))
+        return [
+            {"entity": entity, "id": doc["id"], "label": doc["label"], "detail": doc["detail"], "score": round(score, 3)}
+            for score, entity, doc in hits[:limit]
+        ]
+
+
+search_index = SearchIndex()
+
+
+def get_search_index(db: Session) -> SearchIndex:
+    return search_index.ensure_current(db)
+
+
+@changes.subscribe
+def _on_changes(batch: List[dict]):
+    search_index.mark_dirty(
+        (c["entity"], c["entity_id"]) for c in batch if c["entity"] in _SOURCES
+    )
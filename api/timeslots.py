@@ -0,0 +1,149 @@
+# api/timeslots.py
+import re
+from typing import Any, Dict, List, Optional
+
+# Weekly grid shared by availability, schedule and planning helpers.
+# Times in the DB are "HH:MM" strings, days are English weekday names.
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_INDEX = {d.lower(): i for i, d in enumerate(DAYS)}
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = (24 * 60) // SLOT_MINUTES
+
+# Used when an offering has no schedule entries yet (one 2h block per week)
+DEFAULT_OFFERING_HOURS = 2.0
+
+
+def day_index(day: Optional[str]) -> Optional[int]:
+    return DAY_INDEX.get((day or "").strip().lower())
+
+
+def to_minutes(value: Optional[str]) -> Optional[int]:
+    """'08:00' / '8:00' / '08:00:00' -> minutes since midnight, None if unparseable or past 24:00."""
+    if not value or not isinstance(value, str):
+        return None
+    parts = value.strip().split(":")
+    try:
+        h = int(parts[0])
+        m = int(parts[1]) if len(parts) > 1 else 0
+    except ValueError:
+        return None
+    if h < 0 or h > 24 or m < 0 or m > 59 or (h == 24 and m > 0):
+        return None
+    return h * 60 + m
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def overlaps(a_start: int, a_end: int, b_start: int, b_end: int) -> bool:
+    return a_start < b_end and b_start < a_end
+
+
+def duration_hours(start: Optional[str], end: Optional[str]) -> float:
+    s, e = to_minutes(start), to_minutes(end)
+    if s is None or e is None or e <= s:
+        return 0.0
+    return (e - s) / 60.0
+
+
+# --- slot bitmaps ---
+# One bit per SLOT_MINUTES slot of the week: bit = day * SLOTS_PER_DAY + slot.
+
+def window_mask(day: Optional[str], start: Optional[str], end: Optional[str]) -> int:
+    d = day_index(day)
+    s, e = to_minutes(start), to_minutes(end)
+    if d is None or s is None or e is None or e <= s:
+        return 0
+    first = s // SLOT_MINUTES
+    last = -(-e // SLOT_MINUTES)  # ceil: a partial slot counts as occupied
+    width = last - first
+    return ((1 << width) - 1) << (d * SLOTS_PER_DAY + first)
+
+
+def availability_mask(schedule_data: Any) -> int:
+    """
+    Convert the availability JSON used by the frontend
+    ({"Monday": {"is_available": true, "ranges": [{"start": "09:00", "end": "17:00"}]}, ...})
+    into a weekly slot bitmap. Partial slots at range edges are not counted as free.
+    """
+    if not isinstance(schedule_data, dict):
+        return 0
+    mask = 0
+    for day, info in schedule_data.items():
+        d = day_index(day)
+        if d is None or not isinstance(info, dict) or not info.get("is_available"):
+            continue
+        for r in info.get("ranges") or []:
+            if not isinstance(r, dict):
+                continue
+            mask |= inner_mask(day, r.get("start"), r.get("end"))
+    return mask
+
+
+def inner_mask(day: Optional[str], start: Optional[str], end: Optional[str]) -> int:
+    """Like window_mask, but only slots fully inside start..end (floor instead of ceil at the edges)."""
+    d = day_index(day)
+    s, e = to_minutes(start), to_minutes(end)
+    if d is None or s is None or e is None or e <= s:
+        return 0
+    first = -(-s // SLOT_MINUTES)
+    last = e // SLOT_MINUTES
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << (d * SLOTS_PER_DAY + first)
+
+
+def slot_ranges(mask: int) -> List[Dict[str, str]]:
+    """Weekly bitmap -> [{"day", "start", "end"}] of maximal runs of set slots, in week order."""
+    out = []
+    for d, day in enumerate(DAYS):
+        bits = (mask >> (d * SLOTS_PER_DAY)) & ((1 << SLOTS_PER_DAY) - 1)
+        slot = 0
+        while bits:
+            skip = (bits & -bits).bit_length() - 1
+            bits >>= skip
+            slot += skip
+            run = (~bits & (bits + 1)).bit_length() - 1
+            out.append({"day": day, "start": format_minutes(slot * SLOT_MINUTES),
+                        "end": format_minutes((slot + run) * SLOT_MINUTES)})
+            bits >>= run
+            slot += run
+    return out
+
+
+# stored form of a weekly bitmap (LecturerAvailability.slot_bitmap): fixed-width little endian
+WEEK_SLOTS = len(DAYS) * SLOTS_PER_DAY
+WEEK_BYTES = WEEK_SLOTS // 8
+
+
+def mask_to_bytes(mask: int) -> bytes:
+    return (mask or 0).to_bytes(WEEK_BYTES, "little")
+
+
+def mask_from_bytes(data: Optional[bytes]) -> int:
+    return int.from_bytes(bytes(data or b""), "little")
+
+
+def is_available(avail_mask: int, day: Optional[str], start: Optional[str], end: Optional[str]) -> bool:
+    need = window_mask(day, start, end)
+    return need != 0 and (avail_mask & need) == need
+
+
+# --- teaching load ---
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def parse_teaching_load(text: Optional[str]) -> Optional[float]:
+    """
+    Lecturer.teaching_load is free text ("8 SWS", "12h/week", "4,5").
+    We read the first number as weekly contact hours; None if there is none.
+    """
+    if not text:
+        return None
+    m = _NUMBER.search(str(text))
+    if not m:
+        return None
+    return float(m.group(0).replace(",", "."))
@@ -0,0 +1,56 @@
+# api/timetable_cache.py
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from . import changes
+
+# what a group timetable row is built from
+TIMETABLE_ENTITIES = ("schedule", "offered_modules", "modules", "lecturers", "rooms", "groups", "programs")
+
+
+class GroupTimetableCache:
+    """
+    Materialized per-semester, per-group timetables: {semester: {group_id: [rows]}}.
+    A semester is built in one pass on first request, so a student reload is a
+    dict lookup plus one change_log version query. Entries are keyed on that
+    version (changes.version), so a write handled by another process is noticed
+    too; the change feed only frees this process's copy early.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Tuple[Tuple[int, int], Dict[int, List[dict]]]] = {}
+
+    def get(self, semester: str, version: Tuple[int, int]) -> Optional[Dict[int, List[dict]]]:
+        with self._lock:
+            hit = self._data.get(semester)
+        if hit is None or hit[0] != version:
+            return None
+        return hit[1]
+
+    def put(self, semester: str, version: Tuple[int, int], by_group: Dict[int, List[dict]]):
+        """`version` must be read before building, so a build racing a write is never reused."""
+        with self._lock:
+            self._data[semester] = (version, by_group)
+
+    def invalidate(self, semester: Optional[str] = None):
+        """Drop one semester, or everything when semester is None."""
+        with self._lock:
+            if semester is None:
+                self._data.clear()
+            else:
+                self._data.pop(semester, None)
+
+
+group_timetables = GroupTimetableCache()
+
+
+@changes.subscribe
+def _on_changes(batch: List[dict]):
+    for c in batch:
+        if c["entity"] not in TIMETABLE_ENTITIES:
+            continue
+        if c["semester"] is None:
+            group_timetables.invalidate()
+            return
+        group_timetables.invalidate(c["semester"])
@@ -0,0 +1,600 @@
+# api/timetable_search.py
+"""
+Timetable construction by parallel multi-start search.
+
+build_problem() turns a semester into a compact Problem (NumPy arrays, no ORM
+objects): one block per existing ScheduleEntry, plus one DEFAULT_OFFERING_HOURS
+block for every offering that has none. A block needs a start slot and a room.
+
+Every start runs in its own process: randomized greedy construction (hardest
+blocks first, a random pick among the cheapest placements), then local search
+that moves one block at a time to its best placement, preferring blocks that
+are in a clash, with occasional kicks out of local optima. The Problem is
+pickled and zlib-compressed once and handed to each worker by the pool
+initializer, so a start only sends back two int arrays and its statistics.
+
+Cost (lower is better), per block placement:
+  CLASH        per slot a lecturer, cohort or room is used twice
+  UNAVAILABLE  per slot outside the lecturer's availability (none recorded = always free)
+  NO_ROOM      no room at all (closed, or none of the right type free)
+  room fit     ROOM_TOO_SMALL / ROOM_TYPE / MISSING_EQUIPMENT, WASTE for empty seats
+  LATE         per slot after LATE_FROM
+Cohorts follow the group hierarchy: a block occupies the leaf groups below its
+group; program-wide blocks occupy every group of the program, as in the group
+timetables.
+"""
+import multiprocessing
+import os
+import pickle
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+from .group_index import get_hierarchy
+from .permissions import program_of_groups
+from .room_analytics import program_attendance
+from .timeslots import (
+    DAYS, DEFAULT_OFFERING_HOURS, SLOT_MINUTES, SLOTS_PER_DAY, WEEK_SLOTS, availability_mask, day_index,
+    format_minutes, mask_from_bytes, mask_to_bytes, to_minutes,
+)
+
+TEACHING_DAYS = 5
+DAY_START = 8 * 60 // SLOT_MINUTES
+DAY_END = 20 * 60 // SLOT_MINUTES
+LATE_FROM = 18 * 60 // SLOT_MINUTES
+START_STEP = 2  # new placements start on the hour
+
+CLASH = 1000
+UNAVAILABLE = 200
+NO_ROOM = 500
+ROOM_TOO_SMALL = 300
+ROOM_TYPE = 50
+MISSING_EQUIPMENT = 30
+LATE = 5
+WASTE = 10
+# breakdown() components a timetable must not have before it is written
+HARD = ("lecturer_clash", "cohort_clash", "room_clash", "unavailable", "no_room")
+
+# repairs only (Problem.stability): moving an existing entry to another time / only to another room
+MOVE_TIME = 100
+MOVE_ROOM = 20
+
+ROOM_CANDIDATES = 8  # cheapest rooms (by fit) tried per block
+GRASP_PICK = 3  # construction picks among this many cheapest placements
+KICK_RATE = 0.02
+
+
+def _norm(text: Optional[str]) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _bits(mask: int) -> np.ndarray:
+    return np.unpackbits(np.frombuffer(mask_to_bytes(mask), dtype=np.uint8), bitorder="little").astype(bool)
+
+
+class Problem:
+    """Everything a search worker needs, as plain arrays (picklable)."""
+
+    def __init__(self, n_blocks: int):
+        self.n = n_blocks
+        self.offer_id = np.zeros(n_blocks, dtype=np.int64)
+        self.entry_id = np.full(n_blocks, -1, dtype=np.int64)
+        self.group_id = np.full(n_blocks, -1, dtype=np.int64)
+        self.dur = np.zeros(n_blocks, dtype=np.int32)  # slots
+        # exact times inside the slots: start past the first slot's start, and length, in minutes
+        self.offset = np.zeros(n_blocks, dtype=np.int32)
+        self.minutes = np.zeros(n_blocks, dtype=np.int32)
+        self.lecturer = np.full(n_blocks, -1, dtype=np.int32)  # row in avail
+        self.atoms: List[np.ndarray] = []  # cohort rows occupied by the block
+        self.fixed = np.zeros(n_blocks, dtype=bool)
+        self.init_at = np.full(n_blocks, -1, dtype=np.int32)  # week slot of the current placement
+        self.init_room = np.full(n_blocks, -1, dtype=np.int32)
+        self.room_closed = np.zeros(n_blocks, dtype=bool)  # the entry's room is inactive or gone
+        self.stability = False  # charge MOVE_TIME / MOVE_ROOM for leaving the current placement
+        self.room_fit = np.zeros((n_blocks, 0), dtype=np.int32)  # static room penalty per block x room
+        self.candidates: List[np.ndarray] = []
+        self.avail = np.ones((0, WEEK_SLOTS), dtype=bool)
+        self.n_atoms = 0
+        self.room_ids = np.zeros(0, dtype=np.int64)
+        self.lecturer_ids = np.zeros(0, dtype=np.int64)
+        self.late = np.array([LATE if s % SLOTS_PER_DAY >= LATE_FROM else 0 for s in range(WEEK_SLOTS)],
+                             dtype=np.int64)
+        self._starts: Dict[int, np.ndarray] = {}
+
+    def starts(self, dur: int) -> np.ndarray:
+        s = self._starts.get(dur)
+        if s is None:
+            s = np.array([d * SLOTS_PER_DAY + t for d in range(TEACHING_DAYS)
+                          for t in range(DAY_START, DAY_END - dur + 1, START_STEP)], dtype=np.int64)
+            self._starts[dur] = s
+        return s
+
+    def to_blob(self) -> bytes:
+        return zlib.compress(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL), 3)
+
+    @staticmethod
+    def from_blob(blob: bytes) -> "Problem":
+        return pickle.loads(zlib.decompress(blob))
+
+
+class State:
+    """Placements plus occupancy counts per lecturer, cohort atom and room."""
+
+    def __init__(self, p: Problem):
+        self.p = p
+        self.lec = np.zeros((len(p.lecturer_ids), WEEK_SLOTS), dtype=np.int16)
+        self.atom = np.zeros((p.n_atoms, WEEK_SLOTS), dtype=np.int16)
+        self.room = np.zeros((len(p.room_ids), WEEK_SLOTS), dtype=np.int16)
+        self.at = np.full(p.n, -1, dtype=np.int32)
+        self.rm = np.full(p.n, -1, dtype=np.int32)
+        self.total = 0
+
+    def _mark(self, b: int, a: int, r: int, delta: int):
+        p, end = self.p, a + self.p.dur[b]
+        if p.lecturer[b] >= 0:
+            self.lec[p.lecturer[b], a:end] += delta
+        for x in p.atoms[b]:
+            self.atom[x, a:end] += delta
+        if r >= 0:
+            self.room[r, a:end] += delta
+
+    def place(self, b: int, a: int, r: int, cost: int):
+        self._mark(b, a, r, 1)
+        self.at[b], self.rm[b] = a, r
+        self.total += cost
+
+    def unplace(self, b: int) -> int:
+        """Take b out and return what it contributed."""
+        a, r = int(self.at[b]), int(self.rm[b])
+        self._mark(b, a, r, -1)
+        self.at[b] = self.rm[b] = -1
+        cost = self.cost_of(b, a, r)
+        self.total -= cost
+        return cost
+
+    def _slot_cost(self, b: int) -> np.ndarray:
+        # room-independent cost of b occupying each slot of the week (b itself not placed)
+        p = self.p
+        v = p.late.copy()
+        if p.lecturer[b] >= 0:
+            v += CLASH * self.lec[p.lecturer[b]] + UNAVAILABLE * ~p.avail[p.lecturer[b]]
+        for x in p.atoms[b]:
+            v += CLASH * self.atom[x]
+        return v
+
+    def parts(self, b: int, a: int, r: int) -> Dict[str, int]:
+        p, end = self.p, a + self.p.dur[b]
+        out = {"lecturer_clash": 0, "cohort_clash": 0, "room_clash": 0, "unavailable": 0,
+               "no_room": 0, "room_fit": 0, "late": int(p.late[a:end].sum())}
+        if p.lecturer[b] >= 0:
+            out["lecturer_clash"] = CLASH * int(self.lec[p.lecturer[b], a:end].sum())
+            out["unavailable"] = UNAVAILABLE * int((~p.avail[p.lecturer[b], a:end]).sum())
+        for x in p.atoms[b]:
+            out["cohort_clash"] += CLASH * int(self.atom[x, a:end].sum())
+        if r >= 0:
+            out["room_clash"] = CLASH * int(self.room[r, a:end].sum())
+            out["room_fit"] = int(p.room_fit[b, r])
+        else:
+            out["no_room"] = NO_ROOM
+        if p.stability and p.init_at[b] >= 0:
+            out["moved"] = MOVE_TIME if a != p.init_at[b] else MOVE_ROOM if r != p.init_room[b] else 0
+        return out
+
+    def cost_of(self, b: int, a: int, r: int) -> int:
+        return sum(self.parts(b, a, r).values())
+
+    def in_trouble(self, b: int) -> bool:
+        """Placed block b clashes with another block or sits outside its lecturer's availability."""
+        p, a = self.p, int(self.at[b])
+        end = a + p.dur[b]
+        l, r = p.lecturer[b], int(self.rm[b])
+        if l >= 0 and ((self.lec[l, a:end] > 1).any() or not p.avail[l, a:end].all()):
+            return True
+        if r >= 0 and (self.room[r, a:end] > 1).any():
+            return True
+        return any((self.atom[x, a:end] > 1).any() for x in p.atoms[b])
+
+    def troubles(self, b: int) -> List[str]:
+        """Why placed block b is invalid (empty if it is fine)."""
+        p, a = self.p, int(self.at[b])
+        end = a + p.dur[b]
+        l, r = p.lecturer[b], int(self.rm[b])
+        out = []
+        if r < 0 and p.room_closed[b]:
+            out.append("room closed")
+        if l >= 0 and not p.avail[l, a:end].all():
+            out.append("lecturer unavailable")
+        if l >= 0 and (self.lec[l, a:end] > 1).any():
+            out.append("lecturer clash")
+        if any((self.atom[x, a:end] > 1).any() for x in p.atoms[b]):
+            out.append("cohort clash")
+        if r >= 0 and (self.room[r, a:end] > 1).any():
+            out.append("room clash")
+        return out
+
+    def options(self, b: int):
+        """(starts, rooms, cost matrix rooms x starts) for every placement of the unplaced block b."""
+        p = self.p
+        dur = p.dur[b]
+        starts = p.starts(dur)
+        home = int(p.init_at[b]) if p.stability else -1
+        if home >= 0:
+            starts = np.union1d(starts, [home])  # staying put is always an option, even off the grid
+        cs = np.concatenate(([0], np.cumsum(self._slot_cost(b))))
+        base = cs[starts + dur] - cs[starts]
+        rooms = p.candidates[b]
+        if not len(rooms):
+            rooms = np.array([-1])
+            m = (base + NO_ROOM)[None, :]
+        else:
+            rc = np.zeros((len(rooms), WEEK_SLOTS + 1), dtype=np.int64)
+            np.cumsum(self.room[rooms], axis=1, out=rc[:, 1:])
+            room_cost = CLASH * (rc[:, starts + dur] - rc[:, starts])
+            m = base[None, :] + room_cost + p.room_fit[b, rooms][:, None]
+        if home >= 0:
+            elsewhere = starts != home
+            m = m + MOVE_TIME * elsewhere[None, :] + MOVE_ROOM * ((rooms != p.init_room[b])[:, None] & ~elsewhere[None, :])
+        return starts, rooms, m
+
+
+def construct(st: State, rng: np.random.Generator) -> int:
+    p = st.p
+    for b in np.nonzero(p.fixed)[0]:
+        a, r = int(p.init_at[b]), int(p.init_room[b])
+        st.place(b, a, r, st.cost_of(b, a, r))
+    movable = np.nonzero(~p.fixed)[0]
+    # most constrained first: long blocks with many cohorts and a lecturer, shuffled a little
+    weight = np.array([p.dur[b] * (1 + len(p.atoms[b])) + 2 * (p.lecturer[b] >= 0) for b in movable], dtype=float)
+    order = movable[np.argsort(-weight * rng.uniform(0.7, 1.3, len(movable)), kind="stable")]
+    for b in order:
+        starts, rooms, m = st.options(b)
+        flat = m.ravel()
+        best = np.argpartition(flat, min(GRASP_PICK, flat.size) - 1)[:GRASP_PICK]
+        best = best[flat[best] <= flat[best].min() + LATE]  # only near-ties are worth the randomness
+        i = int(rng.choice(best))
+        st.place(b, int(starts[i % len(starts)]), int(rooms[i // len(starts)]), int(flat[i]))
+    return st.total
+
+
+def improve(st: State, rng: np.random.Generator, iterations: int, deadline: float,
+            movable: Optional[np.ndarray] = None) -> dict:
+    """Local search over `movable` blocks (default: all non-fixed). Leaves st at the best state seen."""
+    p = st.p
+    if movable is None:
+        movable = np.nonzero(~p.fixed)[0]
+    stats = {"iterations": 0, "improvements": 0, "kicks": 0}
+    if not len(movable):
+        return stats
+    best_total, best_at, best_rm = st.total, st.at.copy(), st.rm.copy()
+    hot: List[int] = []
+    for it in range(iterations):
+        if it % 64 == 0:
+            if time.monotonic() > deadline:
+                break
+            hot = [b for b in movable if st.in_trouble(b)]
+        stats["iterations"] += 1
+        b = int(rng.choice(hot)) if hot and rng.random() < 0.8 else int(rng.choice(movable))
+        a0, r0 = int(st.at[b]), int(st.rm[b])
+        c0 = st.unplace(b)
+        starts, rooms, m = st.options(b)
+        flat = m.ravel()
+        i = int(np.argmin(flat + rng.random(flat.size)))  # random tie-break
+        if flat[i] < c0:
+            stats["improvements"] += 1
+        elif rng.random() < KICK_RATE:
+            stats["kicks"] += 1
+            top = np.argpartition(flat, min(5, flat.size) - 1)[:5]
+            i = int(rng.choice(top))
+        else:
+            st.place(b, a0, r0, c0)
+            continue
+        st.place(b, int(starts[i % len(starts)]), int(rooms[i // len(starts)]), int(flat[i]))
+        if st.total < best_total:
+            best_total, best_at, best_rm = st.total, st.at.copy(), st.rm.copy()
+
+    if st.total != best_total:
+        restore(st, best_at, best_rm)
+    return stats
+
+
+def restore(st: State, at: np.ndarray, rm: np.ndarray):
+    """Reset st to the given placements (all blocks placed)."""
+    st.lec[:] = 0
+    st.atom[:] = 0
+    st.room[:] = 0
+    st.at[:] = -1
+    st.rm[:] = -1
+    st.total = 0
+    for b in range(st.p.n):
+        a, r = int(at[b]), int(rm[b])
+        st.place(b, a, r, st.cost_of(b, a, r))
+
+
+def _direct_conflicts(st: State, b: int) -> List[int]:
+    """Placed blocks overlapping b in time that share its lecturer, a cohort atom or its room."""
+    p, a = st.p, int(st.at[b])
+    end = a + p.dur[b]
+    near = np.nonzero((st.at < end) & (st.at + p.dur > a) & (st.at >= 0))[0]
+    mine = set(p.atoms[b].tolist())
+    out = []
+    for c in near:
+        if c == b:
+            continue
+        if (p.lecturer[b] >= 0 and p.lecturer[c] == p.lecturer[b]) or (st.rm[b] >= 0 and st.rm[c] == st.rm[b]) \
+                or mine.intersection(p.atoms[c].tolist()):
+            out.append(int(c))
+    return out
+
+
+def repair(p: Problem, in_scope: Optional[set] = None, seed: int = 0, seconds: float = 2.0) -> dict:
+    """
+    Fix invalid placements of an existing timetable with as few moves as possible.
+    p is built from the stored entries (include_unscheduled=False); in_scope limits
+    which entries (by id) count as broken by the change, default all of them.
+    Only the broken blocks and their direct conflicts may move, and every move
+    costs MOVE_TIME / MOVE_ROOM, so a block stays put unless moving fixes more.
+    """
+    t0 = time.monotonic()
+    p.stability = True
+    st = State(p)
+    restore(st, p.init_at, p.init_room)
+    before = st.total
+    affected = {
+        b: st.troubles(b) for b in range(p.n)
+        if in_scope is None or int(p.entry_id[b]) in in_scope
+    }
+    affected = {b: why for b, why in affected.items() if why}
+    movable = set(affected)
+    for b in affected:
+        movable.update(_direct_conflicts(st, b))
+    movable_arr = np.array(sorted(movable), dtype=np.int64)
+    stats = improve(st, np.random.default_rng(seed), 50 * len(movable_arr), t0 + seconds, movable=movable_arr)
+    moved = [b for b in range(p.n) if st.at[b] != p.init_at[b] or st.rm[b] != p.init_room[b]]
+    return {
+        "affected": affected,
+        "movable": len(movable_arr),
+        "moved": moved,
+        "unresolved": {b: st.troubles(b) for b in sorted(movable) if st.troubles(b)},
+        "cost_before": int(before),
+        "cost_after": int(st.total),
+        "at": st.at,
+        "rm": st.rm,
+        "seconds": round(time.monotonic() - t0, 4),
+        **stats,
+    }
+
+
+def breakdown(p: Problem, at: np.ndarray, rm: np.ndarray) -> Dict[str, int]:
+    st = State(p)
+    out: Dict[str, int] = {}
+    for b in range(p.n):
+        a, r = int(at[b]), int(rm[b])
+        for k, v in st.parts(b, a, r).items():
+            out[k] = out.get(k, 0) + v
+        st.place(b, a, r, 0)
+    out["total"] = sum(out.values())
+    return out
+
+
+# --- worker side ---
+
+_worker_problem: Optional[Problem] = None
+
+
+def _init_worker(blob: bytes):
+    global _worker_problem
+    _worker_problem = Problem.from_blob(blob)
+
+
+def _run_start(seed: int, iterations: int, seconds: float) -> dict:
+    t0 = time.monotonic()
+    p = _worker_problem
+    rng = np.random.default_rng(seed)
+    st = State(p)
+    built = construct(st, rng)
+    stats = improve(st, rng, iterations, t0 + seconds)
+    return {
+        "seed": seed,
+        "pid": os.getpid(),
+        "construction_cost": int(built),
+        "cost": int(st.total),
+        "seconds": round(time.monotonic() - t0, 3),
+        **stats,
+        "at": st.at,
+        "rm": st.rm,
+    }
+
+
+def search(p: Problem, starts: int, iterations: int, seconds: float, seed: int,
+           workers: Optional[int] = None, on_start: Optional[Callable[[int], None]] = None,
+           cancelled: Optional[Callable[[], bool]] = None) -> dict:
+    """Run `starts` independent starts on up to `workers` processes (default: one per core), keep the best."""
+    workers = max(1, min(starts, workers or os.cpu_count() or 1))
+    blob = p.to_blob()
+    seeds = [seed + i for i in range(starts)]
+    results: List[dict] = []
+    t0 = time.monotonic()
+
+    try:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(blob,))
+    except (OSError, NotImplementedError):
+        pool = None  # no process support (e.g. serverless sandbox): run the starts here
+    if pool is None:
+        _init_worker(blob)
+        workers = 1
+        for s in seeds:
+            if cancelled and cancelled():
+                break
+            results.append(_run_start(s, iterations, seconds))
+            if on_start:
+                on_start(len(results))
+    else:
+        with pool:
+            futures = [pool.submit(_run_start, s, iterations, seconds) for s in seeds]
+            for f in as_completed(futures):
+                if cancelled and cancelled():
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    break
+                results.append(f.result())
+                if on_start:
+                    on_start(len(results))
+
+    if not results:
+        return {"best": None, "runs": [], "workers": workers, "seconds": round(time.monotonic() - t0, 3)}
+    best = min(results, key=lambda r: (r["cost"], r["seed"]))
+    return {
+        "best": best,
+        "runs": [{k: v for k, v in r.items() if k not in ("at", "rm")} for r in sorted(results, key=lambda r: r["seed"])],
+        "workers": workers,
+        "seconds": round(time.monotonic() - t0, 3),
+    }
+
+
+# --- building the instance ---
+
+def build_problem(db: Session, semester: str, keep_existing: bool = False,
+                  include_unscheduled: bool = True) -> Problem:
+    offers = (
+        db.query(models.OfferedModule)
+        .options(joinedload(models.OfferedModule.module))
+        .filter(models.OfferedModule.semester == semester)
+        .all()
+    )
+    offer_by_id = {o.id: o for o in offers}
+    entries = [
+        e for e in db.query(models.ScheduleEntry).filter(models.ScheduleEntry.semester == semester)
+        .order_by(models.ScheduleEntry.id).all()
+        if e.offered_module_id in offer_by_id
+    ]
+    rooms = db.query(models.Room).filter(models.Room.status.is_(True)).order_by(models.Room.id).all()
+    room_row = {r.id: i for i, r in enumerate(rooms)}
+
+    # blocks: (offer, entry or None, group_id, duration slots, week slot or -1, start offset, minutes)
+    blocks = []
+    scheduled = set()
+    for e in entries:
+        d, s, t = day_index(e.day_of_week), to_minutes(e.start_time), to_minutes(e.end_time)
+        if d is None or s is None or t is None or t <= s:
+            continue
+        first, last = s // SLOT_MINUTES, -(-t // SLOT_MINUTES)
+        blocks.append((offer_by_id[e.offered_module_id], e, e.group_id, last - first, d * SLOTS_PER_DAY + first,
+                       s % SLOT_MINUTES, t - s))
+        scheduled.add(e.offered_module_id)
+    default_slots = int(round(DEFAULT_OFFERING_HOURS * 60 / SLOT_MINUTES))
+    for o in offers:
+        if include_unscheduled and o.id not in scheduled:
+            blocks.append((o, None, None, default_slots, -1, 0, default_slots * SLOT_MINUTES))
+
+    p = Problem(len(blocks))
+    p.room_ids = np.array([r.id for r in rooms], dtype=np.int64)
+
+    # cohorts: leaf groups below a group; program-wide blocks take all leaves of the program
+    h = get_hierarchy(db)
+    group_program = program_of_groups(db)
+    groups = db.query(models.Group.id, models.Group.size).all()
+    group_size = {g.id: g.size or 0 for g in groups}
+    atom_of: Dict[tuple, int] = {}
+
+    def atom(key: tuple) -> int:
+        return atom_of.setdefault(key, len(atom_of))
+
+    def leaves(gid: int) -> List[int]:
+        below = h.descendants(gid) | {gid}
+        return [atom(("g", x)) for x in below if not h.descendants(x)]
+
+    program_atoms: Dict[int, set] = {}
+    for g in groups:
+        pid = group_program.get(g.id)
+        if pid is not None:
+            program_atoms.setdefault(pid, set()).update(leaves(g.id))
+    attendance = program_attendance(db)
+
+    # lecturers and their availability (no row recorded = available all week)
+    lecturer_ids = sorted({o.lecturer_id for o, *_ in blocks if o.lecturer_id is not None})
+    lec_row = {lid: i for i, lid in enumerate(lecturer_ids)}
+    p.lecturer_ids = np.array(lecturer_ids, dtype=np.int64)
+    p.avail = np.ones((len(lecturer_ids), WEEK_SLOTS), dtype=bool)
+    if lecturer_ids:
+        A = models.LecturerAvailability
+        for lid, bitmap, data in db.query(A.lecturer_id, A.slot_bitmap, A.schedule_data)\
+                .filter(A.lecturer_id.in_(lecturer_ids)).all():
+            mask = mask_from_bytes(bitmap) if bitmap is not None else availability_mask(data)
+            p.avail[lec_row[lid]] = _bits(mask)
+
+    capacity = np.array([r.capacity or 0 for r in rooms], dtype=np.int64)
+    room_type = [_norm(r.type) for r in rooms]
+    room_equipment = [r.equipment_mask or 0 for r in rooms]
+    p.room_fit = np.zeros((len(blocks), len(rooms)), dtype=np.int32)
+
+    for b, (o, e, gid, dur, at, offset, minutes) in enumerate(blocks):
+        module = o.module
+        p.offer_id[b] = o.id
+        p.entry_id[b] = e.id if e is not None else -1
+        p.group_id[b] = gid if gid is not None else -1
+        p.dur[b] = dur
+        p.offset[b], p.minutes[b] = offset, minutes
+        p.lecturer[b] = lec_row.get(o.lecturer_id, -1)
+        if gid is not None:
+            cohort = set(leaves(gid)) if gid in h.name else {atom(("g", gid))}
+            seats = group_size.get(gid, 0)
+        elif module is not None and module.program_id is not None:
+            cohort = set(program_atoms.get(module.program_id, ())) | {atom(("p", module.program_id, module.semester))}
+            seats = attendance.get(module.program_id, 0)
+        else:
+            cohort, seats = set(), 0
+        p.atoms.append(np.array(sorted(cohort), dtype=np.int64))
+
+        need_type = _norm(module.room_type) if module else ""
+        need_equipment = (module.required_equipment_mask or 0) if module else 0
+        if len(rooms):
+            fit = np.zeros(len(rooms), dtype=np.int64)
+            if need_type:
+                fit += ROOM_TYPE * np.array([t != need_type for t in room_type])
+            fit += ROOM_TOO_SMALL * (capacity < seats)
+            fit += MISSING_EQUIPMENT * np.array([bin(need_equipment & ~m).count("1") for m in room_equipment])
+            spare = np.where(capacity > 0, np.clip(capacity - seats, 0, None) / np.maximum(capacity, 1), 0)
+            fit += np.round(WASTE * spare).astype(np.int64)
+            p.room_fit[b] = fit
+            cands = np.argsort(fit, kind="stable")[:ROOM_CANDIDATES]
+        else:
+            cands = np.zeros(0, dtype=np.int64)
+
+        if e is not None:
+            p.init_at[b] = at
+            p.init_room[b] = room_row.get(e.room_id, -1)
+            p.room_closed[b] = e.room_id is not None and p.init_room[b] < 0
+            p.fixed[b] = keep_existing
+            if p.init_room[b] >= 0 and p.init_room[b] not in cands:
+                cands = np.append(cands, p.init_room[b])
+        p.candidates.append(np.asarray(cands, dtype=np.int64))
+
+    p.n_atoms = len(atom_of)
+    return p
+
+
+def placements(p: Problem, at: np.ndarray, rm: np.ndarray) -> List[dict]:
+    """
+    Search result -> schedule rows (moved = differs from the stored entry).
+    Times keep the entry's own start offset and length; only the slot moves.
+    """
+    out = []
+    for b in range(p.n):
+        a, r = int(at[b]), int(rm[b])
+        start = (a % SLOTS_PER_DAY) * SLOT_MINUTES + int(p.offset[b])
+        out.append({
+            "offered_module_id": int(p.offer_id[b]),
+            "entry_id": int(p.entry_id[b]) if p.entry_id[b] >= 0 else None,
+            "group_id": int(p.group_id[b]) if p.group_id[b] >= 0 else None,
+            "day_of_week": DAYS[a // SLOTS_PER_DAY],
+            "start_time": format_minutes(start),
+            "end_time": format_minutes(start + int(p.minutes[b])),
+            "room_id": int(p.room_ids[r]) if r >= 0 else None,
+            "moved": bool(p.entry_id[b] >= 0 and (a != p.init_at[b] or r != p.init_room[b])),
+        })
+    return out
@@ -0,0 +1,191 @@
+# api/typeahead.py
+"""
+Prefix lookup for dropdown pickers.
+
+One compressed trie (radix tree) per entity: edges carry whole string chunks,
+so a lookup walks at most len(prefix) characters and then collects the first k
+items below that point in alphabetical order. Every word of a row's searchable
+text is a key (plus the full label), so "smi" finds "Ann Smith".
+
+Tries are built per entity on first use and patched from the change feed, the
+same way as the search index.
+"""
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import changes
+from .search_index import _SOURCES, _norm
+
+ENTITIES = tuple(_SOURCES.keys())
+
+
+class _Node:
+    __slots__ = ("children", "items")
+
+    def __init__(self):
+        self.children: Dict[str, Tuple[str, "_Node"]] = {}  # first char -> (edge label, child)
+        self.items: Set[str] = set()
+
+
+def _common(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class RadixTrie:
+    def __init__(self):
+        self.root = _Node()
+
+    def insert(self, key: str, item: str):
+        node = self.root
+        while key:
+            entry = node.children.get(key[0])
+            if entry is None:
+                leaf = _Node()
+                leaf.items.add(item)
+                node.children[key[0]] = (key, leaf)
+                return
+            label, child = entry
+            k = _common(label, key)
+            if k < len(label):
+                # split the edge at the shared part
+                mid = _Node()
+                mid.children[label[k]] = (label[k:], child)
+                node.children[key[0]] = (label[:k], mid)
+                child = mid
+            node, key = child, key[k:]
+        node.items.add(item)
+
+    def remove(self, key: str, item: str):
+        path: List[Tuple[_Node, str]] = []
+        node = self.root
+        while key:
+            entry = node.children.get(key[0])
+            if entry is None or not key.startswith(entry[0]):
+                return
+            path.append((node, key[0]))
+            node, key = entry[1], key[len(entry[0]):]
+        node.items.discard(item)
+
+        # prune empty leaves and re-merge single-child chains
+        while path:
+            parent, c = path.pop()
+            label, child = parent.children[c]
+            if not child.items and not child.children:
+                del parent.children[c]
+                continue
+            if not child.items and len(child.children) == 1:
+                (sub_label, grandchild), = child.children.values()
+                parent.children[c] = (label + sub_label, grandchild)
+            break
+
+    def top(self, prefix: str, k: int, allow: Optional[Callable[[str], bool]] = None) -> List[str]:
+        node = self.root
+        key = prefix
+        while key:
+            entry = node.children.get(key[0])
+            if entry is None:
+                return []
+            label, child = entry
+            if label.startswith(key):
+                node, key = child, ""
+            elif key.startswith(label):
+                node, key = child, key[len(label):]
+            else:
+                return []
+
+        out: List[str] = []
+        seen: Set[str] = set()
+        stack = [node]
+        while stack and len(out) < k:
+            n = stack.pop()
+            for item in sorted(n.items):
+                if item not in seen and (allow is None or allow(item)):
+                    seen.add(item)
+                    out.append(item)
+                    if len(out) >= k:
+                        break
+            stack.extend(child for _, (_, child) in sorted(n.children.items(), reverse=True))
+        return out
+
+
+def _keys(doc: dict) -> Set[str]:
+    text = _norm(doc["text"])
+    keys = set(text.split(" "))
+    keys.add(_norm(str(doc["label"])))
+    keys.discard("")
+    return keys
+
+
+class EntityTypeahead:
+    def __init__(self, entity: str):
+        self.entity = entity
+        self.trie = RadixTrie()
+        self.docs: Dict[str, dict] = {}
+        self.keys: Dict[str, Set[str]] = {}
+        self.loaded = False
+        self.dirty: Set[str] = set()
+
+    def _add(self, item: str, doc: dict):
+        self._drop(item)
+        self.docs[item] = {"id": doc["id"], "label": doc["label"]}
+        self.keys[item] = _keys(doc)
+        for key in self.keys[item]:
+            self.trie.insert(key, item)
+
+    def _drop(self, item: str):
+        for key in self.keys.pop(item, ()):
+            self.trie.remove(key, item)
+        self.docs.pop(item, None)
+
+    def refresh(self, db: Session):
+        model, pk, to_doc = _SOURCES[self.entity]
+        if not self.loaded:
+            for row in db.query(model).all():
+                doc = to_doc(row)
+                self._add(str(doc["id"]), doc)
+            self.dirty = set()
+            self.loaded = True
+        elif self.dirty:
+            ids, self.dirty = self.dirty, set()
+            wanted = ids if self.entity == "modules" else [int(i) for i in ids if i.lstrip("-").isdigit()]
+            found = set()
+            for row in db.query(model).filter(pk.in_(wanted)).all():
+                doc = to_doc(row)
+                found.add(str(doc["id"]))
+                self._add(str(doc["id"]), doc)
+            for item in ids - found:
+                self._drop(item)
+
+
+class Typeahead:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.entities = {e: EntityTypeahead(e) for e in ENTITIES}
+
+    def mark_dirty(self, entity: str, entity_id: str):
+        with self._lock:
+            t = self.entities.get(entity)
+            if t is not None and t.loaded:
+                t.dirty.add(entity_id)
+
+    def lookup(self, db: Session, entity: str, prefix: str, k: int,
+               allow: Optional[Callable[[str], bool]] = None) -> List[dict]:
+        with self._lock:
+            t = self.entities[entity]
+            t.refresh(db)
+            return [t.docs[item] for item in t.trie.top(_norm(prefix), k, allow)]
+
+
+typeahead = Typeahead()
+
+
+@changes.subscribe
+def _on_changes(batch: List[dict]):
+    for c in batch:
+        typeahead.mark_dirty(c["entity"], c["entity_id"])
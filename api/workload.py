@@ -0,0 +1,143 @@
+# api/workload.py
+"""
+Lecturer workload for one semester, computed by the database.
+
+One statement: entry minutes are summed per offering, offerings are
+aggregated per lecturer, and window functions add the rank and the
+semester-wide totals/averages to every row. Python only parses the free-text
+Lecturer.teaching_load and derives the deviation.
+"""
+from sqlalchemy import Integer, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+
+from . import models
+from .timeslots import parse_teaching_load
+
+# a lecturer counts as over/under loaded beyond this many weekly hours off target
+TOLERANCE_HOURS = 0.5
+
+
+class sql_minutes(FunctionElement):
+    """
+    "8:00" / "08:00" / "08:00:00" -> minutes since midnight, in SQL. Times are
+    stored as typed (timeslots.to_minutes accepts all of these), so the hour
+    can't be read from fixed positions. Anything else is NULL, as to_minutes
+    returns None, so one bad row drops out of the sums instead of failing them.
+    """
+    type = Integer()
+    name = "sql_minutes"
+    inherit_cache = True
+
+
+# hour 0-23 with optional :minutes 0-59, or 24[:00]; optional :seconds
+_TIME_PATTERN = "^(([01]?[0-9]|2[0-3])(:[0-5]?[0-9])?|24(:0?0)?)(:[0-9]+)?$"
+
+
+def _time_column(element, compiler, **kw) -> str:
+    return f"trim({compiler.process(list(element.clauses)[0], **kw)})"
+
+
+@compiles(sql_minutes)
+def _sql_minutes_default(element, compiler, **kw):
+    # SQLite: no regex, but only digits and colons get through; CAST reads the
+    # leading digits, so "8:30" -> 8 and "30:00" -> 30
+    t = _time_column(element, compiler, **kw)
+    return (f"(CASE WHEN {t} GLOB '[0-9]*' AND {t} NOT GLOB '*[^0-9:]*' "
+            f"THEN CAST({t} AS INTEGER) * 60 + CASE WHEN instr({t}, ':') > 0 "
+            f"THEN CAST(substr({t}, instr({t}, ':') + 1) AS INTEGER) ELSE 0 END END)")
+
+
+@compiles(sql_minutes, "postgresql")
+def _sql_minutes_postgresql(element, compiler, **kw):
+    t = _time_column(element, compiler, **kw)
+    return (f"(CASE WHEN {t} ~ '{_TIME_PATTERN}' "
+            f"THEN CAST(split_part({t}, ':', 1) AS INTEGER) * 60 "
+            f"+ CAST(COALESCE(NULLIF(split_part({t}, ':', 2), ''), '0') AS INTEGER) END)")
+
+
+def lecturer_workload(db: Session, semester: str) -> dict:
+    E, O, M, L = models.ScheduleEntry, models.OfferedModule, models.Module, models.Lecturer
+
+    per_offer = (
+        db.query(
+            E.offered_module_id.label("offer_id"),
+            func.sum(sql_minutes(E.end_time) - sql_minutes(E.start_time)).label("minutes"),
+        )
+        .filter(E.semester == semester)
+        .group_by(E.offered_module_id)
+        .subquery()
+    )
+
+    per_lecturer = (
+        db.query(
+            O.lecturer_id.label("lecturer_id"),
+            func.count(O.id).label("offerings"),
+            func.count(per_offer.c.offer_id).label("scheduled_offerings"),
+            func.coalesce(func.sum(per_offer.c.minutes), 0).label("minutes"),
+            func.coalesce(func.sum(M.ects), 0).label("ects"),
+        )
+        .join(M, O.module_code == M.module_code)
+        .outerjoin(per_offer, per_offer.c.offer_id == O.id)
+        .filter(O.semester == semester, O.lecturer_id.isnot(None))
+        .group_by(O.lecturer_id)
+        .subquery()
+    )
+
+    minutes = func.coalesce(per_lecturer.c.minutes, 0)
+    rows = (
+        db.query(
+            L.id, L.first_name, L.last_name, L.employment_type, L.teaching_load,
+            func.coalesce(per_lecturer.c.offerings, 0),
+            func.coalesce(per_lecturer.c.scheduled_offerings, 0),
+            minutes,
+            func.coalesce(per_lecturer.c.ects, 0),
+            func.rank().over(order_by=minutes.desc()).label("rank"),
+            func.sum(minutes).over().label("total_minutes"),
+            func.avg(minutes).over().label("avg_minutes"),
+        )
+        .outerjoin(per_lecturer, per_lecturer.c.lecturer_id == L.id)
+        .order_by(L.id)
+        .all()
+    )
+
+    lecturers = []
+    over = under = unknown = 0
+    total_minutes = avg_minutes = 0
+    for (lid, first, last, employment, load_text, offerings, scheduled, mins, ects,
+         rank, total_minutes, avg_minutes) in rows:
+        hours = round((mins or 0) / 60.0, 2)
+        load = parse_teaching_load(load_text)
+        deviation = None if load is None else round(hours - load, 2)
+        if deviation is None:
+            unknown += 1
+        elif deviation > TOLERANCE_HOURS:
+            over += 1
+        elif deviation < -TOLERANCE_HOURS:
+            under += 1
+        lecturers.append({
+            "lecturer_id": lid,
+            "name": f"{first} {last or ''}".strip(),
+            "employment_type": employment,
+            "teaching_load": load_text,
+            "teaching_load_hours": load,
+            "offerings": offerings,
+            "unscheduled_offerings": offerings - scheduled,
+            "scheduled_hours": hours,
+            "ects": ects,
+            "deviation_hours": deviation,
+            "load_ratio": round(hours / load, 3) if load else None,
+            "rank": rank,
+        })
+
+    return {
+        "semester": semester,
+        "lecturers": len(lecturers),
+        "total_scheduled_hours": round((total_minutes or 0) / 60.0, 2),
+        "average_scheduled_hours": round(float(avg_minutes or 0) / 60.0, 2),
+        "overloaded": over,
+        "underloaded": under,
+        "unknown_load": unknown,
+        "workload": lecturers,
+    }